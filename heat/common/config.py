@@ -104,7 +104,44 @@ engine_opts = [
                help='Driver to use for controlling instances'),
     cfg.ListOpt('plugin_dirs',
                 default=['/usr/lib64/heat', '/usr/lib/heat'],
-                help='List of directories to search for Plugins')]
+                help='List of directories to search for Plugins'),
+    cfg.IntOpt('max_concurrent_tasks',
+               default=0,
+               help='Maximum number of resource operations on backend '
+                    'services in progress at once (0 for no limit)'),
+    cfg.IntOpt('max_concurrent_tasks_per_tenant',
+               default=0,
+               help='Maximum number of resource operations on backend '
+                    'services in progress at once for any one tenant '
+                    '(0 for no limit)'),
+    cfg.ListOpt('backend_task_rates',
+                default=[],
+                help='Rate limits for starting resource operations on each '
+                     'backend service, as a list of '
+                     'service:rate[:burst] entries (e.g. nova:5:10). Rates '
+                     'must be positive; omit a service to leave it '
+                     'unlimited'),
+    cfg.BoolOpt('instrument_tasks',
+                default=False,
+                help='Collect timings and step counts for the tasks run by '
+                     'the engine, for retrieval with get_task_stats'),
+    cfg.IntOpt('template_cache_size',
+               default=100,
+               help='Maximum number of parsed templates to keep in memory '
+                    'for reuse between requests (0 to disable the cache)'),
+    cfg.IntOpt('validation_cache_size',
+               default=100,
+               help='Maximum number of template validation results to keep '
+                    'in memory (0 to disable the cache)')]
+
+template_opts = [
+    cfg.IntOpt('max_template_size',
+               default=524288,
+               help='Maximum size in bytes of a raw template'),
+    cfg.IntOpt('template_parse_cache_size',
+               default=20,
+               help='Number of parsed YAML templates to keep for reuse '
+                    '(0 to disable the cache)')]
 
 rpc_opts = [
     cfg.StrOpt('host',
@@ -124,6 +161,10 @@ def register_db_opts():
     cfg.CONF.register_opts(db_opts)
 
 
+def register_template_opts():
+    cfg.CONF.register_opts(template_opts)
+
+
 def register_engine_opts():
     cfg.CONF.register_opts(engine_opts)
     cfg.CONF.register_opts(service_opts)
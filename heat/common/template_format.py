@@ -13,13 +13,25 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
+import hashlib
 import re
 import yaml
 import json
 
+from oslo.config import cfg
+
+from heat.common import config
+from heat.common import utils
+
 HEAT_VERSIONS = (u'2012-12-12',)
 CFN_VERSIONS = (u'2010-09-09',)
 
+config.register_template_opts()
+
+# Use the libyaml-based loader where it is available, as it is much faster
+yaml_loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
 
 def _construct_yaml_str(self, node):
     # Override the default string handling function
@@ -27,6 +39,35 @@ def _construct_yaml_str(self, node):
     return self.construct_scalar(node)
 yaml.Loader.add_constructor(u'tag:yaml.org,2002:str', _construct_yaml_str)
 yaml.SafeLoader.add_constructor(u'tag:yaml.org,2002:str', _construct_yaml_str)
+yaml_loader.add_constructor(u'tag:yaml.org,2002:str', _construct_yaml_str)
+
+# Parsed YAML templates, keyed by the digest of the raw template. The cache
+# is sized from the template_parse_cache_size option each time it is used.
+_parse_cache = utils.LRUCache(0)
+
+
+def _cached_yaml_load(tmpl_str):
+    '''
+    Parse a YAML template, reusing the result of parsing an identical template
+    where possible. A copy is always returned, since callers may modify it.
+    '''
+    size = cfg.CONF.template_parse_cache_size
+    if size != _parse_cache.size:
+        _parse_cache.resize(size)
+    if size <= 0:
+        return yaml.load(tmpl_str, Loader=yaml_loader)
+
+    if isinstance(tmpl_str, unicode):
+        key = hashlib.sha1(tmpl_str.encode('utf-8')).hexdigest()
+    else:
+        key = hashlib.sha1(tmpl_str).hexdigest()
+
+    tpl = _parse_cache.get(key)
+    if tpl is None:
+        tpl = yaml.load(tmpl_str, Loader=yaml_loader)
+        _parse_cache.put(key, tpl)
+
+    return copy.deepcopy(tpl)
 
 
 def parse(tmpl_str):
@@ -35,11 +76,19 @@ def parse(tmpl_str):
     This includes determination of whether the string is using the
     JSON or YAML format.
     '''
+    if isinstance(tmpl_str, unicode):
+        size = len(tmpl_str.encode('utf-8'))
+    else:
+        size = len(tmpl_str)
+    if size > cfg.CONF.max_template_size:
+        raise ValueError(_('Template exceeds maximum allowed size (%s bytes)')
+                         % cfg.CONF.max_template_size)
+
     if tmpl_str.startswith('{'):
         tpl = json.loads(tmpl_str)
     else:
         try:
-            tpl = yaml.safe_load(tmpl_str)
+            tpl = _cached_yaml_load(tmpl_str)
         except yaml.scanner.ScannerError as e:
             raise ValueError(e)
         else:
@@ -50,3 +50,60 @@ def chunkiter(fp, chunk_size=65536):
             yield chunk
         else:
             break
+
+
+class LRUCache(object):
+    """
+    A mapping of limited size that discards the least recently used entries
+    when full.
+
+    :param size: the maximum number of entries (0 to cache nothing)
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._entries = {}
+        self._clock = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the value cached for a key, or None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._clock += 1
+        entry[0] = self._clock
+        return entry[1]
+
+    def put(self, key, value):
+        """Cache a value for a key, evicting the oldest entries if full."""
+        if self.size <= 0:
+            return
+
+        if key not in self._entries:
+            self._evict(self.size - 1)
+
+        self._clock += 1
+        self._entries[key] = [self._clock, value]
+
+    def resize(self, size):
+        """Change the maximum number of entries, evicting any excess."""
+        self.size = size
+        self._evict(max(size, 0))
+
+    def _evict(self, count):
+        """Evict the oldest entries until no more than count remain."""
+        while len(self._entries) > count:
+            oldest = min(self._entries, key=lambda k: self._entries[k][0])
+            del self._entries[oldest]
+
+    def clear(self):
+        """Discard all entries."""
+        self._entries.clear()
@@ -148,6 +148,10 @@ def event_create(context, values):
     return IMPL.event_create(context, values)
 
 
+def batch_write(context, stack_updates, resource_updates, events):
+    return IMPL.batch_write(context, stack_updates, resource_updates, events)
+
+
 def watch_rule_get(context, watch_rule_id):
     return IMPL.watch_rule_get(context, watch_rule_id)
 
@@ -14,6 +14,7 @@
 #    under the License.
 
 '''Implementation of SQLAlchemy backend.'''
+from sqlalchemy.orm import contains_eager
 from sqlalchemy.orm.session import Session
 
 from heat.common.exception import NotFound
@@ -107,10 +108,7 @@ def resource_get_all_by_stack(context, stack_id):
     results = model_query(context, models.Resource).\
         filter_by(stack_id=stack_id).all()
 
-    if not results:
-        raise NotFound("no resources for stack_id %s were found" % stack_id)
-
-    return results
+    return dict((result.name, result) for result in results)
 
 
 def stack_get_by_name(context, stack_name, owner_id=None):
@@ -235,12 +233,11 @@ def event_get_all(context):
 
 
 def event_get_all_by_tenant(context):
-    stacks = model_query(context, models.Stack).\
-        filter_by(tenant=context.tenant_id).all()
-    results = []
-    for stack in stacks:
-        results.extend(model_query(context, models.Event).
-                       filter_by(stack_id=stack.id).all())
+    results = model_query(context, models.Event).\
+        join(models.Event.stack).\
+        options(contains_eager(models.Event.stack)).\
+        filter(models.Stack.tenant == context.tenant_id).\
+        order_by(models.Event.stack_id, models.Event.id).all()
 
     return results
 
@@ -259,6 +256,40 @@ def event_create(context, values):
     return event_ref
 
 
+def batch_write(context, stack_updates, resource_updates, events):
+    '''
+    Apply lists of (id, values) updates to stacks and resources and create
+    events from a list of values, all in a single transaction. Updates to
+    rows that no longer exist are ignored.
+    '''
+    session = _session(context)
+    session.begin()
+    try:
+        for stack_id, values in stack_updates:
+            stack = session.query(models.Stack).get(stack_id)
+            if stack is not None:
+                stack.update(values)
+
+        if resource_updates:
+            ids = [resource_id for resource_id, values in resource_updates]
+            rows = session.query(models.Resource).\
+                filter(models.Resource.id.in_(ids)).all()
+            resources = dict((row.id, row) for row in rows)
+            for resource_id, values in resource_updates:
+                if resource_id in resources:
+                    resources[resource_id].update(values)
+
+        for values in events:
+            event_ref = models.Event()
+            event_ref.update(values)
+            session.add(event_ref)
+
+        session.commit()
+    except:
+        session.rollback()
+        raise
+
+
 def watch_rule_get(context, watch_rule_id):
     result = model_query(context, models.WatchRule).\
         filter_by(id=watch_rule_id).first()
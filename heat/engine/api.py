@@ -124,11 +124,11 @@ def format_event(event):
         EVENT_STACK_ID: dict(stack_identifier),
         EVENT_STACK_NAME: stack_identifier.stack_name,
         EVENT_TIMESTAMP: timeutils.isotime(event.timestamp),
-        EVENT_RES_NAME: event.resource.name,
+        EVENT_RES_NAME: event.resource_name,
         EVENT_RES_PHYSICAL_ID: event.physical_resource_id,
         EVENT_RES_STATUS: event.new_state,
         EVENT_RES_STATUS_DATA: event.reason,
-        EVENT_RES_TYPE: event.resource.type(),
+        EVENT_RES_TYPE: event.resource_type,
         EVENT_RES_PROPERTIES: event.resource_properties,
     }
 
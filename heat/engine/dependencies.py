@@ -55,6 +55,10 @@ class Node(object):
         '''Add a key that this node requires.'''
         self.require.add(target)
 
+    def remove_requirer(self, source):
+        '''Remove a key that requires this node.'''
+        self.satisfy.discard(source)
+
     def __isub__(self, target):
         '''Remove a key that this node requires.'''
         self.require.remove(target)
@@ -124,23 +128,71 @@ class Graph(collections.defaultdict):
         pairs = ('%s: %s' % (str(k), str(v)) for k, v in self.iteritems())
         return '{%s}' % ', '.join(pairs)
 
+    def path_lengths(self, weight=lambda key: 1):
+        '''
+        Return a dictionary mapping each key in the graph to the length of the
+        longest path from it through the nodes that (transitively) require it.
+
+        The length of a path is the sum of the weights of the nodes on it,
+        including the node at which it starts.
+        '''
+        lengths = {}
+        for key in reversed(list(Graph.toposort(self))):
+            downstream = [lengths[rqr] for rqr in self[key].required_by()]
+            lengths[key] = weight(key) + max(downstream or [0])
+        return lengths
+
     @staticmethod
     def toposort(graph):
         '''
         Return a topologically sorted iterator over a dependency graph.
 
-        This is a destructive operation for the graph.
+        Each node is yielded as soon as all of the nodes it requires have been
+        yielded, so every node and edge is visited only once. The graph itself
+        is not modified.
         '''
-        for iteration in xrange(len(graph)):
-            for key, node in graph.iteritems():
-                if not node:
-                    yield key
-                    del graph[key]
-                    break
-            else:
-                # There are nodes remaining, but none without
-                # dependencies: a cycle
-                raise CircularDependencyException(cycle=str(graph))
+        unsatisfied = dict((k, len(n)) for k, n in graph.iteritems())
+        ready = collections.deque(k for k, count in unsatisfied.iteritems()
+                                  if not count)
+
+        while ready:
+            key = ready.popleft()
+            yield key
+
+            for rqr in graph[key].required_by():
+                unsatisfied[rqr] -= 1
+                if not unsatisfied[rqr]:
+                    ready.append(rqr)
+
+        blocked = [k for k, count in unsatisfied.iteritems() if count]
+        if blocked:
+            # There are nodes remaining, but none without
+            # dependencies: a cycle
+            cycle = Graph.find_cycle(graph, blocked)
+            raise CircularDependencyException(
+                cycle=' -> '.join(str(k) for k in cycle))
+
+    @staticmethod
+    def find_cycle(graph, keys):
+        '''
+        Return a list of keys forming a cycle in the graph, starting and ending
+        with the same key.
+
+        The supplied keys must each require at least one other key from the
+        same collection, as is the case for the nodes left over when a
+        topological sort cannot proceed.
+        '''
+        blocked = set(keys)
+        path = []
+        position = {}
+
+        key = keys[0]
+        while key not in position:
+            position[key] = len(path)
+            path.append(key)
+            key = next(k for k in graph[key] if k in blocked)
+
+        return path[position[key]:] + [key]
 
 
 class Dependencies(object):
@@ -152,12 +204,18 @@ class Dependencies(object):
         (requirer, required) tuples.
         '''
         self._graph = Graph()
+        self._order = None
+        self._reverse_order = None
+        # Cache of the set of keys that transitively require each key
+        self._requirers = {}
         for e in edges:
             self += e
 
     def __iadd__(self, edge):
         '''Add another edge, in the form of a (requirer, required) tuple.'''
         requirer, required = edge
+        self._order = self._reverse_order = None
+        self._requirers.clear()
 
         if required is None:
             # Just ensure the node is created by accessing the defaultdict
@@ -168,6 +226,36 @@ class Dependencies(object):
 
         return self
 
+    def add_node(self, key, requires=(), required_by=()):
+        '''
+        Add a node to the graph, along with edges to it from each of the keys
+        that require it and from it to each of the keys it requires.
+        '''
+        self += (key, None)
+        for required in requires:
+            self += (key, required)
+        for requirer in required_by:
+            self += (requirer, key)
+
+    def remove_node(self, key):
+        '''
+        Remove a node and all of the edges to and from it from the graph.
+        Return a list of the keys that required it.
+        '''
+        if key not in self._graph:
+            raise KeyError
+
+        self._order = self._reverse_order = None
+        self._requirers.clear()
+
+        node = self._graph[key]
+        requirers = list(node.required_by())
+        for required in node:
+            self._graph[required].remove_requirer(key)
+        del self._graph[key]
+
+        return requirers
+
     def __getitem__(self, last):
         '''
         Return a partial dependency graph consisting of the specified node and
@@ -176,26 +264,36 @@ class Dependencies(object):
         if last not in self._graph:
             raise KeyError
 
-        def get_edges(key):
-            def requirer_edges(rqr):
-                # Concatenate the dependency on the current node with the
-                # recursive generated list
-                return itertools.chain([(rqr, key)], get_edges(rqr))
-
-            # Get the edge list for each node that requires the current node
-            edge_lists = itertools.imap(requirer_edges,
-                                        self._graph[key].required_by())
-            # Combine the lists into one long list
-            return itertools.chain.from_iterable(edge_lists)
-
         if self._graph[last].stem():
             # Nothing requires this, so just add the node itself
-            edges = [(last, None)]
-        else:
-            edges = get_edges(last)
+            return Dependencies([(last, None)])
 
+        edges = ((rqr, key) for key in self.required_by_all(last)
+                 for rqr in self._graph[key].required_by())
         return Dependencies(edges)
 
+    def required_by_all(self, last):
+        '''
+        Return the set of keys consisting of the specified key and all of those
+        that (directly or indirectly) require it.
+
+        The result is cached until the graph is next modified.
+        '''
+        if last not in self._graph:
+            raise KeyError
+
+        if last not in self._requirers:
+            reached = set([last])
+            pending = [last]
+            while pending:
+                for rqr in self._graph[pending.pop()].required_by():
+                    if rqr not in reached:
+                        reached.add(rqr)
+                        pending.append(rqr)
+            self._requirers[last] = frozenset(reached)
+
+        return self._requirers[last]
+
     def __str__(self):
         '''
         Return a human-readable string representation of the dependency graph
@@ -226,8 +324,15 @@ class Dependencies(object):
 
     def __iter__(self):
         '''Return a topologically sorted iterator'''
-        return Graph.toposort(self.graph())
+        if self._order is None:
+            self._order = list(Graph.toposort(self._graph))
+        for key in self._order:
+            yield key
 
     def __reversed__(self):
         '''Return a reverse topologically sorted iterator'''
-        return Graph.toposort(self.graph(reverse=True))
+        if self._reverse_order is None:
+            reverse_graph = self._graph.reverse_copy()
+            self._reverse_order = list(Graph.toposort(reverse_graph))
+        for key in self._reverse_order:
+            yield key
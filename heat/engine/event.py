@@ -17,6 +17,7 @@ from heat.db import api as db_api
 from heat.common import exception
 from heat.common import identifier
 from heat.openstack.common import log as logging
+from heat.openstack.common import timeutils
 
 logger = logging.getLogger(__name__)
 
@@ -35,6 +36,9 @@ class Event(object):
         '''
         self.context = context
         self.resource = resource
+        if resource is not None:
+            self.resource_name = resource.name
+            self.resource_type = resource.type()
         self.stack = stack
         self.new_state = new_state
         self.reason = reason
@@ -66,17 +70,36 @@ class Event(object):
 
         return event
 
-    def store(self):
-        '''Store the Event in the database.'''
+    @classmethod
+    def from_db(cls, context, stack, ev):
+        '''
+        Initialise from an event database row and the stack (which may be a
+        parser.StackSummary) that it belongs to. The name and type of the
+        resource are taken from the row, so the resource itself is not loaded
+        and the Event's resource attribute is None.
+        '''
+        event = cls(context, stack, None,
+                    ev.name, ev.resource_status_reason,
+                    ev.physical_resource_id, ev.resource_properties,
+                    ev.created_at, ev.id)
+        event.resource_name = ev.logical_resource_id
+        event.resource_type = ev.resource_type
+        return event
+
+    def store(self, write_buffer=None):
+        '''
+        Store the Event in the database. If a WriteBuffer is given, the Event
+        is added to it instead and is not assigned an ID.
+        '''
         ev = {
-            'logical_resource_id': self.resource.name,
+            'logical_resource_id': self.resource_name,
             'physical_resource_id': self.physical_resource_id,
             'stack_id': self.stack.id,
             'stack_name': self.stack.name,
             'resource_status': self.new_state,
             'name': self.new_state,
             'resource_status_reason': self.reason,
-            'resource_type': self.resource.type(),
+            'resource_type': self.resource_type,
             'resource_properties': self.resource_properties,
         }
 
@@ -86,6 +109,12 @@ class Event(object):
         if self.id is not None:
             logger.warning('Duplicating event')
 
+        if write_buffer is not None:
+            # Timestamp the event now rather than when the buffer is flushed
+            ev.setdefault('created_at', timeutils.utcnow())
+            write_buffer.event_create(ev)
+            return None
+
         new_ev = db_api.event_create(self.context, ev)
         self.id = new_ev.id
         return self.id
@@ -95,5 +124,7 @@ class Event(object):
         if self.id is None:
             return None
 
+        resource_id = identifier.ResourceIdentifier(
+            resource_name=self.resource_name, **self.stack.identifier())
         return identifier.EventIdentifier(event_id=str(self.id),
-                                          **self.resource.identifier())
+                                          **resource_id)
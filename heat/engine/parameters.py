@@ -39,10 +39,72 @@ PSEUDO_PARAMETERS = (
 )
 
 
+class Constraints(object):
+    '''The constraints on a parameter's value, compiled from its schema.'''
+
+    def __init__(self, schema):
+        self.allowed = schema.get(VALUES)
+        self._allowed_set = None
+        if self.allowed is not None:
+            try:
+                self._allowed_set = frozenset(self.allowed)
+            except TypeError:
+                pass
+
+        # The remaining constraints are compiled on first use, so that a
+        # malformed constraint is only reported when a value is validated
+        self._schema = schema
+        self._compiled = {}
+
+        # Set once the default value has been found to meet the constraints
+        self.default_valid = False
+
+    def _compile(self, key, convert):
+        if key not in self._compiled:
+            if key not in self._schema:
+                return None
+            try:
+                self._compiled[key] = convert(self._schema[key])
+            except (ValueError, TypeError, re.error):
+                raise ValueError('Invalid %s "%s"' % (key, self._schema[key]))
+        return self._compiled[key]
+
+    @property
+    def pattern(self):
+        return self._compile(PATTERN, re.compile)
+
+    @property
+    def max_length(self):
+        return self._compile(MAX_LENGTH, int)
+
+    @property
+    def min_length(self):
+        return self._compile(MIN_LENGTH, int)
+
+    @property
+    def max_value(self):
+        return self._compile(MAX_VALUE, NumberParam.str_to_num)
+
+    @property
+    def min_value(self):
+        return self._compile(MIN_VALUE, NumberParam.str_to_num)
+
+    def is_allowed(self, value):
+        '''Return whether a value is one of the allowed values (if any).'''
+        if self.allowed is None:
+            return True
+        if self._allowed_set is not None:
+            try:
+                return value in self._allowed_set
+            except TypeError:
+                pass
+        return value in self.allowed
+
+
 class Parameter(object):
     '''A template parameter.'''
 
-    def __new__(cls, name, schema, value=None):
+    def __new__(cls, name, schema, value=None, constraints=None):
         '''Create a new Parameter of the appropriate type.'''
         if cls is not Parameter:
             return super(Parameter, cls).__new__(cls)
@@ -57,20 +119,23 @@ class Parameter(object):
         else:
             raise ValueError('Invalid Parameter type "%s"' % param_type)
 
-        return ParamClass(name, schema, value)
+        return ParamClass(name, schema, value, constraints)
 
-    def __init__(self, name, schema, value=None):
+    def __init__(self, name, schema, value=None, constraints=None):
         '''
         Initialise the Parameter with a name, schema and optional user-supplied
-        value.
+        value. The constraints compiled from the schema may also be supplied,
+        so that they can be shared between Parameters with the same schema.
         '''
         self.name = name
         self.schema = schema
         self.user_value = value
+        self.constraints = constraints or Constraints(schema)
         self._constraint_error = self.schema.get(CONSTRAINT_DESCRIPTION)
 
-        if self.has_default():
+        if self.has_default() and not self.constraints.default_valid:
             self._validate(self.default())
+            self.constraints.default_valid = True
 
         if self.user_value is not None:
             self._validate(self.user_value)
@@ -78,12 +143,17 @@ class Parameter(object):
     def _error_msg(self, message):
         return '%s %s' % (self.name, self._constraint_error or message)
 
+    def _constraint(self, attr):
+        try:
+            return getattr(self.constraints, attr)
+        except ValueError as ex:
+            raise ValueError('%s %s' % (self.name, ex))
+
     def _validate(self, value):
-        if VALUES in self.schema:
-            allowed = self.schema[VALUES]
-            if value not in allowed:
-                message = '%s not in %s %s' % (value, VALUES, allowed)
-                raise ValueError(self._error_msg(message))
+        if not self.constraints.is_allowed(value):
+            message = '%s not in %s %s' % (value, VALUES,
+                                           self.constraints.allowed)
+            raise ValueError(self._error_msg(message))
 
     def value(self):
         '''Get the parameter value, optionally sanitising it for output.'''
@@ -137,10 +207,11 @@ class NumberParam(Parameter):
     def _validate(self, value):
         '''Check that the supplied value is compatible with the constraints.'''
         num = self.str_to_num(value)
-        minn = self.str_to_num(self.schema.get(MIN_VALUE, value))
-        maxn = self.str_to_num(self.schema.get(MAX_VALUE, value))
+        minn = self._constraint('min_value')
+        maxn = self._constraint('max_value')
 
-        if num > maxn or num < minn:
+        if ((maxn is not None and num > maxn) or
+                (minn is not None and num < minn)):
             raise ValueError(self._error_msg('%s is out of range' % value))
 
         Parameter._validate(self, value)
@@ -163,29 +234,27 @@ class StringParam(Parameter):
             raise ValueError(self._error_msg('value must be a string'))
 
         length = len(value)
-        if MAX_LENGTH in self.schema:
-            max_length = int(self.schema[MAX_LENGTH])
-            if length > max_length:
-                message = 'length (%d) overflows %s %s' % (length,
-                                                           MAX_LENGTH,
-                                                           max_length)
-                raise ValueError(self._error_msg(message))
-
-        if MIN_LENGTH in self.schema:
-            min_length = int(self.schema[MIN_LENGTH])
-            if length < min_length:
-                message = 'length (%d) underflows %s %d' % (length,
-                                                            MIN_LENGTH,
-                                                            min_length)
-                raise ValueError(self._error_msg(message))
-
-        if PATTERN in self.schema:
-            pattern = self.schema[PATTERN]
-            match = re.match(pattern, value)
+        max_length = self._constraint('max_length')
+        if max_length is not None and length > max_length:
+            message = 'length (%d) overflows %s %s' % (length,
+                                                       MAX_LENGTH,
+                                                       max_length)
+            raise ValueError(self._error_msg(message))
+
+        min_length = self._constraint('min_length')
+        if min_length is not None and length < min_length:
+            message = 'length (%d) underflows %s %d' % (length,
+                                                        MIN_LENGTH,
+                                                        min_length)
+            raise ValueError(self._error_msg(message))
+
+        pattern = self._constraint('pattern')
+        if pattern is not None:
+            match = pattern.match(value)
             if match is None or match.end() != length:
                 message = '"%s" does not match %s "%s"' % (value,
                                                            PATTERN,
-                                                           pattern)
+                                                           pattern.pattern)
                 raise ValueError(self._error_msg(message))
 
         Parameter._validate(self, value)
@@ -213,6 +282,22 @@ class CommaDelimitedListParam(Parameter, collections.Sequence):
         return self.value().split(',')[index]
 
 
+def compile_constraints(tmpl):
+    '''
+    Return a dict of the compiled Constraints for each parameter in a
+    template. These are stored with the Template, so they are compiled only
+    once for each template.
+    '''
+    constraints = getattr(tmpl, 'parameter_constraints', None)
+    if constraints is None:
+        constraints = dict((name, Constraints(schema))
+                           for name, schema
+                           in tmpl[template.PARAMETERS].iteritems())
+        if isinstance(tmpl, template.Template):
+            tmpl.parameter_constraints = constraints
+    return constraints
+
+
 class Parameters(collections.Mapping):
     '''
     The parameters of a stack, with type checking, defaults &c. specified by
@@ -243,8 +328,10 @@ class Parameters(collections.Mapping):
                                           'ap-southeast-1',
                                           'ap-northeast-1']})
 
+            constraints = compile_constraints(tmpl)
             for name, schema in tmpl[template.PARAMETERS].iteritems():
-                yield Parameter(name, schema, user_params.get(name))
+                yield Parameter(name, schema, user_params.get(name),
+                                constraints[name])
 
         self.params = dict((p.name, p) for p in parameters())
 
@@ -13,8 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import eventlet
-import functools
+import contextlib
 import re
 
 from heat.common import exception
@@ -25,6 +24,7 @@ from heat.engine import resources
 from heat.engine import scheduler
 from heat.engine import template
 from heat.engine import timestamp
+from heat.engine import write_buffer
 from heat.engine.parameters import Parameters
 from heat.engine.template import Template
 from heat.engine.clients import Clients
@@ -63,6 +63,11 @@ class Stack(object):
     updated_time = timestamp.Timestamp(db_api.stack_get, 'updated_at')
 
     _zones = None
+    _resource_rows = None
+
+    # The WriteBuffer for the database writes of the stack's resources, while
+    # an operation on the stack is in progress
+    write_buffer = None
 
     def __init__(self, context, stack_name, tmpl, parameters=None,
                  stack_id=None, state=None, state_description='',
@@ -101,13 +106,36 @@ class Stack(object):
         else:
             self.outputs = {}
 
-        template_resources = self.t[template.RESOURCES]
-        self.resources = dict((name,
-                               resource.Resource(name, data, self))
-                              for (name, data) in template_resources.items())
+        # Fetch the stored state of all of the resources in one query while
+        # they are being created, rather than one query per resource
+        if self.id is not None:
+            self._resource_rows = db_api.resource_get_all_by_stack(context,
+                                                                   self.id)
+        else:
+            self._resource_rows = {}
+        try:
+            template_resources = self.t[template.RESOURCES]
+            self.resources = dict((name,
+                                   resource.Resource(name, data, self))
+                                  for (name, data)
+                                  in template_resources.items())
+        finally:
+            self._resource_rows = None
 
         self.dependencies = self._get_dependencies(self.resources.itervalues())
 
+    def db_resource_get(self, name):
+        '''
+        Return the database row for the named resource in this stack, or None
+        if it has not been stored.
+        '''
+        if self._resource_rows is not None:
+            return self._resource_rows.get(name)
+        if self.id is None:
+            return None
+        return db_api.resource_get_by_name_and_stack(self.context,
+                                                     name, self.id)
+
     def _set_param_stackid(self):
         '''
         Update self.parameters with the current ARN which is then provided
@@ -208,8 +236,37 @@ class Stack(object):
         return self.resources[key]
 
     def __setitem__(self, key, value):
-        '''Set the resource with the specified name to a specific value.'''
+        '''
+        Set the resource with the specified name to a specific value. The
+        dependency graph is updated to reflect the new resource's definition.
+        '''
+        old = self.resources.get(key)
         self.resources[key] = value
+        self._relink(old, value)
+
+    def _relink(self, old, new, references=None):
+        '''
+        Replace the node for the resource old (if any) in the dependency graph
+        with one for the resource new, whose edges are derived from the given
+        references (by default, those in its own definition).
+        '''
+        if references is None:
+            references = new._references()
+        # During an update, a resource may be added before one that it refers
+        # to. Such a reference is never to a strict dependency (or the target
+        # would have been added first), so it adds no edge and is skipped.
+        references = [ref for ref in references if ref[1] in self.resources]
+
+        requirers = []
+        if old is not None:
+            requirers = self.dependencies.remove_node(old)
+        new.add_dependencies(self.dependencies, references)
+        self.dependencies.add_node(new, required_by=requirers)
+
+    def __delitem__(self, key):
+        '''Remove the resource with the specified name.'''
+        res = self.resources.pop(key)
+        self.dependencies.remove_node(res)
 
     def __contains__(self, key):
         '''Determine whether the stack contains the specified resource.'''
@@ -260,9 +317,36 @@ class Stack(object):
         if self.id is None:
             return
 
+        values = {'status': new_status, 'status_reason': reason}
+        if self.write_buffer is not None:
+            # Commit the stack state together with the outstanding writes of
+            # its resources, so it can never get ahead of them
+            self.write_buffer.stack_update(self.id, values)
+            self.write_buffer.flush()
+            return
+
         stack = db_api.stack_get(self.context, self.id)
-        stack.update_and_save({'status': new_status,
-                               'status_reason': reason})
+        stack.update_and_save(values)
+
+    @contextlib.contextmanager
+    def _buffered_writes(self):
+        '''
+        Buffer the database writes of the stack's resources for the duration
+        of an operation, yielding the WriteBuffer. The buffer must be flushed
+        at the end of each step of the operation's task; it is flushed again
+        when the operation ends. An operation started while another is in
+        progress shares its buffer.
+        '''
+        if self.write_buffer is not None:
+            yield self.write_buffer
+            return
+
+        self.write_buffer = write_buffer.WriteBuffer(self.context)
+        try:
+            yield self.write_buffer
+        finally:
+            writes, self.write_buffer = self.write_buffer, None
+            writes.flush()
 
     def timeout_secs(self):
         '''
@@ -278,8 +362,9 @@ class Stack(object):
         '''
         Create the stack and all of the resources.
         '''
-        creator = scheduler.TaskRunner(self.create_task)
-        creator(timeout=self.timeout_secs())
+        with self._buffered_writes() as writes:
+            creator = scheduler.TaskRunner(writes.flushing(self.create_task))
+            creator(timeout=self.timeout_secs())
 
     @scheduler.wrappertask
     def create_task(self):
@@ -295,8 +380,12 @@ class Stack(object):
         def resource_create(r):
             return r.create
 
+        def resource_weight(r):
+            return r.estimated_create_time()
+
         create_task = scheduler.DependencyTaskGroup(self.dependencies,
-                                                    resource_create)
+                                                    resource_create,
+                                                    weight=resource_weight)
 
         try:
             yield create_task()
@@ -353,32 +442,90 @@ class Stack(object):
             r.cache_template()
 
         # Now make the resources match the new stack definition
-        with eventlet.Timeout(self.timeout_secs()) as tmo:
-            try:
-                # First delete any resources which are not in newstack
-                for res in reversed(self):
-                    if res.name not in newstack.keys():
-                        logger.debug("resource %s not found in updated stack"
-                                     % res.name + " definition, deleting")
-                        # res.destroy raises exception.ResourceFailure on error
-                        res.destroy()
-                        del self.resources[res.name]
-                        self.dependencies = self._get_dependencies(
-                            self.resources.itervalues())
-
-                # Then create any which are defined in newstack but not self
-                for res in newstack:
-                    if res.name not in self.keys():
-                        logger.debug("resource %s not found in current stack"
-                                     % res.name + " definition, adding")
-                        res.stack = self
-                        self[res.name] = res
-                        self.dependencies = self._get_dependencies(
-                            self.resources.itervalues())
-                        # res.create raises exception.ResourceFailure on error
-                        scheduler.TaskRunner(res.create)()
-
-                # Now (the hard part :) update existing resources
+        try:
+            with self._buffered_writes() as writes:
+                updater = scheduler.TaskRunner(
+                    writes.flushing(self._update_task), newstack)
+                updater(timeout=self.timeout_secs())
+        except scheduler.Timeout:
+            stack_status = self.UPDATE_FAILED
+            reason = 'Timed out'
+        except (exception.ResourceFailure,
+                exception.InvalidTemplateReference) as e:
+            reason = str(e) or "Error : %s" % type(e)
+
+            if action == self.UPDATE:
+                stack_status = self.UPDATE_FAILED
+                # If rollback is enabled, we do another update, with the
+                # existing template, so we roll back to the original state
+                if self.disable_rollback:
+                    stack_status = self.UPDATE_FAILED
+                else:
+                    oldstack = Stack(self.context, self.name, self.t,
+                                     self.parameters)
+                    self.update(oldstack, action=self.ROLLBACK)
+                    return
+            else:
+                stack_status = self.ROLLBACK_FAILED
+        else:
+            if action == self.UPDATE:
+                stack_status = self.UPDATE_COMPLETE
+                reason = 'Stack successfully updated'
+            else:
+                stack_status = self.ROLLBACK_COMPLETE
+                reason = 'Stack rollback completed'
+
+        self.state_set(stack_status, reason)
+
+        # flip the template & parameters to the newstack values
+        # Note we do this on success and failure, so the current
+        # stack resources are stored, even if one is in a failed
+        # state (otherwise we won't remove them on delete)
+        self.t = newstack.t
+        self.parameters = newstack.parameters
+        template_outputs = self.t[template.OUTPUTS]
+        self.outputs = self.resolve_static_data(template_outputs)
+        self.store()
+
+    @scheduler.wrappertask
+    def _update_task(self, newstack):
+        '''
+        A task to make the resources match the new stack definition.
+
+        The plan is fixed up front: resources which are not in newstack are
+        deleted, those which are only in newstack are created and the rest are
+        updated (or replaced) where their definitions differ. Deletions are
+        done first, in reverse dependency order; the remaining changes are
+        then made in the dependency order of newstack. In both cases,
+        resources that do not depend on one another are handled concurrently.
+        '''
+        removed = [r for r in self.keys() if r not in newstack]
+        added = [r for r in newstack.keys() if r not in self]
+
+        def resource_remove(res):
+            @scheduler.wrappertask
+            def remove():
+                if res.name in removed:
+                    logger.debug("resource %s not found in updated stack"
+                                 % res.name + " definition, deleting")
+                    # res.destroy raises exception.ResourceFailure on error
+                    yield res.destroy()
+                    del self[res.name]
+            remove.instrumentation_keys = res.instrumentation_keys
+            return remove
+
+        def resource_update(new_res):
+            @scheduler.wrappertask
+            def update():
+                if new_res.name in added:
+                    logger.debug("resource %s not found in current stack"
+                                 % new_res.name + " definition, adding")
+                    new_res.stack = self
+                    self[new_res.name] = new_res
+                    # res.create raises exception.ResourceFailure on error
+                    yield new_res.create()
+                    return
+
                 # The Resource base class allows equality-test of resources,
                 # based on the parsed template snippet for the resource.
                 # If this  test fails, we call the underlying resource.update
@@ -388,73 +535,49 @@ class Stack(object):
                 # optionally they may implement non-interruptive logic and
                 # return UPDATE_COMPLETE. If resources do not implement the
                 # handle_update method at all, update will fail.
-                for res in newstack:
-                    # Compare resolved pre/post update resource snippets,
-                    # note the new resource snippet is resolved in the context
-                    # of the existing stack (which is the stack being updated)
-                    old_snippet = self[res.name].parsed_template(cached=True)
-                    new_snippet = self.resolve_runtime_data(res.t)
-
-                    if old_snippet != new_snippet:
-                        # res.update raises exception.ResourceFailure on error
-                        # or exception.ResourceReplace if update requires
-                        # replacement
-                        try:
-                            self[res.name].update(new_snippet)
-                        except resource.UpdateReplace:
-                            # Resource requires replacement for update
-                            self[res.name].destroy()
-                            res.stack = self
-                            self[res.name] = res
-                            self.dependencies = self._get_dependencies(
-                                self.resources.itervalues())
-                            scheduler.TaskRunner(res.create)()
-                        else:
-                            logger.info("Resource %s for stack %s updated" %
-                                        (res.name, self.name))
-
-                if action == self.UPDATE:
-                    stack_status = self.UPDATE_COMPLETE
-                    reason = 'Stack successfully updated'
-                else:
-                    stack_status = self.ROLLBACK_COMPLETE
-                    reason = 'Stack rollback completed'
-
-            except eventlet.Timeout as t:
-                if t is tmo:
-                    stack_status = self.UPDATE_FAILED
-                    reason = 'Timed out waiting for %s' % str(res)
-                else:
-                    # not my timeout
-                    raise
-            except exception.ResourceFailure as e:
-                reason = str(e) or "Error : %s" % type(e)
-
-                if action == self.UPDATE:
-                    stack_status = self.UPDATE_FAILED
-                    # If rollback is enabled, we do another update, with the
-                    # existing template, so we roll back to the original state
-                    if self.disable_rollback:
-                        stack_status = self.UPDATE_FAILED
-                    else:
-                        oldstack = Stack(self.context, self.name, self.t,
-                                         self.parameters)
-                        self.update(oldstack, action=self.ROLLBACK)
-                        return
+                #
+                # Compare resolved pre/post update resource snippets,
+                # note the new resource snippet is resolved in the context
+                # of the existing stack (which is the stack being updated).
+                # This happens only once the resources it depends on have
+                # been updated, so that it picks up any replacements.
+                old_res = self[new_res.name]
+                old_snippet = old_res.parsed_template(cached=True)
+                new_snippet = self.resolve_runtime_data(new_res.t)
+                if old_snippet == new_snippet:
+                    return
+
+                # res.update raises exception.ResourceFailure on error
+                # or exception.ResourceReplace if update requires
+                # replacement
+                try:
+                    old_res.update(new_snippet)
+                except resource.UpdateReplace:
+                    # Resource requires replacement for update
+                    yield old_res.destroy()
+                    new_res.stack = self
+                    self[new_res.name] = new_res
+                    yield new_res.create()
                 else:
-                    stack_status = self.ROLLBACK_FAILED
-
-            self.state_set(stack_status, reason)
-
-            # flip the template & parameters to the newstack values
-            # Note we do this on success and failure, so the current
-            # stack resources are stored, even if one is in a failed
-            # state (otherwise we won't remove them on delete)
-            self.t = newstack.t
-            self.parameters = newstack.parameters
-            template_outputs = self.t[template.OUTPUTS]
-            self.outputs = self.resolve_static_data(template_outputs)
-            self.store()
+                    # Pick up any changes to the resource's dependencies. The
+                    # snippet it was updated with has had its references
+                    # resolved, so they are taken from the new template.
+                    self._relink(old_res, old_res, new_res._references())
+                    logger.info("Resource %s for stack %s updated" %
+                                (new_res.name, self.name))
+            # new_res belongs to newstack until it is added to this stack
+            update.instrumentation_keys = lambda: {
+                'resource_type': new_res.type(), 'stack': self.id}
+            return update
+
+        # The dependency graph is kept up to date as resources are added,
+        # removed and replaced.
+        yield scheduler.DependencyTaskGroup(self.dependencies,
+                                            resource_remove,
+                                            reverse=True)()
+
+        yield scheduler.DependencyTaskGroup(newstack.dependencies,
+                                            resource_update)()
 
     def delete(self, action=DELETE):
         '''
@@ -474,13 +597,25 @@ class Stack(object):
             return
 
         failures = []
-        for res in reversed(self):
-            try:
-                res.destroy()
-            except exception.ResourceFailure as ex:
-                logger.error('Failed to delete %s error: %s' % (str(res),
-                                                                str(ex)))
-                failures.append(str(res))
+
+        def resource_destroy(res):
+            @scheduler.wrappertask
+            def destroy():
+                try:
+                    yield res.destroy()
+                except exception.ResourceFailure as ex:
+                    logger.error('Failed to delete %s error: %s' % (str(res),
+                                                                    str(ex)))
+                    failures.append(str(res))
+            destroy.instrumentation_keys = res.instrumentation_keys
+            return destroy
+
+        # Resources that do not depend on one another are deleted concurrently
+        destroyer = scheduler.DependencyTaskGroup(self.dependencies,
+                                                  resource_destroy,
+                                                  reverse=True)
+        with self._buffered_writes() as writes:
+            scheduler.TaskRunner(writes.flushing(destroyer))()
 
         if failures:
             if action == self.DELETE:
@@ -495,6 +630,8 @@ class Stack(object):
             elif action == self.ROLLBACK:
                 self.state_set(self.ROLLBACK_COMPLETE, 'Rollback completed')
             db_api.stack_delete(self.context, self.id)
+            if scheduler.instrumentation is not None:
+                scheduler.instrumentation.forget('stack', self.id)
             self.id = None
 
     def output(self, key):
@@ -514,7 +651,7 @@ class Stack(object):
 
         for res in reversed(deps):
             try:
-                res.destroy()
+                scheduler.TaskRunner(res.destroy)()
             except exception.ResourceFailure as ex:
                 failed = True
                 logger.error('delete: %s' % str(ex))
@@ -545,6 +682,61 @@ class Stack(object):
         return resolve_runtime_data(self.t, self.resources, snippet)
 
 
+class StackSummary(object):
+    '''
+    A read-only view of a stored stack, built directly from its database row.
+
+    This provides the top-level details of a stack (as used by
+    api.format_stack()) without creating its resources, resolving its data or
+    calculating its dependencies. The template and parameters are loaded only
+    if they are accessed.
+    '''
+
+    CREATE_COMPLETE = Stack.CREATE_COMPLETE
+    UPDATE_COMPLETE = Stack.UPDATE_COMPLETE
+
+    def __init__(self, context, stack):
+        '''Initialise from a context and a stack database row.'''
+        self.context = context
+        self.id = stack.id
+        self.name = stack.name
+        self.state = stack.status
+        self.state_description = stack.status_reason
+        self.timeout_mins = stack.timeout
+        self.disable_rollback = stack.disable_rollback
+        self.created_time = stack.created_at
+        self.updated_time = stack.updated_at
+        self.outputs = {}
+        self._raw_template_id = stack.raw_template_id
+        self._user_params = stack.parameters
+        self._template = None
+        self._parameters = None
+
+    def identifier(self):
+        '''
+        Return an identifier for this stack.
+        '''
+        return identifier.HeatIdentifier(self.context.tenant_id,
+                                         self.name, self.id)
+
+    @property
+    def t(self):
+        '''The stack's Template, loaded on first use.'''
+        if self._template is None:
+            self._template = Template.load(self.context,
+                                           self._raw_template_id)
+        return self._template
+
+    @property
+    def parameters(self):
+        '''The stack's Parameters, loaded on first use.'''
+        if self._parameters is None:
+            self._parameters = Parameters(self.name, self.t,
+                                          self._user_params)
+            self._parameters.set_stack_id(self.identifier().arn())
+        return self._parameters
+
+
 def resolve_static_data(template, stack, parameters, snippet):
     '''
     Resolve static parameters, map lookups, etc. in a template.
@@ -558,24 +750,13 @@ def resolve_static_data(template, stack, parameters, snippet):
     >>> resolve_static_data(template, None, parameters, {'Ref': 'KeyName'})
     'my_key'
     '''
-    return transform(snippet,
-                     [functools.partial(template.resolve_param_refs,
-                                        parameters=parameters),
-                      functools.partial(template.resolve_availability_zones,
-                                        stack=stack),
-                      template.resolve_find_in_map,
-                      template.reduce_joins])
+    evaluator = template.static_evaluator(stack, parameters)
+    return evaluator(snippet)
 
 
 def resolve_runtime_data(template, resources, snippet):
-    return transform(snippet,
-                     [functools.partial(template.resolve_resource_refs,
-                                        resources=resources),
-                      functools.partial(template.resolve_attributes,
-                                        resources=resources),
-                      template.resolve_select,
-                      template.resolve_joins,
-                      template.resolve_base64])
+    evaluator = template.runtime_evaluator(resources)
+    return evaluator(snippet)
 
 
 def transform(data, transformations):
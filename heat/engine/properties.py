@@ -17,6 +17,7 @@ import collections
 import re
 
 from heat.common import exception
+from heat.engine import template
 
 
 SCHEMA_KEYS = (
@@ -49,6 +50,15 @@ class Property(object):
         assert self.type() in SCHEMA_TYPES,\
             'Unknown property type "%s"' % self.type()
 
+        # Compile the parts of the schema needed for validation up front, since
+        # the Property is shared by every resource with the same schema
+        self._pattern = None
+        if PATTERN in self.schema:
+            self._pattern = re.compile(self.schema[PATTERN])
+        self._item = None
+        if self.type() == LIST and SCHEMA in self.schema:
+            self._item = Property(self.schema[SCHEMA])
+
     def required(self):
         return self.schema.get(REQUIRED, False)
 
@@ -97,12 +107,11 @@ class Property(object):
 
         self._check_allowed(value)
 
-        if PATTERN in self.schema:
-            pattern = self.schema[PATTERN]
-            match = re.match(pattern, value)
+        if self._pattern is not None:
+            match = self._pattern.match(value)
             if match is None or match.end() != len(value):
                 raise ValueError('"%s" does not match pattern "%s"' %
-                                 (value, pattern))
+                                 (value, self.schema[PATTERN]))
 
         return value
 
@@ -112,7 +121,7 @@ class Property(object):
 
         if SCHEMA in self.schema:
             children = dict(Properties(self.schema[SCHEMA], value,
-                                       parent_name=self.name))
+                                       parent_name=self.name, owner=self))
         else:
             children = value
 
@@ -126,9 +135,8 @@ class Property(object):
         for v in value:
             self._check_allowed(v)
 
-        if SCHEMA in self.schema:
-            prop = Property(self.schema[SCHEMA])
-            children = [prop.validate_data(d) for d in value]
+        if self._item is not None:
+            children = [self._item.validate_data(d) for d in value]
         else:
             children = value
 
@@ -161,16 +169,37 @@ class Property(object):
             return self._validate_bool(value)
 
 
+def compile_schema(schema, owner=None):
+    '''
+    Return a dict of Property objects for a properties schema. If an owner
+    (e.g. the resource class that the schema belongs to) is given, the result
+    is stored on it, so that the schema is compiled only once for as long as
+    the owner's schema is not replaced.
+    '''
+    compiled = getattr(owner, '_compiled_schema', None)
+    if compiled is not None and compiled[0] is schema:
+        return compiled[1]
+
+    props = dict((k, Property(s, k)) for k, s in schema.items())
+    if owner is not None:
+        owner._compiled_schema = (schema, props)
+    return props
+
+
 class Properties(collections.Mapping):
 
-    def __init__(self, schema, data, resolver=lambda d: d, parent_name=None):
-        self.props = dict((k, Property(s, k)) for k, s in schema.items())
+    def __init__(self, schema, data, resolver=lambda d: d, parent_name=None,
+                 owner=None):
+        self.props = compile_schema(schema, owner)
         self.resolve = resolver
         self.data = data
         if parent_name is None:
             self.error_prefix = ''
         else:
             self.error_prefix = parent_name + ': '
+        # The data and validated value of each property that contains no
+        # intrinsic functions, and so does not depend on the state of the stack
+        self._values = {}
 
     def validate(self, with_value=True):
         for (key, prop) in self.props.items():
@@ -198,11 +227,19 @@ class Properties(collections.Mapping):
         prop = self.props[key]
 
         if key in self.data:
-            value = self.resolve(self.data[key])
+            data = self.data[key]
+            cached = self._values.get(key)
+            if cached is not None and cached[0] is data:
+                return cached[1]
+
+            value = self.resolve(data)
             try:
-                return prop.validate_data(value)
+                value = prop.validate_data(value)
             except ValueError as e:
                 raise ValueError(self.error_prefix + '%s %s' % (key, str(e)))
+            if template.is_constant(data):
+                self._values[key] = (data, value)
+            return value
         elif prop.has_default():
             return prop.default()
         elif prop.required():
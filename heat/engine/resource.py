@@ -14,7 +14,9 @@
 #    under the License.
 
 import base64
+import copy
 from datetime import datetime
+import itertools
 from eventlet.support import greenlets as greenlet
 
 from heat.engine import event
@@ -22,6 +24,8 @@ from heat.common import exception
 from heat.openstack.common import excutils
 from heat.db import api as db_api
 from heat.common import identifier
+from heat.engine import scheduler
+from heat.engine import template
 from heat.engine import timestamp
 from heat.engine.properties import Properties
 
@@ -32,12 +36,26 @@ logger = logging.getLogger(__name__)
 
 _resource_classes = {}
 
+# Incremented whenever a resource type is registered, so that anything derived
+# from the set of registered types can tell when it is out of date
+_registry_generation = 0
+
+# Moving average of the time (in seconds) taken to create each type of
+# resource, used to estimate the critical path through a stack
+_create_durations = {}
+_CREATE_DURATION_WEIGHT = 0.3
+
 
 def get_types():
     '''Return an iterator over the list of valid resource types.'''
     return iter(_resource_classes)
 
 
+def registry_generation():
+    '''Return a number that changes whenever resource types are registered.'''
+    return _registry_generation
+
+
 def get_class(resource_type):
     '''Return the Resource class for a given resource type.'''
     cls = _resource_classes.get(resource_type)
@@ -48,13 +66,22 @@ def get_class(resource_type):
         return cls
 
 
+def _record_create_duration(resource_type, duration):
+    previous = _create_durations.get(resource_type)
+    if previous is not None:
+        duration = previous + _CREATE_DURATION_WEIGHT * (duration - previous)
+    _create_durations[resource_type] = duration
+
+
 def _register_class(resource_type, resource_class):
     logger.info(_('Registering resource type %s') % resource_type)
     if resource_type in _resource_classes:
         logger.warning(_('Replacing existing resource type %s') %
                        resource_type)
 
+    global _registry_generation
     _resource_classes[resource_type] = resource_class
+    _registry_generation += 1
 
 
 class UpdateReplace(Exception):
@@ -74,8 +101,8 @@ class UpdateReplace(Exception):
 
 class Metadata(object):
     '''
-    A descriptor for accessing the metadata of a resource while ensuring the
-    most up-to-date data is always obtained from the database.
+    A descriptor for accessing the metadata of a resource. The metadata is
+    read from the database at most once until the resource is refreshed.
     '''
 
     def __get__(self, resource, resource_class):
@@ -84,16 +111,20 @@ class Metadata(object):
             return None
         if resource.id is None:
             return resource.parsed_template('Metadata')
-        rs = db_api.resource_get(resource.stack.context, resource.id)
-        rs.refresh(attrs=['rsrc_metadata'])
-        return rs.rsrc_metadata
+
+        columns = resource._db_columns
+        if 'rsrc_metadata' not in columns:
+            rs = db_api.resource_get(resource.stack.context, resource.id)
+            rs.refresh(attrs=['rsrc_metadata'])
+            columns['rsrc_metadata'] = copy.deepcopy(rs.rsrc_metadata)
+        return columns['rsrc_metadata']
 
     def __set__(self, resource, metadata):
         '''Update the metadata for the owning resource.'''
         if resource.id is None:
             raise exception.ResourceNotAvailable(resource_name=resource.name)
-        rs = db_api.resource_get(resource.stack.context, resource.id)
-        rs.update_and_save({'rsrc_metadata': metadata})
+        resource._db_update({'rsrc_metadata': metadata})
+        resource._db_columns['rsrc_metadata'] = copy.deepcopy(metadata)
 
 
 class Resource(object):
@@ -108,9 +139,19 @@ class Resource(object):
     UPDATE_FAILED = 'UPDATE_FAILED'
     UPDATE_COMPLETE = 'UPDATE_COMPLETE'
 
+    # While the stack is buffering its writes, changes to any other state are
+    # committed to the database immediately
+    BUFFERED_STATES = (CREATE_IN_PROGRESS, DELETE_IN_PROGRESS,
+                       UPDATE_IN_PROGRESS)
+
     # If True, this resource must be created before it can be referenced.
     strict_dependency = True
 
+    # The backend service (e.g. 'nova') whose API is driven when creating or
+    # deleting this resource. Such operations are subject to the engine's
+    # concurrency and rate limits; those of resources with no backend are not.
+    backend_service = None
+
     created_time = timestamp.Timestamp(db_api.resource_get, 'created_at')
     updated_time = timestamp.Timestamp(db_api.resource_get, 'updated_at')
 
@@ -144,19 +185,25 @@ class Resource(object):
         self.name = name
         self.json_snippet = json_snippet
         self.t = stack.resolve_static_data(json_snippet)
+        # The unresolved snippet from which self.t was derived
+        self._t_source = json_snippet
         self.cached_t = None
         self.properties = Properties(self.properties_schema,
                                      self.t.get('Properties', {}),
                                      self.stack.resolve_runtime_data,
-                                     self.name)
+                                     self.name, owner=type(self))
 
-        resource = db_api.resource_get_by_name_and_stack(self.context,
-                                                         name, stack.id)
+        # Columns of the database row that are read lazily through the
+        # created_time, updated_time and metadata descriptors
+        self._db_columns = {}
+
+        resource = stack.db_resource_get(name)
         if resource:
             self.resource_id = resource.nova_instance
             self.state = resource.state
             self.state_description = resource.state_description
             self.id = resource.id
+            self._cache_row(resource)
         else:
             self.resource_id = None
             self.state = None
@@ -198,10 +245,10 @@ class Resource(object):
         else:
             t = self.t
         if section is None:
-            template = t
+            snippet = t
         else:
-            template = t.get(section, default)
-        return self.stack.resolve_runtime_data(template)
+            snippet = t.get(section, default)
+        return self.stack.resolve_runtime_data(snippet)
 
     def cache_template(self):
         '''
@@ -270,29 +317,40 @@ class Resource(object):
     def __str__(self):
         return '%s "%s"' % (self.__class__.__name__, self.name)
 
-    def _add_dependencies(self, deps, head, fragment):
-        if isinstance(fragment, dict):
-            for key, value in fragment.items():
-                if key in ('DependsOn', 'Ref', 'Fn::GetAtt'):
-                    if key == 'Fn::GetAtt':
-                        value, head = value
-
-                    try:
-                        target = self.stack.resources[value]
-                    except KeyError:
-                        raise exception.InvalidTemplateReference(
-                            resource=value,
-                            key=head)
-                    if key == 'DependsOn' or target.strict_dependency:
-                        deps += (self, target)
-                else:
-                    self._add_dependencies(deps, key, value)
-        elif isinstance(fragment, list):
-            for item in fragment:
-                self._add_dependencies(deps, head, item)
-
-    def add_dependencies(self, deps):
-        self._add_dependencies(deps, None, self.t)
+    def _references(self):
+        '''
+        Return a list of the references to other resources in the resource's
+        definition, in the form returned by template.references().
+
+        Where the definition comes straight from the stack's template, the
+        template's cached index is used in place of walking the snippet again,
+        unless the references depend on static resolution. Parameter
+        references are excluded, since they have already been resolved in
+        self.t.
+        '''
+        tmpl = self.stack.t
+        refs = None
+        if self._t_source is tmpl[template.RESOURCES].get(self.name):
+            refs = tmpl.resource_references()[self.name]
+        if refs is None:
+            return template.references(self.t)
+
+        parameters = self.stack.parameters
+        return [(key, target, head)
+                for key, target, head in refs
+                if key != 'Ref' or target not in parameters]
+
+    def add_dependencies(self, deps, references=None):
+        if references is None:
+            references = self._references()
+        for key, target_name, head in references:
+            try:
+                target = self.stack.resources[target_name]
+            except KeyError:
+                raise exception.InvalidTemplateReference(resource=target_name,
+                                                         key=head)
+            if key == 'DependsOn' or target.strict_dependency:
+                deps += (self, target)
         deps += (self, None)
 
     def keystone(self):
@@ -324,19 +382,30 @@ class Resource(object):
         # the parser.Stack is stored (which is after the resources
         # are __init__'d, but before they are create()'d)
         self.t = self.stack.resolve_static_data(self.json_snippet)
+        self._t_source = self.json_snippet
         self.properties = Properties(self.properties_schema,
                                      self.t.get('Properties', {}),
                                      self.stack.resolve_runtime_data,
-                                     self.name)
+                                     self.name, owner=type(self))
+        admission = self._admission()
         try:
             self.properties.validate()
+            while not admission.acquire():
+                yield admission.wait_time()
             self.state_set(self.CREATE_IN_PROGRESS)
+            started = scheduler.wallclock()
             create_data = None
+            wait_first = False
             if callable(getattr(self, 'handle_create', None)):
                 create_data = self.handle_create()
-                yield
+                # Give the backend a chance to make progress before we
+                # start polling it for completion
+                wait_first = self._overrides('check_create_complete')
+            poll_intervals = self.poll_intervals(create_data)
+            if wait_first:
+                yield next(poll_intervals)
             while not self.check_create_complete(create_data):
-                yield
+                yield next(poll_intervals)
         except greenlet.GreenletExit:
             # Older versions of greenlet erroneously had GreenletExit inherit
             # from Exception instead of BaseException
@@ -358,6 +427,42 @@ class Resource(object):
                     logger.exception('Error marking resource as failed')
         else:
             self.state_set(self.CREATE_COMPLETE)
+            _record_create_duration(self.type(),
+                                    scheduler.wallclock() - started)
+        finally:
+            admission.release()
+
+    def estimated_create_time(self):
+        '''
+        Return the expected time (in seconds) to create the resource, based on
+        recent creations of resources of the same type, or a nominal one
+        second if there are none.
+        '''
+        return _create_durations.get(self.type(), 1.0)
+
+    def instrumentation_keys(self):
+        '''
+        Return the categories under which statistics for the resource's tasks
+        are aggregated.
+        '''
+        return {'resource_type': self.type(), 'stack': self.stack.id}
+
+    def _admission(self):
+        '''
+        Return an Admission with which to wait for the engine's task limiter
+        to allow an operation on the resource to start.
+        '''
+        tenant = getattr(self.context, 'tenant_id', None)
+        return scheduler.limiter.admission(tenant, self.backend_service)
+
+    def _overrides(self, method_name):
+        '''
+        Return True if this resource's class customises the named method of
+        the Resource base class.
+        '''
+        method = getattr(type(self), method_name)
+        base_method = getattr(Resource, method_name)
+        return getattr(method, 'im_func', method) is not base_method.im_func
 
     def check_create_complete(self, create_data):
         '''
@@ -369,6 +474,31 @@ class Resource(object):
         '''
         return True
 
+    def check_delete_complete(self, delete_data):
+        '''
+        Check if the resource is deleted (ready to move to the DELETE_COMPLETE
+        state). By default this happens as soon as the handle_delete() method
+        has completed successfully, but subclasses may customise this by
+        overriding this function. The return value of handle_delete() (or
+        handle_snapshot_delete()) is passed in to this function each time it
+        is called.
+        '''
+        return True
+
+    def poll_intervals(self, handler_data):
+        '''
+        Return an iterator over the intervals (in seconds) to wait between
+        successive calls to check_create_complete() or check_delete_complete().
+        An interval of None leaves the choice to the scheduler. Subclasses that
+        poll a slow backend may override this to avoid checking on it too
+        often. The return value of the handler is passed in to this function;
+        where that is a TaskRunner, the intervals requested by its task are
+        used by default.
+        '''
+        if isinstance(handler_data, scheduler.TaskRunner):
+            return (handler_data.poll_interval() for i in itertools.count())
+        return itertools.repeat(None)
+
     def update(self, json_snippet=None):
         '''
         update the resource. Subclasses should provide a handle_update() method
@@ -387,7 +517,7 @@ class Resource(object):
             properties = Properties(self.properties_schema,
                                     json_snippet.get('Properties', {}),
                                     self.stack.resolve_runtime_data,
-                                    self.name)
+                                    self.name, owner=type(self))
             properties.validate()
             tmpl_diff = self.update_template_diff(json_snippet)
             prop_diff = self.update_template_diff_properties(json_snippet)
@@ -403,6 +533,7 @@ class Resource(object):
             raise failure
         else:
             self.t = self.stack.resolve_static_data(json_snippet)
+            self._t_source = json_snippet
             self.state_set(self.UPDATE_COMPLETE)
 
     def physical_resource_name(self):
@@ -442,16 +573,24 @@ class Resource(object):
 
         logger.info('deleting %s' % str(self))
 
+        admission = self._admission()
         try:
+            while not admission.acquire():
+                yield admission.wait_time()
             self.state_set(self.DELETE_IN_PROGRESS)
 
+            delete_data = None
             deletion_policy = self.t.get('DeletionPolicy', 'Delete')
             if deletion_policy == 'Delete':
                 if callable(getattr(self, 'handle_delete', None)):
-                    self.handle_delete()
+                    delete_data = self.handle_delete()
             elif deletion_policy == 'Snapshot':
                 if callable(getattr(self, 'handle_snapshot_delete', None)):
-                    self.handle_snapshot_delete(initial_state)
+                    delete_data = self.handle_snapshot_delete(initial_state)
+
+            poll_intervals = self.poll_intervals(delete_data)
+            while not self.check_delete_complete(delete_data):
+                yield next(poll_intervals)
         except Exception as ex:
             logger.exception('Delete %s', str(self))
             failure = exception.ResourceFailure(ex)
@@ -465,12 +604,15 @@ class Resource(object):
                     logger.exception('Error marking resource deletion failed')
         else:
             self.state_set(self.DELETE_COMPLETE)
+        finally:
+            admission.release()
 
+    @scheduler.wrappertask
     def destroy(self):
         '''
         Delete the resource and remove it from the database.
         '''
-        self.delete()
+        yield self.delete()
 
         if self.id is None:
             return
@@ -483,16 +625,58 @@ class Resource(object):
             pass
 
         self.id = None
+        self.refresh()
+
+    def refresh(self):
+        '''
+        Discard the cached columns of the resource's database row, so that
+        the timestamps and metadata are read again on their next access.
+        '''
+        self._db_columns = {}
+
+    def _cache_row(self, rs):
+        '''Cache the lazily-read columns of the resource's database row.'''
+        self._db_columns = {'created_at': rs.created_at,
+                            'updated_at': rs.updated_at,
+                            'rsrc_metadata': copy.deepcopy(rs.rsrc_metadata)}
+
+    def _db_update(self, values):
+        '''
+        Update columns of the resource's database row, or add the update to
+        the stack's write buffer if it has one.
+        '''
+        writes = self.stack.write_buffer
+        if writes is not None:
+            writes.resource_update(self.id, values)
+            self._db_columns.pop('updated_at', None)
+        else:
+            rs = db_api.resource_get(self.context, self.id)
+            rs.update_and_save(values)
+            self._db_columns['updated_at'] = rs.updated_at
+
+    def _stack_updated(self):
+        '''Update the stack's timestamp after a change to the resource.'''
+        now = datetime.utcnow()
+        writes = self.stack.write_buffer
+        if writes is not None:
+            writes.stack_update(self.stack.id, {'updated_at': now})
+        else:
+            self.stack.updated_time = now
 
     def resource_id_set(self, inst):
         self.resource_id = inst
         if self.id is not None:
             try:
-                rs = db_api.resource_get(self.context, self.id)
-                rs.update_and_save({'nova_instance': self.resource_id})
+                self._db_update({'nova_instance': self.resource_id})
             except Exception as ex:
                 logger.warn('db error %s' % str(ex))
 
+            # The physical resource can only be deleted if its id has been
+            # stored, so it must never wait for the end of the step
+            writes = self.stack.write_buffer
+            if writes is not None:
+                writes.flush()
+
     def _store(self):
         '''Create the resource in the database.'''
         try:
@@ -505,8 +689,9 @@ class Resource(object):
 
             new_rs = db_api.resource_create(self.context, rs)
             self.id = new_rs.id
+            self._cache_row(new_rs)
 
-            self.stack.updated_time = datetime.utcnow()
+            self._stack_updated()
 
         except Exception as ex:
             logger.error('DB error %s' % str(ex))
@@ -518,7 +703,7 @@ class Resource(object):
                          self.resource_id, self.properties)
 
         try:
-            ev.store()
+            ev.store(self.stack.write_buffer)
         except Exception as ex:
             logger.error('DB error %s' % str(ex))
 
@@ -528,12 +713,11 @@ class Resource(object):
 
         if self.id is not None:
             try:
-                rs = db_api.resource_get(self.context, self.id)
-                rs.update_and_save({'state': self.state,
-                                    'state_description': reason,
-                                    'nova_instance': self.resource_id})
+                self._db_update({'state': self.state,
+                                 'state_description': reason,
+                                 'nova_instance': self.resource_id})
 
-                self.stack.updated_time = datetime.utcnow()
+                self._stack_updated()
             except Exception as ex:
                 logger.error('DB error %s' % str(ex))
 
@@ -550,6 +734,10 @@ class Resource(object):
         if new_state != old_state:
             self._add_event(new_state, reason)
 
+        writes = self.stack.write_buffer
+        if writes is not None and new_state not in self.BUFFERED_STATES:
+            writes.flush()
+
     def FnGetRefId(self):
         '''
         http://docs.amazonwebservices.com/AWSCloudFormation/latest/UserGuide/\
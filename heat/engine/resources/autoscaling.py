@@ -97,7 +97,7 @@ class InstanceGroup(resource.Resource):
             self.properties = Properties(self.properties_schema,
                                          json_snippet.get('Properties', {}),
                                          self.stack.resolve_runtime_data,
-                                         self.name)
+                                         self.name, owner=type(self))
 
             # Get the current capacity, we may need to adjust if
             # Size has changed
@@ -133,10 +133,15 @@ class InstanceGroup(resource.Resource):
         if self.resource_id is not None:
             inst_list = self.resource_id.split(',')
             logger.debug('handle_delete %s' % str(inst_list))
-            for victim in inst_list:
-                logger.debug('handle_delete %s' % victim)
-                inst = self._make_instance(victim)
-                inst.destroy()
+            instances = [self._make_instance(victim) for victim in inst_list]
+            group = scheduler.PollingTaskGroup(inst.destroy
+                                               for inst in instances)
+            destroyer = scheduler.TaskRunner(group)
+            destroyer.start()
+            return destroyer
+
+    def check_delete_complete(self, destroyer):
+        return destroyer is None or destroyer.step()
 
     @scheduler.wrappertask
     def _scale(self, instance_task, indices):
@@ -186,7 +191,7 @@ class InstanceGroup(resource.Resource):
             del_list = inst_list[new_capacity:]
             for victim in reversed(del_list):
                 inst = self._make_instance(victim)
-                inst.destroy()
+                scheduler.TaskRunner(inst.destroy)()
                 inst_list.remove(victim)
                 self.resource_id_set(','.join(inst_list))
 
@@ -211,9 +216,15 @@ class InstanceGroup(resource.Resource):
                 id_list.append(inst.FnGetRefId())
 
             for lb in self.properties['LoadBalancerNames']:
-                self.stack[lb].json_snippet['Properties']['Instances'] = \
-                    inst_list
-                self.stack[lb].update(self.stack[lb].json_snippet)
+                lb_resource = self.stack[lb]
+                # Template snippets are shared, so build a new one rather
+                # than modifying the existing one in place
+                lb_props = dict(lb_resource.json_snippet.get('Properties', {}))
+                lb_props['Instances'] = inst_list
+                lb_snippet = dict(lb_resource.json_snippet)
+                lb_snippet['Properties'] = lb_props
+                lb_resource.json_snippet = lb_snippet
+                lb_resource.update(lb_snippet)
 
     def FnGetRefId(self):
         return unicode(self.name)
@@ -286,7 +297,7 @@ class AutoScalingGroup(InstanceGroup, CooldownMixin):
             self.properties = Properties(self.properties_schema,
                                          json_snippet.get('Properties', {}),
                                          self.stack.resolve_runtime_data,
-                                         self.name)
+                                         self.name, owner=type(self))
 
             # Get the current capacity, we may need to adjust if
             # MinSize or MaxSize has changed
@@ -414,7 +425,7 @@ class ScalingPolicy(resource.Resource, CooldownMixin):
             self.properties = Properties(self.properties_schema,
                                          json_snippet.get('Properties', {}),
                                          self.stack.resolve_runtime_data,
-                                         self.name)
+                                         self.name, owner=type(self))
 
     def alarm(self):
         if self._cooldown_inprogress():
@@ -23,6 +23,8 @@ logger = logging.getLogger(__name__)
 
 
 class ElasticIp(resource.Resource):
+    backend_service = 'nova'
+
     properties_schema = {'Domain': {'Type': 'String',
                                     'Implemented': False},
                          'InstanceId': {'Type': 'String'}}
@@ -66,6 +68,8 @@ class ElasticIp(resource.Resource):
 
 
 class ElasticIpAssociation(resource.Resource):
+    backend_service = 'nova'
+
     properties_schema = {'InstanceId': {'Type': 'String',
                                         'Required': True},
                          'EIP': {'Type': 'String'},
@@ -63,6 +63,8 @@ class Restarter(resource.Resource):
 
 
 class Instance(resource.Resource):
+    backend_service = 'nova'
+
     # AWS does not require InstanceType but Heat does because the nova
     # create api call requires a flavor
     tags_schema = {'Key': {'Type': 'String',
@@ -380,6 +382,15 @@ class Instance(resource.Resource):
         else:
             return volume_attach.step()
 
+    def poll_intervals(self, cookie):
+        if isinstance(cookie, scheduler.TaskRunner):
+            # Deleting, so use the intervals requested by the delete task
+            return super(Instance, self).poll_intervals(cookie)
+
+        # Servers take a while to boot, so back off rather than polling Nova
+        # at a fixed rate
+        return scheduler.exponential_backoff(maximum=10)
+
     def volumes(self):
         """
         Return an iterator over (volume_id, device) tuples for all volumes
@@ -434,37 +445,50 @@ class Instance(resource.Resource):
         '''
         server.delete()
 
-        while True:
-            yield
+        for interval in scheduler.exponential_backoff(0.2, maximum=5):
+            yield interval
 
             try:
                 server.get()
             except clients.novaclient.exceptions.NotFound:
                 break
 
-    def handle_delete(self):
+    @scheduler.wrappertask
+    def _delete_instance(self):
         '''
-        Delete an instance, blocking until it is disposed by OpenStack
+        Return a co-routine that detaches any volumes from the instance, then
+        deletes the server and waits for it to disappear from Nova.
         '''
-        if self.resource_id is None:
-            return
-
         detach_tasks = (volume.VolumeDetachTask(self.stack,
                                                 self.resource_id,
                                                 volume_id)
                         for volume_id, device in self.volumes())
-        scheduler.TaskRunner(scheduler.PollingTaskGroup(detach_tasks))()
+        yield scheduler.PollingTaskGroup(detach_tasks)()
 
         try:
             server = self.nova().servers.get(self.resource_id)
         except clients.novaclient.exceptions.NotFound:
             pass
         else:
-            delete = scheduler.TaskRunner(self._delete_server, server)
-            delete(wait_time=0.2)
+            yield self._delete_server(server)
 
         self.resource_id = None
 
+    def handle_delete(self):
+        '''
+        Start deleting an instance; check_delete_complete() waits for it to be
+        disposed by OpenStack
+        '''
+        if self.resource_id is None:
+            return
+
+        deleter = scheduler.TaskRunner(self._delete_instance)
+        deleter.start()
+        return deleter
+
+    def check_delete_complete(self, deleter):
+        return deleter is None or deleter.step()
+
 
 def resource_mapping():
     return {
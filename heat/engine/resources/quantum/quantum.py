@@ -22,6 +22,7 @@ logger = logging.getLogger(__name__)
 
 
 class QuantumResource(resource.Resource):
+    backend_service = 'quantum'
 
     def __init__(self, name, json_snippet, stack):
         super(QuantumResource, self).__init__(name, json_snippet, stack)
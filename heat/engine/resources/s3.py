@@ -25,6 +25,8 @@ logger = logging.getLogger(__name__)
 
 
 class S3Bucket(resource.Resource):
+    backend_service = 'swift'
+
     website_schema = {'IndexDocument': {'Type': 'String'},
                       'ErrorDocument': {'Type': 'String'}}
     properties_schema = {'AccessControl': {
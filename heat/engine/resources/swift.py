@@ -25,6 +25,8 @@ logger = logging.getLogger(__name__)
 
 
 class SwiftContainer(resource.Resource):
+    backend_service = 'swift'
+
     properties_schema = {
         'name': {'Type': 'String'},
         'X-Container-Read': {'Type': 'String'},
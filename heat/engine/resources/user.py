@@ -29,6 +29,8 @@ logger = logging.getLogger(__name__)
 
 
 class User(resource.Resource):
+    backend_service = 'keystone'
+
     properties_schema = {'Path': {'Type': 'String'},
                          'Groups': {'Type': 'List'},
                          'LoginProfile': {'Type': 'Map',
@@ -112,6 +114,8 @@ class User(resource.Resource):
 
 
 class AccessKey(resource.Resource):
+    backend_service = 'keystone'
+
     properties_schema = {'Serial': {'Type': 'Integer',
                                     'Implemented': False},
                          'UserName': {'Type': 'String',
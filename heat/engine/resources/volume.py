@@ -29,6 +29,7 @@ logger = logging.getLogger(__name__)
 
 
 class Volume(resource.Resource):
+    backend_service = 'cinder'
 
     properties_schema = {'AvailabilityZone': {'Type': 'String',
                                               'Required': True},
@@ -80,21 +81,29 @@ class Volume(resource.Resource):
         else:
             raise exception.Error(vol.status)
 
+    def poll_intervals(self, cookie):
+        if isinstance(cookie, scheduler.TaskRunner):
+            # Deleting, so use the intervals requested by the delete task
+            return super(Volume, self).poll_intervals(cookie)
+        return scheduler.exponential_backoff(maximum=10)
+
     def _backup(self):
         backup = self.cinder().backups.create(self.resource_id)
+        poll_intervals = scheduler.exponential_backoff(maximum=10)
         while backup.status == 'creating':
-            yield
+            yield next(poll_intervals)
             backup.get()
         if backup.status != 'available':
             raise exception.Error(backup.status)
 
+    @scheduler.wrappertask
     def _delete(self, backup=False):
         if self.resource_id is not None:
             try:
                 vol = self.cinder().volumes.get(self.resource_id)
 
                 if backup:
-                    scheduler.TaskRunner(self._backup)()
+                    yield self._backup()
                     vol.get()
 
                 if vol.status == 'in-use':
@@ -105,14 +114,22 @@ class Volume(resource.Resource):
             except clients.cinderclient.exceptions.NotFound:
                 pass
 
+    def _start_delete(self, backup=False):
+        deleter = scheduler.TaskRunner(self._delete, backup=backup)
+        deleter.start()
+        return deleter
+
     if volume_backups is not None:
         def handle_snapshot_delete(self, state):
             backup = state not in (self.CREATE_FAILED,
                                    self.UPDATE_FAILED)
-            return self._delete(backup=backup)
+            return self._start_delete(backup=backup)
 
     def handle_delete(self):
-        return self._delete()
+        return self._start_delete()
+
+    def check_delete_complete(self, deleter):
+        return deleter is None or deleter.step()
 
 
 class VolumeAttachTask(object):
@@ -154,9 +171,10 @@ class VolumeAttachTask(object):
         yield
 
         vol = self.clients.cinder().volumes.get(self.volume_id)
+        poll_intervals = scheduler.exponential_backoff(maximum=5)
         while vol.status == 'available' or vol.status == 'attaching':
             logger.debug('%s - volume status: %s' % (str(self), vol.status))
-            yield
+            yield next(poll_intervals)
             vol.get()
 
         if vol.status != 'in-use':
@@ -209,9 +227,10 @@ class VolumeDetachTask(object):
 
         try:
             vol.get()
+            poll_intervals = scheduler.exponential_backoff(maximum=5)
             while vol.status == 'in-use':
                 logger.debug('%s - volume still in use' % str(self))
-                yield
+                yield next(poll_intervals)
 
                 try:
                     server_api.delete_server_volume(self.server_id,
@@ -227,6 +246,8 @@ class VolumeDetachTask(object):
 
 
 class VolumeAttachment(resource.Resource):
+    backend_service = 'nova'
+
     properties_schema = {'InstanceId': {'Type': 'String',
                                         'Required': True},
                          'VolumeId': {'Type': 'String',
@@ -260,7 +281,12 @@ class VolumeAttachment(resource.Resource):
         server_id = self.properties[self._instance_property]
         volume_id = self.properties[self._volume_property]
         detach_task = VolumeDetachTask(self.stack, server_id, volume_id)
-        scheduler.TaskRunner(detach_task)()
+        detach_runner = scheduler.TaskRunner(detach_task)
+        detach_runner.start()
+        return detach_runner
+
+    def check_delete_complete(self, detach_runner):
+        return detach_runner is None or detach_runner.step()
 
 
 class CinderVolume(Volume):
@@ -232,6 +232,9 @@ class WaitCondition(resource.Resource):
                 logger.info('%s Timed out (%s)' % (str(self), str(timeout)))
                 raise timeout
 
+            # The handle is signalled by a separate request, so its metadata
+            # must be re-read from the database on each poll
+            handle.refresh()
             handle_status = handle.get_status()
 
             if any(s != STATUS_SUCCESS for s in handle_status):
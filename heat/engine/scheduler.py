@@ -13,11 +13,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import eventlet
+import eventlet.event
+import eventlet.queue
 import functools
+import heapq
 import itertools
 import sys
 import types
+import weakref
 from time import time as wallclock
 
 from heat.openstack.common import excutils
@@ -39,6 +44,326 @@ def task_description(task):
     return repr(task)
 
 
+def exponential_backoff(initial=1, factor=2, maximum=None):
+    """
+    Return an iterator over polling intervals (in seconds) that start at
+    `initial` and are multiplied by `factor` each time, up to an optional
+    `maximum`.
+
+    A task that polls for completion of an asynchronous operation may yield
+    these intervals to request that it not be stepped again until the given
+    time has elapsed.
+    """
+    interval = initial
+    while True:
+        if maximum is not None and interval > maximum:
+            interval = maximum
+        yield interval
+        interval *= factor
+
+
+class TokenBucket(object):
+    """
+    A token bucket, which is refilled continuously at a fixed rate up to a
+    maximum capacity.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        Initialise with the refill rate in tokens per second and (optionally)
+        the maximum number of tokens the bucket may hold, which is the size of
+        the largest burst allowed. The bucket starts out full.
+        """
+        self.rate = float(rate)
+        self.capacity = capacity if capacity is not None else max(rate, 1)
+        self._tokens = self.capacity
+        self._updated = wallclock()
+
+    def _refill(self):
+        now = wallclock()
+        self._tokens = min(self.capacity,
+                           self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def consume(self, tokens=1):
+        """
+        Remove the given number of tokens from the bucket and return True if
+        they are available; otherwise leave the bucket untouched and return
+        False.
+        """
+        self._refill()
+        if self._tokens < tokens:
+            return False
+
+        self._tokens -= tokens
+        return True
+
+    def wait_time(self, tokens=1):
+        """
+        Return the number of seconds until the given number of tokens will be
+        available.
+        """
+        self._refill()
+        return max(tokens - self._tokens, 0) / self.rate
+
+
+class TaskLimiter(object):
+    """
+    Admission control for tasks that drive a backend service.
+
+    Limits the number of such tasks that may be in flight at once, both in
+    total and for each tenant, as well as the rate at which tasks for each
+    backend service (e.g. nova, cinder, quantum or keystone) may be admitted.
+    Tasks that are not admitted are expected to wait and try again, rather
+    than fail. Waiting tasks for the same tenant and backend are admitted in
+    the order in which they first asked.
+    """
+
+    def __init__(self, max_tasks=0, max_tenant_tasks=0, backend_rates=None):
+        """
+        Initialise with the maximum number of tasks in flight in total and per
+        tenant (0 for no limit), and an optional dict mapping backend service
+        names to (rate, burst) pairs for the admission of tasks using them.
+        """
+        self.max_tasks = max_tasks
+        self.max_tenant_tasks = max_tenant_tasks
+        self._buckets = dict((backend, TokenBucket(rate, burst))
+                             for backend, (rate, burst)
+                             in (backend_rates or {}).iteritems())
+        self._in_flight = 0
+        self._tenant_in_flight = collections.defaultdict(int)
+        # Weak references to the waiting Admissions, oldest first, for each
+        # (tenant, backend) pair
+        self._waiters = {}
+
+    def admission(self, tenant=None, backend=None):
+        """
+        Return an Admission with which a task for the given tenant using the
+        given backend service can wait for its turn to run.
+        """
+        return Admission(self, tenant, backend)
+
+    def _admit(self, admission):
+        tenant, backend = admission.tenant, admission.backend
+        if backend is None:
+            return True
+
+        key = (tenant, backend)
+        waiters = self._waiters.setdefault(key, collections.deque())
+        if not admission._waiting:
+            waiters.append(weakref.ref(admission))
+            admission._waiting = True
+
+        # Skip any waiters that have gone away without giving up their place
+        while waiters[0]() is None:
+            waiters.popleft()
+        if waiters[0]() is not admission:
+            return False
+
+        if self.max_tasks and self._in_flight >= self.max_tasks:
+            return False
+        if (self.max_tenant_tasks and
+                self._tenant_in_flight[tenant] >= self.max_tenant_tasks):
+            return False
+        bucket = self._buckets.get(backend)
+        if bucket is not None and not bucket.consume():
+            return False
+
+        waiters.popleft()
+        if not waiters:
+            del self._waiters[key]
+        admission._waiting = False
+
+        self._in_flight += 1
+        self._tenant_in_flight[tenant] += 1
+        return True
+
+    def _cancel(self, admission):
+        key = (admission.tenant, admission.backend)
+        waiters = self._waiters.get(key)
+        if waiters is not None:
+            waiters = collections.deque(w for w in waiters
+                                        if w() not in (None, admission))
+            if waiters:
+                self._waiters[key] = waiters
+            else:
+                del self._waiters[key]
+        admission._waiting = False
+
+    def _release(self, tenant, backend):
+        if backend is None:
+            return
+
+        self._in_flight -= 1
+        self._tenant_in_flight[tenant] -= 1
+        if not self._tenant_in_flight[tenant]:
+            del self._tenant_in_flight[tenant]
+
+    def _wait_time(self, backend):
+        bucket = self._buckets.get(backend)
+        if bucket is None:
+            return None
+        return bucket.wait_time()
+
+
+class Admission(object):
+    """
+    A request by a single task to be admitted by a TaskLimiter. For example:
+
+        admission = limiter.admission(tenant, 'nova')
+        try:
+            while not admission.acquire():
+                yield admission.wait_time()
+
+            # ... do the work ...
+        finally:
+            admission.release()
+    """
+
+    def __init__(self, limiter, tenant, backend):
+        self._limiter = limiter
+        self.tenant = tenant
+        self.backend = backend
+        self._acquired = False
+        self._waiting = False
+
+    def acquire(self):
+        """Return True if the task has been admitted."""
+        if not self._acquired:
+            self._acquired = self._limiter._admit(self)
+        return self._acquired
+
+    def wait_time(self):
+        """
+        Return the interval (in seconds) after which to try again to acquire
+        admission, or None to let the scheduler decide.
+        """
+        return self._limiter._wait_time(self.backend)
+
+    def release(self):
+        """Give up the task's place, whether admitted or still waiting."""
+        if self._acquired:
+            self._limiter._release(self.tenant, self.backend)
+            self._acquired = False
+        elif self._waiting:
+            self._limiter._cancel(self)
+
+
+# The TaskLimiter that applies to resource tasks in the engine. By default,
+# no limits are imposed.
+limiter = TaskLimiter()
+
+
+class TaskStats(object):
+    """Timings and counters for a single run of an instrumented task."""
+
+    def __init__(self, name, keys):
+        self.name = name
+        self.keys = keys
+        self.started = wallclock()
+        self.finished = None
+        self.steps = 0
+        self.step_time = 0.0
+        self.timed_out = False
+        self.cancelled = False
+        self.failed = False
+
+    def ran(self, duration):
+        """Record time spent running the task."""
+        self.step_time += duration
+
+    def finish(self, failed=False):
+        """Record the end of the task."""
+        self.finished = wallclock()
+        self.failed = failed
+
+    def elapsed(self):
+        """Return the total (wallclock) running time of the task."""
+        return (self.finished or wallclock()) - self.started
+
+    def sleep_time(self):
+        """Return the time the task has spent waiting between steps."""
+        return max(self.elapsed() - self.step_time, 0)
+
+
+class Instrumentation(object):
+    """
+    Aggregated statistics for the tasks run by TaskRunners.
+
+    Totals are kept per category (e.g. resource type or stack) for each task
+    that identifies the categories it belongs to, by means of an
+    instrumentation_keys() function that returns a dict mapping category
+    names to keys. A task function may carry such a function as an attribute
+    of its own; otherwise, the owner of a task that is a bound method may
+    provide it as a method.
+    """
+
+    COUNTERS = ('started', 'finished', 'failed', 'timeouts', 'cancellations',
+                'steps', 'step_time', 'sleep_time', 'elapsed')
+
+    def __init__(self):
+        self._totals = collections.defaultdict(dict)
+
+    @staticmethod
+    def _keys(task):
+        get_keys = getattr(task, 'instrumentation_keys', None)
+        if get_keys is None:
+            owner = getattr(task, 'im_self', None)
+            get_keys = getattr(owner, 'instrumentation_keys', None)
+        if get_keys is None:
+            return {}
+        return get_keys()
+
+    def _counters(self, category, key):
+        totals = self._totals[category]
+        if key not in totals:
+            totals[key] = dict.fromkeys(self.COUNTERS, 0)
+        return totals[key]
+
+    def task_started(self, task):
+        """Return a new TaskStats with which to track a run of a task."""
+        stats = TaskStats(task_description(task), self._keys(task))
+        for category, key in stats.keys.iteritems():
+            self._counters(category, key)['started'] += 1
+        return stats
+
+    def task_finished(self, stats):
+        """Add the statistics for a completed task run to the totals."""
+        for category, key in stats.keys.iteritems():
+            counters = self._counters(category, key)
+            counters['finished'] += 1
+            counters['failed'] += int(stats.failed)
+            counters['timeouts'] += int(stats.timed_out)
+            counters['cancellations'] += int(stats.cancelled)
+            counters['steps'] += stats.steps
+            counters['step_time'] += stats.step_time
+            counters['sleep_time'] += stats.sleep_time()
+            counters['elapsed'] += stats.elapsed()
+
+    def forget(self, category, key):
+        """
+        Discard the totals for a key that will not be seen again (e.g. a stack
+        that has been deleted).
+        """
+        totals = self._totals.get(category)
+        if totals is not None:
+            totals.pop(key, None)
+
+    def report(self):
+        """
+        Return a dict mapping each category to a dict of the totals for each
+        key in that category.
+        """
+        return dict((category, dict((key, dict(counters))
+                                    for key, counters in totals.iteritems()))
+                    for category, totals in self._totals.iteritems())
+
+
+# The Instrumentation with which to record task statistics, or None to
+# disable instrumentation.
+instrumentation = None
+
+
 class Timeout(BaseException):
     """
     Timeout exception, raised within a task when it has exceeded its allotted
@@ -79,7 +404,8 @@ class TaskRunner(object):
         it is started.
 
         The task function may be a co-routine that yields control flow between
-        steps.
+        steps. If it yields a number, that is taken as the interval (in
+        seconds) that the task would like to wait before its next step.
         """
         assert callable(task), "Task is not callable"
 
@@ -89,6 +415,8 @@ class TaskRunner(object):
         self._runner = None
         self._done = False
         self._timeout = None
+        self._poll_interval = None
+        self._stats = None
         self.name = task_description(task)
 
     def __str__(self):
@@ -98,15 +426,16 @@ class TaskRunner(object):
     def _sleep(self, wait_time):
         """Sleep for the specified number of seconds."""
         if wait_time is not None:
-            logger.debug('%s sleeping' % str(self))
+            logger.debug('%s sleeping', self)
             eventlet.sleep(wait_time)
 
     def __call__(self, wait_time=1, timeout=None):
         """
         Start and run the task to completion.
 
-        The task will sleep for `wait_time` seconds between steps. To avoid
-        sleeping, pass `None` for `wait_time`.
+        The task will sleep for `wait_time` seconds between steps, unless it
+        requests a different polling interval. To avoid sleeping, pass `None`
+        for `wait_time`.
         """
         self.start(timeout=timeout)
         self.run_to_completion(wait_time=wait_time)
@@ -121,19 +450,51 @@ class TaskRunner(object):
         """
         assert self._runner is None, "Task already started"
 
-        logger.debug('%s starting' % str(self))
+        logger.debug('%s starting', self)
+
+        if instrumentation is not None:
+            self._stats = instrumentation.task_started(self._task)
 
         if timeout is not None:
             self._timeout = Timeout(self, timeout)
 
-        result = self._task(*self._args, **self._kwargs)
+        result = self._timed(self._task, *self._args, **self._kwargs)
         if isinstance(result, types.GeneratorType):
             self._runner = result
             self.step()
         else:
             self._runner = False
             self._done = True
-            logger.debug('%s done (not resumable)' % str(self))
+            logger.debug('%s done (not resumable)', self)
+            if self._stats is not None:
+                self._stats.steps += 1
+            self._finished()
+
+    def _timed(self, func, *args, **kwargs):
+        """
+        Call a function that runs (part of) the task, recording the time
+        spent in it if the task is instrumented.
+        """
+        if self._stats is None:
+            return func(*args, **kwargs)
+
+        started = wallclock()
+        try:
+            result = func(*args, **kwargs)
+        except:
+            with excutils.save_and_reraise_exception():
+                self._stats.ran(wallclock() - started)
+                self._finished(failed=True)
+
+        self._stats.ran(wallclock() - started)
+        return result
+
+    def _finished(self, failed=False):
+        """Record the end of an instrumented task."""
+        if self._stats is not None:
+            self._stats.finish(failed)
+            instrumentation.task_finished(self._stats)
+            self._stats = None
 
     def step(self):
         """
@@ -142,44 +503,85 @@ class TaskRunner(object):
         """
         if not self.done():
             assert self._runner is not None, "Task not started"
+            if self._stats is not None:
+                self._stats.steps += 1
+            self._timed(self._step)
+            if self._done:
+                self._finished()
 
-            if self._timeout is not None and self._timeout.expired():
-                logger.info('%s timed out' % str(self))
+        return self._done
 
-                try:
-                    self._runner.throw(self._timeout)
-                except StopIteration:
-                    self._done = True
-                else:
-                    # Clean up in case task swallows exception without exiting
-                    self.cancel()
+    def _step(self):
+        """Run the next step of the task."""
+        if self._timeout is not None and self._timeout.expired():
+            logger.info('%s timed out', self)
+            if self._stats is not None:
+                self._stats.timed_out = True
+
+            try:
+                self._runner.throw(self._timeout)
+            except StopIteration:
+                self._done = True
             else:
-                logger.debug('%s running' % str(self))
+                # Clean up in case task swallows exception without exiting
+                self._close()
+        else:
+            logger.debug('%s running', self)
 
-                try:
-                    next(self._runner)
-                except StopIteration:
-                    self._done = True
-                    logger.debug('%s complete' % str(self))
+            try:
+                interval = next(self._runner)
+            except StopIteration:
+                self._done = True
+                logger.debug('%s complete', self)
+            else:
+                if not isinstance(interval, (int, long, float)):
+                    interval = None
+                self._poll_interval = interval
 
-        return self._done
+    def poll_interval(self):
+        """
+        Return the interval (in seconds) that the task requested to wait
+        before its next step, or None if it expressed no preference.
+        """
+        return self._poll_interval
 
     def run_to_completion(self, wait_time=1):
         """
         Run the task to completion.
 
-        The task will sleep for `wait_time` seconds between steps. To avoid
-        sleeping, pass `None` for `wait_time`.
+        The task will sleep for `wait_time` seconds between steps, unless it
+        requests a different polling interval. To avoid sleeping, pass `None`
+        for `wait_time`.
         """
+        if reactor is not None and reactor.accepting():
+            reactor.run_to_completion(self, wait_time)
+            return
+
         while not self.step():
-            self._sleep(wait_time)
+            self._sleep(self._next_wait(wait_time))
+
+    def _next_wait(self, wait_time):
+        """
+        Return the time to wait before the next step when running to
+        completion with the given default `wait_time`.
+        """
+        if wait_time is not None and self._poll_interval is not None:
+            return self._poll_interval
+        return wait_time
 
     def cancel(self):
         """Cancel the task if it is running."""
         if self.started() and not self.done():
-            logger.debug('%s cancelled' % str(self))
-            self._runner.close()
-            self._done = True
+            if self._stats is not None:
+                self._stats.cancelled = True
+            self._close()
+            self._finished()
+
+    def _close(self):
+        """Stop the task running."""
+        logger.debug('%s cancelled', self)
+        self._runner.close()
+        self._done = True
 
     def started(self):
         """Return True if the task has been started."""
@@ -194,6 +596,156 @@ class TaskRunner(object):
         return not self.done()
 
 
+class Reactor(object):
+    """
+    A single loop that schedules the steps of the tasks being run to
+    completion throughout the engine, in order of the time at which each is
+    next due.
+
+    Rather than every task sleeping in its own thread between steps, the
+    thread that runs a task to completion waits for the reactor to complete it
+    on its behalf. The reactor loop itself never runs a step: each step is
+    dispatched to a thread of its own, so that a step which blocks (on a call
+    to a backend service, say, or on a subtask that it runs to completion)
+    delays only its own task.
+    """
+
+    class Job(object):
+        """A TaskRunner being run to completion by the reactor."""
+
+        def __init__(self, runner, wait_time):
+            self.runner = runner
+            self.wait_time = wait_time
+            self.done = eventlet.event.Event()
+            self.stepping = False
+            self.cancelled = False
+
+    def __init__(self):
+        self._queue = []
+        self._sequence = itertools.count()
+        self._incoming = eventlet.queue.LightQueue()
+        self._thread = None
+        self._stepping = 0
+        self._steps = 0
+        self._lag = 0
+        self._max_lag = 0
+
+    def accepting(self):
+        """
+        Return True if tasks run to completion should be handed over to the
+        reactor.
+        """
+        return self._thread is not None
+
+    def run_to_completion(self, runner, wait_time=1):
+        """
+        Run a started TaskRunner to completion in the reactor loop, blocking
+        the calling thread until it is done. Any exception raised by the task
+        is re-raised in the calling thread.
+        """
+        job = self.Job(runner, wait_time)
+        self._incoming.put((wallclock(), job))
+
+        try:
+            job.done.wait()
+        finally:
+            # If the calling thread is killed, the task goes with it. A step
+            # in progress is left to finish, and the task cancelled after it.
+            job.cancelled = True
+            if not job.stepping:
+                runner.cancel()
+
+    def _schedule(self, due, job):
+        heapq.heappush(self._queue, (due, next(self._sequence), job))
+
+    def _receive(self, timeout):
+        try:
+            self._schedule(*self._incoming.get(timeout=timeout))
+        except eventlet.queue.Empty:
+            return
+
+        while True:
+            try:
+                self._schedule(*self._incoming.get_nowait())
+            except eventlet.queue.Empty:
+                return
+
+    def _dispatch(self, now):
+        due, seq, job = heapq.heappop(self._queue)
+        if job.cancelled or job.runner.done():
+            # Cancelled by the thread waiting on it
+            return
+
+        self._lag = now - due
+        self._max_lag = max(self._max_lag, self._lag)
+        self._steps += 1
+
+        job.stepping = True
+        self._stepping += 1
+        eventlet.spawn_n(self._step, job)
+
+    def _step(self, job):
+        """Run a single step of a job, in a thread of its own."""
+        runner = job.runner
+        try:
+            complete = runner.step()
+        except:
+            job.done.send_exception(*sys.exc_info())
+            return
+        finally:
+            job.stepping = False
+            self._stepping -= 1
+
+        if job.cancelled:
+            runner.cancel()
+        elif complete:
+            job.done.send()
+        else:
+            interval = runner._next_wait(job.wait_time) or 0
+            self._incoming.put((wallclock() + interval, job))
+
+    def __call__(self):
+        """Run the reactor loop in the current thread until it is killed."""
+        assert self._thread is None, "Reactor already running"
+
+        self._thread = eventlet.getcurrent()
+        try:
+            while True:
+                timeout = None
+                if self._queue:
+                    timeout = max(self._queue[0][0] - wallclock(), 0)
+                self._receive(timeout)
+
+                now = wallclock()
+                while self._queue and self._queue[0][0] <= now:
+                    self._dispatch(now)
+
+                # Give the dispatched steps a chance to start
+                eventlet.sleep(0)
+        finally:
+            self._thread = None
+
+    def stats(self):
+        """
+        Return a dict of metrics for the reactor: the number of tasks in its
+        queue or being stepped, the number of steps it has run and the lag (in
+        seconds) between the time a step was due and the time it was
+        dispatched, for both the latest step and the worst so far.
+        """
+        waiting = [e for e in self._queue
+                   if not (e[2].cancelled or e[2].runner.done())]
+        return {'depth': (len(waiting) + self._stepping +
+                          self._incoming.qsize()),
+                'steps': self._steps,
+                'lag': self._lag,
+                'max_lag': self._max_lag}
+
+
+# The Reactor that runs tasks to completion in the engine, if any. When there
+# is none, each task is run in the thread that started it.
+reactor = None
+
+
 def wrappertask(task):
     """
     Decorator for a task that needs to drive a subtask.
@@ -249,14 +801,20 @@ class DependencyTaskGroup(object):
     """
 
     def __init__(self, dependencies, make_task=lambda o: o,
-                 reverse=False, name=None):
+                 reverse=False, name=None, weight=lambda o: 1):
         """
         Initialise with the task dependencies and (optionally) a function for
         creating a task from each dependency object.
+
+        When several subtasks are ready to run at once, those at the head of
+        the longest chain of remaining work are started first. The optional
+        weight function returns the expected duration of the task for each
+        dependency object, and is used to determine the length of each chain.
         """
         self._runners = dict((o, TaskRunner(make_task(o)))
                              for o in dependencies)
         self._graph = dependencies.graph(reverse=reverse)
+        self._priority = self._graph.path_lengths(weight)
 
         if name is None:
             name = '(%s) %s' % (getattr(make_task, '__name__',
@@ -270,39 +828,110 @@ class DependencyTaskGroup(object):
 
     def __call__(self):
         """Return a co-routine which runs the task group."""
+        unsatisfied = dict((k, len(n)) for k, n in self._graph.iteritems())
+        # A heap of the subtasks that are ready to start, ordered by the
+        # length of the critical path through each
+        ready = []
+        sequence = itertools.count()
+
+        def make_ready(keys):
+            for k in keys:
+                heapq.heappush(ready, (-self._priority[k], next(sequence), k))
+
+        make_ready(k for k, count in unsatisfied.iteritems() if not count)
+        # Running subtasks, mapped to the time at which they are next due to
+        # be stepped (or None if they may be stepped at any time)
+        running = {}
+        scheduled = []
+
         try:
-            while any(self._runners.itervalues()):
-                for k, r in self._ready():
-                    r.start()
+            while True:
+                while ready:
+                    k = heapq.heappop(ready)[-1]
+                    runner = self._runners[k]
+                    runner.start()
+                    if runner.done():
+                        # Completed without yielding, so there is no need
+                        # to wait before starting the tasks that require it
+                        make_ready(self._satisfy(k, unsatisfied))
+                    else:
+                        scheduled.append(k)
+
+                self._schedule(running, scheduled)
+                scheduled = []
+
+                if not running:
+                    break
 
-                yield
+                yield self._poll_interval(running)
 
-                for k, r in self._running():
-                    if r.step():
-                        del self._graph[k]
+                due = self._due(running)
+                due.sort(key=self._priority.get, reverse=True)
+                for k in due:
+                    if self._runners[k].step():
+                        del running[k]
+                        make_ready(self._satisfy(k, unsatisfied))
+                    else:
+                        scheduled.append(k)
         except:
             with excutils.save_and_reraise_exception():
                 for r in self._runners.itervalues():
                     r.cancel()
 
-    def _ready(self):
+    def _schedule(self, running, keys):
+        """
+        Record the time at which each of the subtasks with the given keys is
+        next due to be stepped, according to the polling interval it requested.
+        """
+        intervals = [(k, self._runners[k].poll_interval()) for k in keys]
+        if any(i is not None for k, i in intervals):
+            now = wallclock()
+        else:
+            now = None
+        for k, interval in intervals:
+            running[k] = now + interval if interval is not None else None
+
+    @staticmethod
+    def _poll_interval(running):
+        """
+        Return the interval until the earliest of the running subtasks is due
+        to be stepped, or None if any of them may be stepped at any time.
+        """
+        due_times = running.values()
+        if not due_times or None in due_times:
+            return None
+        return max(min(due_times) - wallclock(), 0)
+
+    @staticmethod
+    def _due(running):
         """
-        Iterate over all subtasks that are ready to start - i.e. all their
-        dependencies have been satisfied but they have not yet been started.
+        Return a list of the keys of running subtasks that are due to be
+        stepped.
+
+        When all of the subtasks have requested a polling interval, the
+        earliest of them is always considered due, since the group will have
+        been resumed on its behalf.
         """
-        for k, n in self._graph.iteritems():
-            if not n:
-                runner = self._runners[k]
-                if not runner.started():
-                    yield k, runner
+        due_times = running.values()
+        if all(t is None for t in due_times):
+            return list(running)
 
-    def _running(self):
+        threshold = wallclock()
+        if None not in due_times:
+            threshold = max(threshold, min(due_times))
+        return [k for k, t in running.iteritems()
+                if t is None or t <= threshold]
+
+    def _satisfy(self, key, unsatisfied):
         """
-        Iterate over all subtasks that are currently running - i.e. they have
-        been started but have not yet completed.
+        Record the completion of the subtask with the given key, and iterate
+        over the subtasks that are ready to start as a result - i.e. those for
+        which it was the last outstanding dependency.
         """
-        running = lambda (k, r): k in self._graph and r.started()
-        return itertools.ifilter(running, self._runners.iteritems())
+        for rqr in self._graph[key].required_by():
+            unsatisfied[rqr] -= 1
+            if not unsatisfied[rqr]:
+                yield rqr
 
 
 class PollingTaskGroup(object):
@@ -390,8 +1019,10 @@ class PollingTaskGroup(object):
             for r in runners:
                 r.start()
 
+            runners = list(itertools.dropwhile(lambda r: r.done(), runners))
+
             while runners:
-                yield
+                yield runners[0].poll_interval()
                 runners = list(itertools.dropwhile(lambda r: r.step(),
                                                    runners))
         except:
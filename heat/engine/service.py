@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
 import functools
 import json
 
@@ -26,11 +27,15 @@ from heat.engine import clients
 from heat.engine.event import Event
 from heat.common import exception
 from heat.common import identifier
+from heat.common import utils
 from heat.engine import parameters
 from heat.engine import parser
 from heat.engine import properties
 from heat.engine import resource
 from heat.engine import resources
+from heat.engine import scheduler
+from heat.engine import template
+from heat.engine.template import digest
 from heat.engine import watchrule
 
 from heat.openstack.common import log as logging
@@ -52,6 +57,28 @@ def request_context(func):
     return wrapped
 
 
+def _parse_backend_rates(entries):
+    '''
+    Parse a list of "service:rate[:burst]" strings into a dict mapping each
+    backend service name to a (rate, burst) tuple. Rates and bursts must be
+    positive; to impose no limit on a service, leave it out of the list.
+    '''
+    rates = {}
+    for entry in entries:
+        fields = entry.split(':')
+        try:
+            if len(fields) not in (2, 3):
+                raise ValueError()
+            rate = float(fields[1])
+            burst = int(fields[2]) if len(fields) == 3 else None
+            if rate <= 0 or (burst is not None and burst < 1):
+                raise ValueError()
+        except ValueError:
+            raise ValueError(_('Invalid backend task rate "%s"') % entry)
+        rates[fields[0].strip()] = (rate, burst)
+    return rates
+
+
 class EngineService(service.Service):
     """
     Manages the running instances from creation to destruction.
@@ -67,6 +94,19 @@ class EngineService(service.Service):
         # stg == "Stack Thread Groups"
         self.stg = {}
         resources.initialise()
+        scheduler.limiter = scheduler.TaskLimiter(
+            cfg.CONF.max_concurrent_tasks,
+            cfg.CONF.max_concurrent_tasks_per_tenant,
+            _parse_backend_rates(cfg.CONF.backend_task_rates))
+        if cfg.CONF.instrument_tasks:
+            scheduler.instrumentation = scheduler.Instrumentation()
+        if cfg.CONF.template_cache_size > 0:
+            template.cache = template.TemplateCache(
+                cfg.CONF.template_cache_size)
+        self._validation_cache = None
+        if cfg.CONF.validation_cache_size > 0:
+            self._validation_cache = utils.LRUCache(
+                cfg.CONF.validation_cache_size)
 
     def _start_in_thread(self, stack_id, func, *args, **kwargs):
         if stack_id not in self.stg:
@@ -101,6 +141,10 @@ class EngineService(service.Service):
         self.tg.add_timer(cfg.CONF.periodic_interval,
                           self._service_task)
 
+        # Step the tasks of all stack operations from a single loop
+        scheduler.reactor = scheduler.Reactor()
+        self.tg.add_thread(scheduler.reactor)
+
         # Create a periodic_watcher_task per-stack
         admin_context = context.get_admin_context()
         stacks = db_api.stack_get_all(admin_context)
@@ -120,7 +164,7 @@ class EngineService(service.Service):
         else:
             s = db_api.stack_get_by_name(cnxt, stack_name)
         if s:
-            stack = parser.Stack.load(cnxt, stack=s)
+            stack = parser.StackSummary(cnxt, s)
             return dict(stack.identifier())
         else:
             raise exception.StackNotFound(stack_name=stack_name)
@@ -170,14 +214,11 @@ class EngineService(service.Service):
         def format_stack_details(stacks):
             for s in stacks:
                 try:
-                    stack = parser.Stack.load(cnxt, stack=s,
-                                              resolve_data=False)
+                    yield api.format_stack(parser.StackSummary(cnxt, s))
                 except exception.NotFound:
                     # The stack may have been deleted between listing
                     # and formatting
                     pass
-                else:
-                    yield api.format_stack(stack)
 
         stacks = db_api.stack_get_all_by_tenant(cnxt) or []
         return list(format_stack_details(stacks))
@@ -278,6 +319,19 @@ class EngineService(service.Service):
             msg = _("No Template provided.")
             return webob.exc.HTTPBadRequest(explanation=msg)
 
+        if self._validation_cache is None:
+            return self._validate_template(template)
+
+        # Validation depends only on the template and the resource types
+        key = (digest(template),
+               resource.registry_generation())
+        result = self._validation_cache.get(key)
+        if result is None:
+            result = self._validate_template(template)
+            self._validation_cache.put(key, result)
+        return copy.deepcopy(result)
+
+    def _validate_template(self, template):
         tmpl = parser.Template(template)
         tmpl_resources = template.get('Resources', [])
 
@@ -290,7 +344,8 @@ class EngineService(service.Service):
                         'Every Resources object must contain a Type member.'}
             ResourceClass = resource.get_class(res['Type'])
             props = properties.Properties(ResourceClass.properties_schema,
-                                          res.get('Properties', {}))
+                                          res.get('Properties', {}),
+                                          owner=ResourceClass)
             try:
                 ResourceClass.validate_deletion_policy(res)
                 props.validate(with_value=False)
@@ -370,7 +425,18 @@ class EngineService(service.Service):
         else:
             events = db_api.event_get_all_by_tenant(cnxt)
 
-        return [api.format_event(Event.load(cnxt, e.id)) for e in events]
+        # Format the events straight from their rows, with one summary of
+        # each stack they belong to, rather than loading the whole stack for
+        # every event
+        stacks = {}
+
+        def event_stack(ev):
+            if ev.stack_id not in stacks:
+                stacks[ev.stack_id] = parser.StackSummary(cnxt, ev.stack)
+            return stacks[ev.stack_id]
+
+        return [api.format_event(Event.from_db(cnxt, event_stack(e), e))
+                for e in events]
 
     def _authorize_stack_user(self, cnxt, stack, resource_name):
         '''
@@ -441,10 +507,9 @@ class EngineService(service.Service):
             raise exception.PhysicalResourceNotFound(
                 resource_id=physical_resource_id)
 
-        stack = parser.Stack.load(cnxt, stack=rs.stack)
-        resource = stack[rs.name]
-
-        return dict(resource.identifier())
+        stack = parser.StackSummary(cnxt, rs.stack)
+        return dict(identifier.ResourceIdentifier(resource_name=rs.name,
+                                                  **stack.identifier()))
 
     @request_context
     def describe_stack_resources(self, cnxt, stack_identity, resource_name):
@@ -619,3 +684,21 @@ class EngineService(service.Service):
         result = api.format_watch(wr)
         result[api.WATCH_STATE_VALUE] = state
         return result
+
+    @request_context
+    def get_task_stats(self, cnxt):
+        '''
+        Return the statistics collected for the tasks run by the engine.
+        These cover the stacks of every tenant, so are available only to
+        administrators.
+        arg1 -> RPC context.
+        '''
+        if not cnxt.is_admin:
+            raise exception.NotAuthorized()
+
+        stats = {'reactor': {}, 'tasks': {}}
+        if scheduler.reactor is not None:
+            stats['reactor'] = scheduler.reactor.stats()
+        if scheduler.instrumentation is not None:
+            stats['tasks'] = scheduler.instrumentation.report()
+        return stats
@@ -14,12 +14,24 @@
 #    under the License.
 
 import collections
+import copy
+import hashlib
 import json
 
 from heat.db import api as db_api
 from heat.common import exception
+from heat.common import utils
 
 
+REFERENCE_KEYS = ('DependsOn', 'Ref', 'Fn::GetAtt')
+
+# Functions whose static resolution may add or remove references (a mapping
+# value may itself be a Ref, and a selection discards the unselected items)
+STATIC_REFERENCE_FUNCTIONS = ('Fn::FindInMap', 'Fn::Select')
+
+FUNCTIONS = ('Ref', 'Fn::GetAtt', 'Fn::Join', 'Fn::Select', 'Fn::FindInMap',
+             'Fn::Base64', 'Fn::GetAZs')
+
 SECTIONS = (VERSION, DESCRIPTION, MAPPINGS,
             PARAMETERS, RESOURCES, OUTPUTS) = \
            ('AWSTemplateFormatVersion', 'Description', 'Mappings',
@@ -27,7 +39,14 @@ SECTIONS = (VERSION, DESCRIPTION, MAPPINGS,
 
 
 class Template(collections.Mapping):
-    '''A stack template.'''
+    '''
+    A stack template.
+
+    The Template keeps its own copy of the definition it is given, and that
+    copy must never be modified: the compiled snippets and the reference index
+    are built from it once and then reused, keyed by the identity of each part
+    of the definition.
+    '''
 
     def __new__(cls, template, *args, **kwargs):
         '''Create a new Template of the appropriate class.'''
@@ -42,15 +61,30 @@ class Template(collections.Mapping):
         '''
         Initialise the template with a JSON object and a set of Parameters
         '''
+        if isinstance(template, Template):
+            template = template.t
         self.id = template_id
-        self.t = template
+        self.t = copy.deepcopy(template)
         self.maps = self[MAPPINGS]
+        self._references = None
+        self._nodes = None
+        # The compiled constraints on the parameters, as created by
+        # heat.engine.parameters.compile_constraints()
+        self.parameter_constraints = None
 
     @classmethod
     def load(cls, context, template_id):
         '''Retrieve a Template with the given ID from the database.'''
         t = db_api.raw_template_get(context, template_id)
-        return cls(t.template, template_id)
+        if cache is None:
+            return cls(t.template, template_id)
+
+        key = (template_id, digest(t.template))
+        tmpl = cache.get(key)
+        if tmpl is None:
+            tmpl = cls(t.template, template_id)
+            cache.put(key, tmpl)
+        return tmpl
 
     def store(self, context=None):
         '''Store the Template in the database and return its ID.'''
@@ -60,6 +94,33 @@ class Template(collections.Mapping):
             self.id = new_rt.id
         return self.id
 
+    def resource_references(self):
+        '''
+        Return a dict mapping the name of each resource in the template to a
+        list of the references in its definition, as returned by references().
+        Where the references cannot be known until the definition has been
+        statically resolved, the entry is None.
+
+        The index is built on first use and then cached, since the template
+        itself is never modified.
+        '''
+        if self._references is None:
+            self._references = dict(
+                (name, None if uses_functions(snippet,
+                                              STATIC_REFERENCE_FUNCTIONS)
+                 else references(snippet))
+                for name, snippet in self[RESOURCES].iteritems())
+        return self._references
+
+    def compile(self, snippet):
+        '''
+        Compile a snippet into a tree of intrinsic function calls. Any part of
+        the snippet that comes from the template itself is not compiled again.
+        '''
+        if self._nodes is None:
+            self._nodes = index_snippet(self.t)
+        return compile_snippet(snippet, FUNCTIONS, self._nodes)
+
     def __getitem__(self, section):
         '''Get the relevant section in the template.'''
         if section not in SECTIONS:
@@ -82,11 +143,10 @@ class Template(collections.Mapping):
         '''Return the number of sections.'''
         return len(SECTIONS)
 
-    def resolve_find_in_map(self, s):
+    def find_in_map_function(self):
         '''
-        Resolve constructs of the form { "Fn::FindInMap" : [ "mapping",
-                                                             "key",
-                                                             "value" ] }
+        Return the Function that resolves constructs of the form
+        { "Fn::FindInMap" : [ "mapping", "key", "value" ] }
         '''
         def handle_find_in_map(args):
             try:
@@ -95,17 +155,24 @@ class Template(collections.Mapping):
             except (ValueError, TypeError) as ex:
                 raise KeyError(str(ex))
 
-        return _resolve(lambda k, v: k == 'Fn::FindInMap',
-                        handle_find_in_map, s)
+        return Function('Fn::FindInMap', handle_find_in_map)
+
+    def resolve_find_in_map(self, s):
+        '''
+        Resolve constructs of the form { "Fn::FindInMap" : [ "mapping",
+                                                             "key",
+                                                             "value" ] }
+        '''
+        return _resolve(self.find_in_map_function(), s)
 
     @staticmethod
-    def resolve_availability_zones(s, stack):
+    def availability_zones_function(stack):
         '''
-            looking for { "Fn::GetAZs" : "str" }
+        Return the Function that resolves constructs of the form
+        { "Fn::GetAZs" : "str" }
         '''
-        def match_get_az(key, value):
-            return (key == 'Fn::GetAZs' and
-                    isinstance(value, basestring))
+        def match_get_az(value):
+            return isinstance(value, basestring)
 
         def handle_get_az(ref):
             if stack is None:
@@ -113,16 +180,23 @@ class Template(collections.Mapping):
             else:
                 return stack.get_availability_zones()
 
-        return _resolve(match_get_az, handle_get_az, s)
+        return Function('Fn::GetAZs', handle_get_az, match_get_az)
 
     @staticmethod
-    def resolve_param_refs(s, parameters):
+    def resolve_availability_zones(s, stack):
         '''
-        Resolve constructs of the form { "Ref" : "string" }
+            looking for { "Fn::GetAZs" : "str" }
         '''
-        def match_param_ref(key, value):
-            return (key == 'Ref' and
-                    isinstance(value, basestring) and
+        return _resolve(Template.availability_zones_function(stack), s)
+
+    @staticmethod
+    def param_ref_function(parameters):
+        '''
+        Return the Function that resolves constructs of the form
+        { "Ref" : "string" } for parameters.
+        '''
+        def match_param_ref(value):
+            return (isinstance(value, basestring) and
                     value in parameters)
 
         def handle_param_ref(ref):
@@ -131,26 +205,41 @@ class Template(collections.Mapping):
             except (KeyError, ValueError):
                 raise exception.UserParameterMissing(key=ref)
 
-        return _resolve(match_param_ref, handle_param_ref, s)
+        return Function('Ref', handle_param_ref, match_param_ref)
 
     @staticmethod
-    def resolve_resource_refs(s, resources):
+    def resolve_param_refs(s, parameters):
         '''
-        Resolve constructs of the form { "Ref" : "resource" }
+        Resolve constructs of the form { "Ref" : "string" }
         '''
-        def match_resource_ref(key, value):
-            return key == 'Ref' and value in resources
+        return _resolve(Template.param_ref_function(parameters), s)
+
+    @staticmethod
+    def resource_ref_function(resources):
+        '''
+        Return the Function that resolves constructs of the form
+        { "Ref" : "resource" }
+        '''
+        def match_resource_ref(value):
+            return value in resources
 
         def handle_resource_ref(arg):
             return resources[arg].FnGetRefId()
 
-        return _resolve(match_resource_ref, handle_resource_ref, s)
+        return Function('Ref', handle_resource_ref, match_resource_ref)
 
     @staticmethod
-    def resolve_attributes(s, resources):
+    def resolve_resource_refs(s, resources):
         '''
-        Resolve constructs of the form { "Fn::GetAtt" : [ "WebServer",
-                                                          "PublicIp" ] }
+        Resolve constructs of the form { "Ref" : "resource" }
+        '''
+        return _resolve(Template.resource_ref_function(resources), s)
+
+    @staticmethod
+    def attributes_function(resources):
+        '''
+        Return the Function that resolves constructs of the form
+        { "Fn::GetAtt" : [ "WebServer", "PublicIp" ] }
         '''
         def handle_getatt(args):
             resource, att = args
@@ -166,16 +255,21 @@ class Template(collections.Mapping):
                 raise exception.InvalidTemplateAttribute(resource=resource,
                                                          key=att)
 
-        return _resolve(lambda k, v: k == 'Fn::GetAtt', handle_getatt, s)
+        return Function('Fn::GetAtt', handle_getatt)
 
     @staticmethod
-    def reduce_joins(s):
+    def resolve_attributes(s, resources):
         '''
-        Reduces contiguous strings in Fn::Join to a single joined string
-        eg the following
-        { "Fn::Join" : [ " ", [ "str1", "str2", {"f": "b"}, "str3", "str4"]}
-        is reduced to
-        { "Fn::Join" : [ " ", [ "str1 str2", {"f": "b"}, "str3 str4"]}
+        Resolve constructs of the form { "Fn::GetAtt" : [ "WebServer",
+                                                          "PublicIp" ] }
+        '''
+        return _resolve(Template.attributes_function(resources), s)
+
+    @staticmethod
+    def reduce_joins_function():
+        '''
+        Return the Function that reduces contiguous strings in Fn::Join to a
+        single joined string.
         '''
         def handle_join(args):
             if not isinstance(args, (list, tuple)):
@@ -203,21 +297,24 @@ class Template(collections.Mapping):
                 reduced.append(delim.join(contiguous))
             return {'Fn::Join': [delim, reduced]}
 
-        return _resolve(lambda k, v: k == 'Fn::Join', handle_join, s)
+        return Function('Fn::Join', handle_join)
 
     @staticmethod
-    def resolve_select(s):
+    def reduce_joins(s):
         '''
-        Resolve constructs of the form:
-        (for a list lookup)
-        { "Fn::Select" : [ "2", [ "apples", "grapes", "mangoes" ] ] }
-        returns "mangoes"
-
-        (for a dict lookup)
-        { "Fn::Select" : [ "red", {"red": "a", "flu": "b"} ] }
-        returns "a"
+        Reduces contiguous strings in Fn::Join to a single joined string
+        eg the following
+        { "Fn::Join" : [ " ", [ "str1", "str2", {"f": "b"}, "str3", "str4"]}
+        is reduced to
+        { "Fn::Join" : [ " ", [ "str1 str2", {"f": "b"}, "str3 str4"]}
+        '''
+        return _resolve(Template.reduce_joins_function(), s)
 
-        Note: can raise IndexError, KeyError, ValueError and TypeError
+    @staticmethod
+    def select_function():
+        '''
+        Return the Function that resolves constructs of the form
+        { "Fn::Select" : [ "index", [ "str1", "str2" ] ] }
         '''
         def handle_select(args):
             if not isinstance(args, (list, tuple)):
@@ -247,13 +344,29 @@ class Template(collections.Mapping):
 
             raise TypeError('Arguments to "Fn::Select" not fully resolved')
 
-        return _resolve(lambda k, v: k == 'Fn::Select', handle_select, s)
+        return Function('Fn::Select', handle_select)
 
     @staticmethod
-    def resolve_joins(s):
+    def resolve_select(s):
         '''
-        Resolve constructs of the form { "Fn::Join" : [ "delim", [ "str1",
-                                                                   "str2" ] }
+        Resolve constructs of the form:
+        (for a list lookup)
+        { "Fn::Select" : [ "2", [ "apples", "grapes", "mangoes" ] ] }
+        returns "mangoes"
+
+        (for a dict lookup)
+        { "Fn::Select" : [ "red", {"red": "a", "flu": "b"} ] }
+        returns "a"
+
+        Note: can raise IndexError, KeyError, ValueError and TypeError
+        '''
+        return _resolve(Template.select_function(), s)
+
+    @staticmethod
+    def joins_function():
+        '''
+        Return the Function that resolves constructs of the form
+        { "Fn::Join" : [ "delim", [ "str1", "str2" ] }
         '''
         def handle_join(args):
             if not isinstance(args, (list, tuple)):
@@ -277,19 +390,58 @@ class Template(collections.Mapping):
 
             return delim.join(empty_for_none(value) for value in strings)
 
-        return _resolve(lambda k, v: k == 'Fn::Join', handle_join, s)
+        return Function('Fn::Join', handle_join)
 
     @staticmethod
-    def resolve_base64(s):
+    def resolve_joins(s):
         '''
-        Resolve constructs of the form { "Fn::Base64" : "string" }
+        Resolve constructs of the form { "Fn::Join" : [ "delim", [ "str1",
+                                                                   "str2" ] }
+        '''
+        return _resolve(Template.joins_function(), s)
+
+    @staticmethod
+    def base64_function():
+        '''
+        Return the Function that resolves constructs of the form
+        { "Fn::Base64" : "string" }
         '''
         def handle_base64(string):
             if not isinstance(string, basestring):
                 raise TypeError('Arguments to "Fn::Base64" not fully resolved')
             return string
 
-        return _resolve(lambda k, v: k == 'Fn::Base64', handle_base64, s)
+        return Function('Fn::Base64', handle_base64)
+
+    @staticmethod
+    def resolve_base64(s):
+        '''
+        Resolve constructs of the form { "Fn::Base64" : "string" }
+        '''
+        return _resolve(Template.base64_function(), s)
+
+    def static_evaluator(self, stack, parameters):
+        '''
+        Return an Evaluator that resolves static parameters, map lookups, etc.
+        in snippets of the template.
+        '''
+        return Evaluator([self.param_ref_function(parameters),
+                          self.availability_zones_function(stack),
+                          self.find_in_map_function(),
+                          self.reduce_joins_function()],
+                         self.compile)
+
+    def runtime_evaluator(self, resources):
+        '''
+        Return an Evaluator that resolves resource references, attributes and
+        the remaining functions in snippets of the template.
+        '''
+        return Evaluator([self.resource_ref_function(resources),
+                          self.attributes_function(resources),
+                          self.select_function(),
+                          self.joins_function(),
+                          self.base64_function()],
+                         self.compile)
 
 
 class HOTemplate(Template):
@@ -313,23 +465,278 @@ class HOTemplate(Template):
         return self.t.get(section.lower(), default)
 
 
-def _resolve(match, handle, snippet):
+def references(snippet):
+    '''
+    Return a list of the references to other resources in a snippet of a
+    template, in the form of (key, target, head) tuples.
+
+    The key is one of REFERENCE_KEYS, the target is the name of the resource
+    (or parameter) referred to and the head is the attribute name for an
+    Fn::GetAtt or, otherwise, the key under which the reference appears.
+    '''
+    found = []
+
+    def find(head, fragment):
+        if isinstance(fragment, dict):
+            for key, value in fragment.items():
+                if key in REFERENCE_KEYS:
+                    if key == 'Fn::GetAtt':
+                        value, head = value
+                    found.append((key, value, head))
+                else:
+                    find(key, value)
+        elif isinstance(fragment, list):
+            for item in fragment:
+                find(head, item)
+
+    find(None, snippet)
+    return found
+
+
+def uses_functions(snippet, names):
+    '''
+    Return True if a snippet of a template contains a call to any of the named
+    intrinsic functions.
+    '''
+    if isinstance(snippet, dict):
+        return any(key in names or uses_functions(value, names)
+                   for key, value in snippet.iteritems())
+    elif isinstance(snippet, list):
+        return any(uses_functions(item, names) for item in snippet)
+    return False
+
+
+class Function(object):
+    '''An intrinsic function that may be resolved by an Evaluator.'''
+
+    def __init__(self, name, handle, match=None):
+        '''
+        Initialise with the name of the function (e.g. "Fn::Join"), a function
+        that returns the result given the (resolved) arguments and optionally
+        a function that returns True if the arguments are to be handled.
+        '''
+        self.name = name
+        self.handle = handle
+        self.match = match
+
+
+class Evaluator(object):
+    '''
+    Resolves a sequence of intrinsic functions in snippets of a template.
+
+    The result is the same as that of resolving each function in turn over the
+    whole snippet, but the snippet is compiled into a tree of function calls
+    once and the tree is evaluated in a single pass. Subtrees that contain no
+    intrinsic functions are not examined again, and are shared between the
+    snippet and the result rather than copied.
+    '''
+
+    def __init__(self, functions, compiler=None):
+        '''
+        Initialise with a list of Functions, in the order in which they are to
+        be resolved, and optionally a function with which to compile snippets.
+        '''
+        self.functions = list(functions)
+        self._positions = {}
+        for i, f in enumerate(self.functions):
+            self._positions.setdefault(f.name, []).append(i)
+        self._compiler = compiler
+
+    def __call__(self, snippet):
+        '''
+        Return the snippet with all functions resolved. Any part of the snippet
+        in which nothing was substituted is returned as is, so the result must
+        not be modified in place.
+        '''
+        return self.compile(snippet).evaluate(self, 0, len(self.functions))
+
+    def compile(self, snippet):
+        '''Compile a snippet into a tree of calls to the functions.'''
+        if self._compiler is not None:
+            return self._compiler(snippet)
+        return compile_snippet(snippet, self._positions)
+
+    def position(self, name, start, end):
+        '''
+        Return the position of the first function with the given name between
+        positions start and end, or None.
+        '''
+        for i in self._positions.get(name, ()):
+            if start <= i < end:
+                return i
+        return None
+
+    def resolve(self, data, start, end):
+        '''Resolve the functions in positions start to end in some data.'''
+        if start >= end:
+            return data
+        return self.compile(data).evaluate(self, start, end)
+
+
+class _Constant(object):
+    '''A snippet that contains no intrinsic functions.'''
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def evaluate(self, evaluator, start, end):
+        return self.value
+
+
+class _Mapping(object):
+    __slots__ = ('value', 'items')
+
+    def __init__(self, value, items):
+        self.value = value
+        self.items = items
+
+    def evaluate(self, evaluator, start, end):
+        result = dict((k, node.evaluate(evaluator, start, end))
+                      for k, node in self.items)
+        if all(result[k] is node.value for k, node in self.items):
+            return self.value
+        return result
+
+
+class _Sequence(object):
+    __slots__ = ('value', 'nodes')
+
+    def __init__(self, value, nodes):
+        self.value = value
+        self.nodes = nodes
+
+    def evaluate(self, evaluator, start, end):
+        result = [node.evaluate(evaluator, start, end) for node in self.nodes]
+        if all(r is node.value for r, node in zip(result, self.nodes)):
+            return self.value
+        return result
+
+
+class _Call(object):
+    '''A call to an intrinsic function.'''
+
+    __slots__ = ('value', 'name', 'args')
+
+    def __init__(self, value, name, args):
+        self.value = value
+        self.name = name
+        self.args = args
+
+    def _unresolved(self, args):
+        if args is self.args.value:
+            return self.value
+        return {self.name: args}
+
+    def evaluate(self, evaluator, start, end):
+        position = evaluator.position(self.name, start, end)
+        if position is None:
+            return self._unresolved(self.args.evaluate(evaluator, start, end))
+
+        # The function sees its arguments as resolved by the functions that
+        # come before it, and its result is subject only to those after it.
+        function = evaluator.functions[position]
+        if function.match is None:
+            result = function.handle(self.args.evaluate(evaluator,
+                                                        start, position + 1))
+        else:
+            args = self.args.evaluate(evaluator, start, position)
+            matched = function.match(args)
+            args = evaluator.resolve(args, position, position + 1)
+            if matched:
+                result = function.handle(args)
+            else:
+                result = self._unresolved(args)
+        return evaluator.resolve(result, position + 1, end)
+
+
+def compile_snippet(snippet, names=FUNCTIONS, index=None):
     '''
-    Resolve constructs in a snippet of a template. The supplied match function
-    should return True if a particular key-value pair should be substituted,
-    and the handle function should return the correct substitution when passed
-    the argument list as parameters.
+    Compile a snippet of a template into a tree of calls to the named
+    intrinsic functions that an Evaluator can resolve.
 
-    Returns a copy of the original snippet with the substitutions performed.
+    If an index of compiled nodes (as returned by index_snippet()) is supplied,
+    any part of the snippet found in it is not compiled again.
     '''
-    recurse = lambda s: _resolve(match, handle, s)
+    if index is not None:
+        node = index.get(id(snippet))
+        if node is not None and node.value is snippet:
+            return node
 
     if isinstance(snippet, dict):
         if len(snippet) == 1:
-            k, v = snippet.items()[0]
-            if match(k, v):
-                return handle(recurse(v))
-        return dict((k, recurse(v)) for k, v in snippet.items())
+            name, args = snippet.items()[0]
+            if name in names:
+                return _Call(snippet, name,
+                             compile_snippet(args, names, index))
+        items = [(k, compile_snippet(v, names, index))
+                 for k, v in snippet.iteritems()]
+        if all(isinstance(n, _Constant) for k, n in items):
+            return _Constant(snippet)
+        return _Mapping(snippet, items)
     elif isinstance(snippet, list):
-        return [recurse(s) for s in snippet]
-    return snippet
+        nodes = [compile_snippet(s, names, index) for s in snippet]
+        if all(isinstance(n, _Constant) for n in nodes):
+            return _Constant(snippet)
+        return _Sequence(snippet, nodes)
+    return _Constant(snippet)
+
+
+def is_constant(snippet):
+    '''Return True if a snippet contains no intrinsic functions.'''
+    return isinstance(compile_snippet(snippet), _Constant)
+
+
+def index_snippet(snippet, names=FUNCTIONS):
+    '''
+    Compile a snippet of a template and return an index of the compiled nodes
+    for every dict and list within it, keyed by the id() of each.
+    '''
+    index = {}
+
+    def add(fragment):
+        if isinstance(fragment, dict):
+            for value in fragment.itervalues():
+                add(value)
+        elif isinstance(fragment, list):
+            for value in fragment:
+                add(value)
+        else:
+            return
+        # The contents are already indexed, so only this level is compiled
+        index[id(fragment)] = compile_snippet(fragment, names, index)
+
+    add(snippet)
+    return index
+
+
+def digest(template):
+    '''Return a digest of the contents of a raw template.'''
+    return hashlib.sha1(json.dumps(template, sort_keys=True)).hexdigest()
+
+
+class TemplateCache(utils.LRUCache):
+    '''
+    A cache of the most recently used Templates loaded from the database,
+    keyed by raw template ID and digest of the contents.
+
+    Templates are never modified once stored, so a cached Template (along with
+    the compiled snippets and the reference index it holds) can be shared by
+    every Stack that uses it.
+    '''
+
+
+def _resolve(function, snippet):
+    '''
+    Resolve a single intrinsic function in a snippet of a template.
+
+    Returns the snippet with the substitutions performed. Parts of the original
+    snippet in which nothing was substituted are shared with the result.
+    '''
+    return Evaluator([function])(snippet)
+
+
+# The TemplateCache from which Templates are loaded, or None to load each one
+# afresh from the database.
+cache = None
@@ -19,6 +19,10 @@ from heat.common import exception
 class Timestamp(object):
     '''
     A descriptor for fetching an up-to-date timestamp from the database.
+
+    Objects that keep a _db_columns dict of the columns of their database
+    row have the timestamp served from (and stored to) that cache, so that it
+    is fetched at most once until the object discards its cache.
     '''
 
     def __init__(self, db_fetch, attribute):
@@ -37,9 +41,16 @@ class Timestamp(object):
         if obj is None or obj.id is None:
             return None
 
+        columns = getattr(obj, '_db_columns', None)
+        if columns is not None and self.attribute in columns:
+            return columns[self.attribute]
+
         o = self.db_fetch(obj.context, obj.id)
         o.refresh(attrs=[self.attribute])
-        return getattr(o, self.attribute)
+        value = getattr(o, self.attribute)
+        if columns is not None:
+            columns[self.attribute] = value
+        return value
 
     def __set__(self, obj, timestamp):
         '''Update the timestamp for the given object.'''
@@ -47,3 +58,8 @@ class Timestamp(object):
             raise exception.ResourceNotAvailable(resource_name=obj.name)
         o = self.db_fetch(obj.context, obj.id)
         o.update_and_save({self.attribute: timestamp})
+
+        columns = getattr(obj, '_db_columns', None)
+        if columns is not None:
+            columns.pop('updated_at', None)
+            columns[self.attribute] = getattr(o, self.attribute)
@@ -0,0 +1,118 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import sys
+
+from heat.db import api as db_api
+
+from heat.openstack.common import log as logging
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBuffer(object):
+    '''
+    A buffer for the database writes made by the resources of a stack during
+    a stack operation, which commits them together in a single transaction.
+
+    Updates to the same row are coalesced, with later values for a column
+    replacing earlier ones; events are inserted in the order in which they
+    were added. A flush either commits all of the pending writes or none of
+    them, so should the engine stop mid-operation the database reflects the
+    state of the stack as of the last flush.
+    '''
+
+    def __init__(self, context):
+        self.context = context
+        self._clear()
+
+    def _clear(self):
+        self._stacks = {}
+        self._stack_order = []
+        self._resources = {}
+        self._resource_order = []
+        self._events = []
+
+    def __len__(self):
+        '''Return the number of rows with pending writes.'''
+        return len(self._stacks) + len(self._resources) + len(self._events)
+
+    @staticmethod
+    def _update(rows, order, row_id, values):
+        if row_id not in rows:
+            rows[row_id] = {}
+            order.append(row_id)
+        rows[row_id].update(values)
+
+    def stack_update(self, stack_id, values):
+        '''Buffer an update to the given columns of a stack's row.'''
+        self._update(self._stacks, self._stack_order, stack_id, values)
+
+    def resource_update(self, resource_id, values):
+        '''Buffer an update to the given columns of a resource's row.'''
+        self._update(self._resources, self._resource_order,
+                     resource_id, values)
+
+    def event_create(self, values):
+        '''Buffer the creation of an event.'''
+        self._events.append(values)
+
+    def flush(self):
+        '''
+        Commit all of the pending writes. Should this fail, the writes are
+        discarded and the error is logged, as for an unbuffered write.
+        '''
+        if not len(self):
+            return
+
+        stack_updates = [(i, self._stacks[i]) for i in self._stack_order]
+        resource_updates = [(i, self._resources[i])
+                            for i in self._resource_order]
+        events = self._events
+        self._clear()
+
+        try:
+            db_api.batch_write(self.context, stack_updates,
+                               resource_updates, events)
+        except Exception as ex:
+            logger.error('DB error %s' % str(ex))
+
+    def flushing(self, task):
+        '''
+        Return a task that runs the given task, flushing the buffer at the
+        end of each of its steps and when it finishes.
+        '''
+        def wrapper(*args, **kwargs):
+            subtask = task(*args, **kwargs)
+
+            try:
+                step = next(subtask)
+                while True:
+                    self.flush()
+                    try:
+                        yield step
+                    except GeneratorExit:
+                        subtask.close()
+                        raise
+                    except:
+                        step = subtask.throw(*sys.exc_info())
+                    else:
+                        step = next(subtask)
+            except StopIteration:
+                pass
+            finally:
+                self.flush()
+
+        return wrapper
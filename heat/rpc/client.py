@@ -248,3 +248,11 @@ class EngineClient(heat.openstack.common.rpc.proxy.RpcProxy):
         return self.call(ctxt, self.make_msg('set_watch_state',
                                              watch_name=watch_name,
                                              state=state))
+
+    def get_task_stats(self, ctxt):
+        '''
+        Return the statistics collected for the tasks run by the engine,
+        aggregated by resource type and by stack
+        arg1 -> RPC context.
+        '''
+        return self.call(ctxt, self.make_msg('get_task_stats'))
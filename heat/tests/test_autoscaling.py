@@ -170,7 +170,7 @@ class AutoScalingTest(HeatTestCase):
         self.assertRaises(resource.UpdateReplace,
                           rsrc.update, update_snippet)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_scaling_group_update_ok_maxsize(self):
@@ -196,7 +196,7 @@ class AutoScalingTest(HeatTestCase):
 
         self.assertEqual('2', rsrc.properties['MaxSize'])
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_scaling_group_update_ok_minsize(self):
@@ -227,7 +227,7 @@ class AutoScalingTest(HeatTestCase):
                          rsrc.resource_id)
         self.assertEqual('2', rsrc.properties['MinSize'])
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_scaling_group_update_ok_desired(self):
@@ -259,7 +259,7 @@ class AutoScalingTest(HeatTestCase):
 
         self.assertEqual('2', rsrc.properties['DesiredCapacity'])
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_scaling_group_update_ok_desired_remove(self):
@@ -287,7 +287,7 @@ class AutoScalingTest(HeatTestCase):
 
         self.assertEqual(None, rsrc.properties['DesiredCapacity'])
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_scaling_group_update_ok_cooldown(self):
@@ -310,7 +310,7 @@ class AutoScalingTest(HeatTestCase):
         self.assertEqual(None, rsrc.update(update_snippet))
         self.assertEqual('61', rsrc.properties['Cooldown'])
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_scaling_group_adjust(self):
@@ -387,7 +387,7 @@ class AutoScalingTest(HeatTestCase):
         rsrc.adjust(0)
         self.assertEqual('WebServerGroup-0,WebServerGroup-1',
                          rsrc.resource_id)
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_scaling_group_percent(self):
@@ -425,7 +425,7 @@ class AutoScalingTest(HeatTestCase):
         self.assertEqual('WebServerGroup-0,WebServerGroup-1,WebServerGroup-2',
                          rsrc.resource_id)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
 
     def test_scaling_group_cooldown_toosoon(self):
         t = template_format.parse(as_template)
@@ -478,7 +478,7 @@ class AutoScalingTest(HeatTestCase):
         rsrc.adjust(200, 'PercentChangeInCapacity')
         self.assertEqual('WebServerGroup-0', rsrc.resource_id)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
 
     def test_scaling_group_cooldown_ok(self):
         t = template_format.parse(as_template)
@@ -531,7 +531,7 @@ class AutoScalingTest(HeatTestCase):
         self.assertEqual('WebServerGroup-0,WebServerGroup-1,WebServerGroup-2',
                          rsrc.resource_id)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
 
     def test_scaling_group_cooldown_zero(self):
         t = template_format.parse(as_template)
@@ -580,7 +580,7 @@ class AutoScalingTest(HeatTestCase):
         self.assertEqual('WebServerGroup-0,WebServerGroup-1,WebServerGroup-2',
                          rsrc.resource_id)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_scaling_policy_up(self):
@@ -608,7 +608,7 @@ class AutoScalingTest(HeatTestCase):
         self.assertEqual('WebServerGroup-0,WebServerGroup-1',
                          rsrc.resource_id)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_scaling_policy_down(self):
@@ -637,7 +637,7 @@ class AutoScalingTest(HeatTestCase):
         down_policy.alarm()
         self.assertEqual('WebServerGroup-0', rsrc.resource_id)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_scaling_policy_cooldown_toosoon(self):
@@ -688,7 +688,7 @@ class AutoScalingTest(HeatTestCase):
         self.assertEqual('WebServerGroup-0,WebServerGroup-1',
                          rsrc.resource_id)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_scaling_policy_cooldown_ok(self):
@@ -739,7 +739,7 @@ class AutoScalingTest(HeatTestCase):
         self.assertEqual('WebServerGroup-0,WebServerGroup-1,WebServerGroup-2',
                          rsrc.resource_id)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_scaling_policy_cooldown_zero(self):
@@ -790,7 +790,7 @@ class AutoScalingTest(HeatTestCase):
         self.assertEqual('WebServerGroup-0,WebServerGroup-1,WebServerGroup-2',
                          rsrc.resource_id)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_scaling_policy_cooldown_none(self):
@@ -843,7 +843,7 @@ class AutoScalingTest(HeatTestCase):
         self.assertEqual('WebServerGroup-0,WebServerGroup-1,WebServerGroup-2',
                          rsrc.resource_id)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_scaling_policy_update(self):
@@ -909,5 +909,5 @@ class AutoScalingTest(HeatTestCase):
                          'WebServerGroup-2,WebServerGroup-3',
                          rsrc.resource_id)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
@@ -93,7 +93,7 @@ class CloudWatchAlarmTest(HeatTestCase):
 
         self.assertEqual(None, rsrc.update(snippet))
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_mem_alarm_high_update_replace(self):
@@ -120,5 +120,5 @@ class CloudWatchAlarmTest(HeatTestCase):
         self.assertRaises(resource.UpdateReplace,
                           rsrc.update, snippet)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
@@ -88,8 +88,9 @@ class DBInstanceTest(HeatTestCase):
                   'DBInstanceClass': u'db.m1.small',
                   'Port': '3306'}
 
+        stack_creator = scheduler.TaskRunner(lambda: None)
         dbi.DBInstance.create_with_template(mox.IgnoreArg(),
-                                            params).AndReturn(None)
+                                            params).AndReturn(stack_creator)
         dbi.DBInstance.check_create_complete(mox.IgnoreArg()).AndReturn(True)
 
         fn = FakeNested()
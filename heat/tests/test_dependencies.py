@@ -150,6 +150,45 @@ class dependenciesTest(testtools.TestCase):
                           ('e3', 'mid1')])
         self.assertRaises(CircularDependencyException, list, reversed(d))
 
+    def test_circular_report(self):
+        d = Dependencies([('last', 'mid'),
+                          ('mid', 'first'),
+                          ('first', 'loop'),
+                          ('loop', 'first')])
+        try:
+            list(iter(d))
+        except CircularDependencyException as ex:
+            message = str(ex)
+        else:
+            self.fail('No CircularDependencyException raised')
+
+        self.assertTrue('first -> loop -> first' in message or
+                        'loop -> first -> loop' in message, message)
+        self.assertFalse('last' in message, message)
+        self.assertFalse('mid' in message, message)
+
+    def test_order_cached(self):
+        d = Dependencies([('last', 'first')])
+        self.assertEqual(list(iter(d)), ['first', 'last'])
+        self.assertTrue(iter(d) is not iter(d))
+        self.assertEqual(list(iter(d)), ['first', 'last'])
+        self.assertEqual(list(reversed(d)), ['last', 'first'])
+
+    def test_order_invalidated(self):
+        d = Dependencies([('last', 'first')])
+        self.assertEqual(list(iter(d)), ['first', 'last'])
+        self.assertEqual(list(reversed(d)), ['last', 'first'])
+
+        d += ('first', 'zeroth')
+        self.assertEqual(list(iter(d)), ['zeroth', 'first', 'last'])
+        self.assertEqual(list(reversed(d)), ['last', 'first', 'zeroth'])
+
+    def test_large_chain(self):
+        edges = [(i + 1, i) for i in range(5000)]
+        d = Dependencies(edges)
+        self.assertEqual(list(iter(d)), range(5001))
+        self.assertEqual(list(reversed(d)), range(5000, -1, -1))
+
     def test_noexist_partial(self):
         d = Dependencies([('foo', 'bar')])
         get = lambda i: d[i]
@@ -194,3 +233,67 @@ class dependenciesTest(testtools.TestCase):
         for n in ('last', 'mid1', 'mid2', 'mid3'):
             self.assertTrue(n in order,
                             "'%s' not found in dependency order" % n)
+
+    def test_path_lengths(self):
+        d = Dependencies([('last', 'mid1'), ('last', 'mid2'),
+                          ('mid1', 'mid3'), ('mid3', 'first'),
+                          ('mid2', 'first')])
+        lengths = d.graph().path_lengths()
+        self.assertEqual({'first': 4, 'mid3': 3, 'mid2': 2,
+                          'mid1': 2, 'last': 1}, lengths)
+
+    def test_path_lengths_weighted(self):
+        d = Dependencies([('last', 'mid1'), ('last', 'mid2'),
+                          ('mid1', 'first'), ('mid2', 'first')])
+        weights = {'mid2': 10}
+        lengths = d.graph().path_lengths(lambda k: weights.get(k, 1))
+        self.assertEqual({'first': 12, 'mid1': 2, 'mid2': 11, 'last': 1},
+                         lengths)
+
+    def test_diamond_chain_partial(self):
+        edges = []
+        for i in range(40):
+            edges.extend([('left%d' % i, 'mid%d' % i),
+                          ('right%d' % i, 'mid%d' % i),
+                          ('mid%d' % (i + 1), 'left%d' % i),
+                          ('mid%d' % (i + 1), 'right%d' % i)])
+        d = Dependencies(edges)
+        p = d['mid1']
+        order = list(iter(p))
+        self.assertEqual(118, len(order))
+        self.assertEqual('mid1', order[0])
+        self.assertEqual('mid40', order[-1])
+
+    def test_required_by_all(self):
+        d = Dependencies([('last', 'mid1'), ('last', 'mid2'),
+                          ('mid1', 'first'), ('mid2', 'first')])
+        self.assertEqual(set(['mid1', 'last']), d.required_by_all('mid1'))
+        self.assertEqual(set(['first', 'mid1', 'mid2', 'last']),
+                         d.required_by_all('first'))
+        self.assertRaises(KeyError, d.required_by_all, 'missing')
+
+    def test_required_by_all_invalidated(self):
+        d = Dependencies([('last', 'first')])
+        self.assertEqual(set(['first', 'last']), d.required_by_all('first'))
+        d += ('new', 'last')
+        self.assertEqual(set(['first', 'last', 'new']),
+                         d.required_by_all('first'))
+
+    def test_add_node(self):
+        d = Dependencies([('last', 'first')])
+        d.add_node('mid', requires=['first'], required_by=['last'])
+        self.assertEqual(['first', 'mid', 'last'], list(iter(d)))
+
+    def test_remove_node(self):
+        d = Dependencies([('last', 'mid'), ('mid', 'first'),
+                          ('other', 'mid')])
+        self.assertEqual(set(['last', 'other']), set(d.remove_node('mid')))
+        self.assertEqual(set(['first', 'last', 'other']), set(iter(d)))
+        self.assertEqual(set(['first']), d.required_by_all('first'))
+        self.assertRaises(KeyError, d.remove_node, 'mid')
+
+    def test_replace_node(self):
+        d = Dependencies([('last', 'mid'), ('mid', 'first')])
+        requirers = d.remove_node('mid')
+        d.add_node('new', requires=['first'], required_by=requirers)
+        self.assertEqual(['first', 'new', 'last'], list(iter(d)))
@@ -100,7 +100,7 @@ class EIPTest(HeatTestCase):
                               rsrc.FnGetAtt, 'Foo')
 
         finally:
-            rsrc.destroy()
+            scheduler.TaskRunner(rsrc.destroy)()
 
         self.m.VerifyAll()
 
@@ -123,7 +123,7 @@ class EIPTest(HeatTestCase):
         # TODO(sbaker), figure out why this is an empty string
         #self.assertEqual('', association.FnGetRefId())
 
-        association.delete()
-        rsrc.delete()
+        scheduler.TaskRunner(association.delete)()
+        scheduler.TaskRunner(rsrc.delete)()
 
         self.m.VerifyAll()
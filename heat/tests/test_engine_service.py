@@ -29,6 +29,7 @@ import heat.db.api as db_api
 from heat.common import identifier
 from heat.common import template_format
 from heat.engine import parser
+from heat.engine import scheduler
 from heat.engine import service
 from heat.engine.properties import Properties
 from heat.engine.resources import instance as instances
@@ -469,6 +470,19 @@ class stackServiceCreateUpdateDeleteTest(HeatTestCase):
         self.m.VerifyAll()
 
 
+class BackendRatesTest(HeatTestCase):
+
+    def test_parse(self):
+        rates = service._parse_backend_rates(['nova:5:10', 'cinder:0.5'])
+        self.assertEqual({'nova': (5.0, 10), 'cinder': (0.5, None)}, rates)
+
+    def test_parse_invalid(self):
+        for entry in ('nova', 'nova:1:2:3', 'nova:x', 'nova:1:y',
+                      'nova:0', 'nova:-1', 'nova:1:0'):
+            self.assertRaises(ValueError,
+                              service._parse_backend_rates, [entry])
+
+
 class stackServiceTest(HeatTestCase):
 
     def setUp(self):
@@ -486,9 +500,8 @@ class stackServiceTest(HeatTestCase):
 
     @stack_context('service_identify_test_stack', False)
     def test_stack_identify(self):
+        # The stack is identified without being loaded in full
         self.m.StubOutWithMock(parser.Stack, 'load')
-        parser.Stack.load(self.ctx,
-                          stack=mox.IgnoreArg()).AndReturn(self.stack)
 
         self.m.ReplayAll()
         identity = self.eng.identify_stack(self.ctx, self.stack.name)
@@ -498,9 +511,8 @@ class stackServiceTest(HeatTestCase):
 
     @stack_context('service_identify_uuid_test_stack', False)
     def test_stack_identify_uuid(self):
+        # The stack is identified without being loaded in full
         self.m.StubOutWithMock(parser.Stack, 'load')
-        parser.Stack.load(self.ctx,
-                          stack=mox.IgnoreArg()).AndReturn(self.stack)
 
         self.m.ReplayAll()
         identity = self.eng.identify_stack(self.ctx, self.stack.id)
@@ -532,6 +544,8 @@ class stackServiceTest(HeatTestCase):
         s = db_api.stack_get(self.ctx, self.stack.id)
         service.EngineService._get_stack(self.ctx,
                                          self.stack.identifier()).AndReturn(s)
+        # Events are formatted without loading the stack
+        self.m.StubOutWithMock(parser.Stack, 'load')
         self.m.ReplayAll()
 
         events = self.eng.list_events(self.ctx, self.stack.identifier())
@@ -576,11 +590,26 @@ class stackServiceTest(HeatTestCase):
 
         self.m.VerifyAll()
 
+    @stack_context('service_event_list_all_test_stack')
+    def test_stack_event_list_all(self):
+        self.m.StubOutWithMock(parser.Stack, 'load')
+        self.m.ReplayAll()
+
+        events = self.eng.list_events(self.ctx, None)
+
+        self.assertEqual(len(events), 2)
+        for ev in events:
+            self.assertEqual(ev['stack_identity'],
+                             dict(self.stack.identifier()))
+            self.assertEqual(ev['logical_resource_id'], 'WebServer')
+            self.assertEqual(ev['resource_type'], 'AWS::EC2::Instance')
+
+        self.m.VerifyAll()
+
     @stack_context('service_list_all_test_stack')
     def test_stack_list_all(self):
+        # Stacks are listed without being loaded in full
         self.m.StubOutWithMock(parser.Stack, 'load')
-        parser.Stack.load(self.ctx, stack=mox.IgnoreArg(), resolve_data=False)\
-            .AndReturn(self.stack)
 
         self.m.ReplayAll()
         sl = self.eng.list_stacks(self.ctx)
@@ -1163,3 +1192,35 @@ class stackServiceTest(HeatTestCase):
         sl = self.eng.show_stack(self.ctx, None)
 
         self.assertEqual(len(sl), 0)
+
+    def test_get_task_stats_disabled(self):
+        self.m.stubs.Set(scheduler, 'instrumentation', None)
+        self.m.stubs.Set(scheduler, 'reactor', None)
+        stats = self.eng.get_task_stats(self.ctx)
+        self.assertEqual({'reactor': {}, 'tasks': {}}, stats)
+
+    def test_get_task_stats(self):
+        self.m.stubs.Set(scheduler, 'instrumentation',
+                         scheduler.Instrumentation())
+        self.m.stubs.Set(scheduler, 'reactor', scheduler.Reactor())
+
+        class Owner(object):
+            def instrumentation_keys(self):
+                return {'resource_type': 'Foo'}
+
+            def task(self):
+                yield
+
+        scheduler.TaskRunner(Owner().task)(wait_time=None)
+
+        stats = self.eng.get_task_stats(self.ctx)
+        self.assertEqual(0, stats['reactor']['depth'])
+        totals = stats['tasks']['resource_type']['Foo']
+        self.assertEqual(1, totals['finished'])
+        self.assertEqual(2, totals['steps'])
+
+    def test_get_task_stats_not_admin(self):
+        ctx = create_context(self.m, self.username, self.tenant,
+                             ctx=context.RequestContext())
+        self.assertRaises(exception.NotAuthorized,
+                          self.eng.get_task_stats, ctx)
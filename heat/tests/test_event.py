@@ -84,6 +84,23 @@ class EventTest(HeatTestCase):
         self.assertNotEqual(loaded_e.timestamp, None)
         self.assertEqual(loaded_e.resource_properties, {'foo': True})
 
+    def test_from_db(self):
+        e = event.Event(self.ctx, self.stack, self.resource,
+                        'TEST_IN_PROGRESS', 'Testing',
+                        'wibble', self.resource.properties)
+        e.store()
+
+        ev = db_api.event_get(self.ctx, e.id)
+        summary = parser.StackSummary(self.ctx, ev.stack)
+        loaded_e = event.Event.from_db(self.ctx, summary, ev)
+
+        self.assertEqual(loaded_e.resource, None)
+        self.assertEqual(loaded_e.resource_name, self.resource.name)
+        self.assertEqual(loaded_e.resource_type, 'GenericResourceType')
+        self.assertEqual(loaded_e.new_state, 'TEST_IN_PROGRESS')
+        self.assertEqual(loaded_e.physical_resource_id, 'wibble')
+        self.assertEqual(loaded_e.identifier(), e.identifier())
+
     def test_identifier(self):
         e = event.Event(self.ctx, self.stack, self.resource,
                         'TEST_IN_PROGRESS', 'Testing',
@@ -129,7 +129,7 @@ class instancesTest(HeatTestCase):
         get().AndRaise(instances.clients.novaclient.exceptions.NotFound(404))
         mox.Replay(get)
 
-        instance.delete()
+        scheduler.TaskRunner(instance.delete)()
         self.assertTrue(instance.resource_id is None)
         self.assertEqual(instance.state, instance.DELETE_COMPLETE)
         self.m.VerifyAll()
@@ -100,7 +100,7 @@ class InstanceGroupTest(HeatTestCase):
         self.assertEqual('1.2.3.4', rsrc.FnGetAtt('InstanceList'))
         self.assertEqual('JobServerGroup-0', rsrc.resource_id)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_missing_image(self):
@@ -162,7 +162,7 @@ class InstanceGroupTest(HeatTestCase):
         self.assertEqual('10.0.0.2,10.0.0.3,10.0.0.4,10.0.0.5,10.0.0.6',
                          rsrc.FnGetAtt('InstanceList'))
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_update_fail_badkey(self):
@@ -184,7 +184,7 @@ class InstanceGroupTest(HeatTestCase):
         self.assertRaises(resource.UpdateReplace,
                           rsrc.update, update_snippet)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_update_fail_badprop(self):
@@ -206,5 +206,5 @@ class InstanceGroupTest(HeatTestCase):
         self.assertRaises(resource.UpdateReplace,
                           rsrc.update, update_snippet)
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
@@ -142,11 +142,11 @@ class LoadBalancerTest(HeatTestCase):
         rsrc.t['Properties']['HealthCheck'] = hc
         self.assertEqual(None, rsrc.validate())
 
-        hc['Timeout'] = 35
+        rsrc.t['Properties']['HealthCheck'] = dict(hc, Timeout=35)
         self.assertEqual(
             {'Error': 'Interval must be larger than Timeout'},
             rsrc.validate())
-        hc['Timeout'] = 5
+        rsrc.t['Properties']['HealthCheck'] = hc
 
         self.assertEqual('LoadBalancer', rsrc.FnGetRefId())
 
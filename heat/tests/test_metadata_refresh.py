@@ -156,7 +156,7 @@ class MetadataRefreshTest(HeatTestCase):
             instance.Instance.handle_create().AndReturn(cookie)
             create_complete = instance.Instance.check_create_complete(cookie)
             create_complete.InAnyOrder().AndReturn(True)
-        scheduler.TaskRunner._sleep(mox.IsA(int)).AndReturn(None)
+        scheduler.TaskRunner._sleep(mox.IsA((int, float))).AndReturn(None)
         self.m.StubOutWithMock(instance.Instance, 'FnGetAtt')
 
         return stack
@@ -248,7 +248,7 @@ class WaitCondMetadataUpdateTest(HeatTestCase):
 
         def check_empty(sleep_time):
             self.assertEqual(watch.FnGetAtt('Data'), '{}')
-            self.assertEqual(inst.metadata['test'], None)
+            self.assertEqual(inst.metadata['test'], '{}')
 
         def update_metadata(id, data, reason):
             self.man.metadata_update(self.ctx,
@@ -262,7 +262,7 @@ class WaitCondMetadataUpdateTest(HeatTestCase):
 
         scheduler.TaskRunner._sleep(mox.IsA(int)).WithSideEffects(check_empty)
         scheduler.TaskRunner._sleep(mox.IsA(int)).WithSideEffects(post_success)
-        scheduler.TaskRunner._sleep(mox.IsA(int)).AndReturn(None)
+        scheduler.TaskRunner._sleep(mox.IsA((int, float))).AndReturn(None)
 
         self.m.ReplayAll()
         self.stack.create()
@@ -273,6 +273,8 @@ class WaitCondMetadataUpdateTest(HeatTestCase):
         self.assertEqual(inst.metadata['test'], '{"123": "foo"}')
 
         update_metadata('456', 'blarg', 'wibble')
+        self.stack['WH'].refresh()
+        inst.refresh()
         self.assertEqual(watch.FnGetAtt('Data'),
                          '{"123": "foo", "456": "blarg"}')
         self.assertEqual(inst.metadata['test'],
@@ -18,6 +18,7 @@ from heat.common import exception
 from heat.common import template_format
 from heat.engine import parser
 from heat.engine import resource
+from heat.engine import scheduler
 from heat.common import urlfetch
 from heat.tests.common import HeatTestCase
 from heat.tests import utils
@@ -89,7 +90,7 @@ Outputs:
         self.assertRaises(
             exception.InvalidTemplateAttribute, rsrc.FnGetAtt, 'Foo')
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.assertTrue(rsrc.FnGetRefId().startswith(arn_prefix))
 
         self.m.VerifyAll()
@@ -17,6 +17,7 @@ import testtools
 import json
 
 from heat.engine import parameters
+from heat.engine import parser
 
 
 class ParameterTest(testtools.TestCase):
@@ -338,3 +339,48 @@ class ParametersTest(testtools.TestCase):
                     'AWS::StackName': 'test_params'}
 
         self.assertEqual(params.map(str), expected)
+
+    def test_constraints_compiled_once(self):
+        tmpl = parser.Template({'Parameters': {
+            'Foo': {'Type': 'String', 'AllowedPattern': '[a-z]*',
+                    'MaxLength': '4', 'Default': 'foo'}}})
+        params1 = parameters.Parameters('test', tmpl, {'Foo': 'bar'})
+        params2 = parameters.Parameters('test', tmpl)
+        self.assertTrue(params1.params['Foo'].constraints is
+                        params2.params['Foo'].constraints)
+        self.assertEqual(4, params1.params['Foo'].constraints.max_length)
+
+        # User values are still checked against the shared constraints
+        self.assertRaises(ValueError, parameters.Parameters,
+                          'test', tmpl, {'Foo': 'BAR'})
+        self.assertRaises(ValueError, parameters.Parameters,
+                          'test', tmpl, {'Foo': 'quux1'})
+
+    def test_invalid_default_always_rejected(self):
+        tmpl = parser.Template({'Parameters': {
+            'Foo': {'Type': 'Number', 'MaxValue': '10', 'Default': '11'}}})
+        for i in range(2):
+            self.assertRaises(ValueError, parameters.Parameters, 'test', tmpl)
+
+    def test_invalid_constraint_not_compiled_until_used(self):
+        tmpl = parser.Template({'Parameters': {
+            'Foo': {'Type': 'String', 'MaxLength': 'wibble'},
+            'Bar': {'Type': 'String', 'AllowedPattern': '[a-z'}}})
+        params = parameters.Parameters('test', tmpl)
+        self.assertTrue('Foo' in params)
+
+        try:
+            parameters.Parameters('test', tmpl, {'Bar': 'bar'})
+        except ValueError as ve:
+            self.assertTrue(str(ve).startswith('Bar '))
+            self.assertTrue('AllowedPattern' in str(ve))
+        else:
+            self.fail('ValueError not raised')
+
+        try:
+            parameters.Parameters('test', tmpl, {'Foo': 'foo'})
+        except ValueError as ve:
+            self.assertTrue(str(ve).startswith('Foo '))
+            self.assertTrue('MaxLength' in str(ve))
+        else:
+            self.fail('ValueError not raised')
@@ -20,12 +20,14 @@ import uuid
 from heat.common import context
 from heat.common import exception
 from heat.common import template_format
+from heat.engine import api
 from heat.engine import clients
 from heat.engine import resource
 from heat.engine import parser
 from heat.engine import parameters
 from heat.engine import scheduler
 from heat.engine import template
+from heat.engine.resources import cloud_watch
 
 from heat.tests.common import HeatTestCase
 from heat.tests.utils import setup_dummy_db
@@ -47,14 +49,14 @@ class ParserTest(HeatTestCase):
         parsed = join(raw)
         for i in xrange(len(raw)):
             self.assertEqual(parsed[i], raw[i])
-        self.assertTrue(parsed is not raw)
+        self.assertTrue(parsed is raw)
 
     def test_dict(self):
         raw = {'foo': 'bar', 'blarg': 'wibble'}
         parsed = join(raw)
         for k in raw:
             self.assertEqual(parsed[k], raw[k])
-        self.assertTrue(parsed is not raw)
+        self.assertTrue(parsed is raw)
 
     def test_dict_list(self):
         raw = {'foo': ['bar', 'baz'], 'blarg': 'wibble'}
@@ -62,8 +64,7 @@ class ParserTest(HeatTestCase):
         self.assertEqual(parsed['blarg'], raw['blarg'])
         for i in xrange(len(raw['foo'])):
             self.assertEqual(parsed['foo'][i], raw['foo'][i])
-        self.assertTrue(parsed is not raw)
-        self.assertTrue(parsed['foo'] is not raw['foo'])
+        self.assertTrue(parsed is raw)
 
     def test_list_dict(self):
         raw = [{'foo': 'bar', 'blarg': 'wibble'}, 'baz', 'quux']
@@ -72,8 +73,7 @@ class ParserTest(HeatTestCase):
             self.assertEqual(parsed[i], raw[i])
         for k in raw[0]:
             self.assertEqual(parsed[0][k], raw[0][k])
-        self.assertTrue(parsed is not raw)
-        self.assertTrue(parsed[0] is not raw[0])
+        self.assertTrue(parsed is raw)
 
     def test_join(self):
         raw = {'Fn::Join': [' ', ['foo', 'bar', 'baz']]}
@@ -99,6 +99,15 @@ class ParserTest(HeatTestCase):
         self.assertEqual(parsed['blarg'], raw['blarg'])
         self.assertTrue(parsed is not raw)
 
+    def test_join_shared(self):
+        unchanged = {'foo': ['bar', 'baz']}
+        raw = [{'Fn::Join': [' ', ['foo', 'bar']]}, unchanged, {'Ref': 'x'}]
+        parsed = join(raw)
+        self.assertEqual('foo bar', parsed[0])
+        self.assertTrue(parsed[1] is unchanged)
+        self.assertTrue(parsed[2] is raw[2])
+        self.assertEqual(['foo', 'bar'], raw[0]['Fn::Join'][1])
+
     def test_join_recursive(self):
         raw = {'Fn::Join': ['\n', [{'Fn::Join':
                                    [' ', ['foo', 'bar']]}, 'baz']]}
@@ -361,6 +370,164 @@ class TemplateTest(HeatTestCase):
             parser.Template.resolve_availability_zones(snippet, stack),
             ["nova1"])
 
+    def test_references(self):
+        snippet = {'Properties': {
+                   'Foo': {'Ref': 'AResource'},
+                   'Bar': [{'Fn::GetAtt': ['BResource', 'Baz']}],
+                   'Quux': {'Fn::Join': ['', ['x', {'Ref': 'Param'}]]}},
+                   'DependsOn': 'CResource'}
+        self.assertEqual(sorted([('Ref', 'AResource', 'Foo'),
+                                 ('Fn::GetAtt', 'BResource', 'Baz'),
+                                 ('Ref', 'Param', 'Fn::Join'),
+                                 ('DependsOn', 'CResource', None)]),
+                         sorted(template.references(snippet)))
+
+    def test_resource_references_cached(self):
+        tmpl = parser.Template({'Resources': {
+            'AResource': {'Type': 'Foo'},
+            'BResource': {'Type': 'Foo', 'DependsOn': 'AResource'}}})
+        refs = tmpl.resource_references()
+        self.assertEqual({'AResource': [],
+                          'BResource': [('DependsOn', 'AResource', None)]},
+                         refs)
+        self.assertTrue(tmpl.resource_references() is refs)
+
+    def test_resource_references_static(self):
+        tmpl = parser.Template({'Resources': {
+            'AResource': {'Type': 'Foo'},
+            'BResource': {'Type': 'Foo', 'Properties': {
+                'Bar': {'Fn::FindInMap': ['Map', 'Key', 'Value']}}}}})
+        # References that may only appear once resolved are not indexed
+        self.assertEqual({'AResource': [], 'BResource': None},
+                         tmpl.resource_references())
+
+    def test_compile_constant(self):
+        snippet = {'Foo': ['bar', {'Baz': 'quux'}], 'Ref': 'Wibble'}
+        node = template.compile_snippet(snippet)
+        self.assertTrue(isinstance(node, template._Constant))
+        self.assertTrue(node.value is snippet)
+
+    def test_compile_calls(self):
+        constant = {'Baz': 'quux'}
+        snippet = {'Foo': {'Ref': 'Bar'}, 'Blarg': constant}
+        node = template.compile_snippet(snippet)
+        self.assertTrue(isinstance(node, template._Mapping))
+        items = dict(node.items)
+        self.assertTrue(isinstance(items['Foo'], template._Call))
+        self.assertEqual('Ref', items['Foo'].name)
+        self.assertTrue(items['Blarg'].value is constant)
+
+    def test_evaluator_order(self):
+        # The Fn::Join produced by the Fn::Select must still be resolved, but
+        # the Fn::Select produced by the Fn::Join must not.
+        evaluator = template.Evaluator([parser.Template.select_function(),
+                                        parser.Template.joins_function()])
+        select = {'Fn::Select': ['0', [{'Fn::Join': ['', ['a', 'b']]}]]}
+        self.assertEqual('ab', evaluator(select))
+
+        join = {'Fn::Join': ['', [{'Fn::Select': ['0', ['a']]}, 'b']]}
+        self.assertEqual('ab', evaluator(join))
+
+        def handle(args):
+            return {'Fn::Select': ['0', args]}
+
+        evaluator = template.Evaluator([parser.Template.select_function(),
+                                        template.Function('Fn::Join',
+                                                          handle)])
+        self.assertEqual({'Fn::Select': ['0', ['a']]},
+                         evaluator({'Fn::Join': ['a']}))
+
+    def test_evaluator_unmatched(self):
+        params = {'Foo': 'bar'}
+        evaluator = template.Evaluator([
+            parser.Template.param_ref_function(params),
+            parser.Template.joins_function()])
+        # Arguments that are not matched before resolution are left alone
+        snippet = {'Ref': {'Fn::Join': ['', ['F', 'oo']]}}
+        self.assertEqual({'Ref': 'Foo'}, evaluator(snippet))
+
+    def test_static_evaluator(self):
+        tmpl = parser.Template(mapping_template)
+        params = {'Key': 'TestKey'}
+        snippet = {'Fn::Join': [' ', [
+            'x', 'y',
+            {'Fn::FindInMap': ['ValidMapping', {'Ref': 'Key'}, 'TestValue']},
+            {'Fn::GetAtt': ['Foo', 'Bar']}]]}
+        evaluator = tmpl.static_evaluator(None, params)
+        self.assertEqual({'Fn::Join': [' ', ['x y wibble',
+                                             {'Fn::GetAtt': ['Foo', 'Bar']}]]},
+                         evaluator(snippet))
+
+    def test_template_copied(self):
+        t = {'Resources': {'AResource': {
+            'Type': 'Foo',
+            'Properties': {'Bar': {'Ref': 'Key'}}}}}
+        tmpl = parser.Template(t)
+        evaluator = tmpl.static_evaluator(None, {'Key': 'a', 'Other': 'b'})
+        snippet = t['Resources']['AResource']['Properties']
+        self.assertEqual({'Bar': 'a'}, evaluator(snippet))
+
+        # Changes to the original definition do not reach the Template, and
+        # are not hidden by snippets it has already compiled
+        snippet['Bar']['Ref'] = 'Other'
+        self.assertEqual({'Bar': 'b'}, evaluator(snippet))
+        self.assertEqual({'Bar': {'Ref': 'Key'}},
+                         tmpl[template.RESOURCES]['AResource']['Properties'])
+
+    def test_compile_from_template(self):
+        tmpl = parser.Template({'Resources': {
+            'AResource': {'Type': 'Foo',
+                          'Properties': {'Bar': {'Ref': 'Baz'}}}}})
+        snippet = tmpl[template.RESOURCES]['AResource']
+        node = tmpl.compile(snippet)
+        self.assertTrue(node is tmpl.compile(snippet))
+        self.assertTrue(tmpl.compile(snippet['Properties']) is
+                        dict(node.items)['Properties'])
+
+        # A snippet that is not part of the template is compiled afresh
+        copied = {'Type': 'Foo', 'Properties': snippet['Properties']}
+        copied_node = tmpl.compile(copied)
+        self.assertFalse(copied_node is node)
+        self.assertTrue(dict(copied_node.items)['Properties'] is
+                        dict(node.items)['Properties'])
+
+    def test_template_cache(self):
+        cache = template.TemplateCache(2)
+        tmpls = [parser.Template({}) for i in range(3)]
+        cache.put(1, tmpls[0])
+        cache.put(2, tmpls[1])
+        self.assertTrue(cache.get(1) is tmpls[0])
+
+        # The least recently used entry is evicted
+        cache.put(3, tmpls[2])
+        self.assertEqual(2, len(cache))
+        self.assertEqual(None, cache.get(2))
+        self.assertTrue(cache.get(1) is tmpls[0])
+        self.assertTrue(cache.get(3) is tmpls[2])
+        self.assertEqual(3, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    def test_template_cache_resize(self):
+        cache = template.TemplateCache(3)
+        tmpls = [parser.Template({}) for i in range(3)]
+        for i, tmpl in enumerate(tmpls):
+            cache.put(i, tmpl)
+        cache.get(0)
+
+        # The least recently used entries are evicted
+        cache.resize(1)
+        self.assertEqual(1, len(cache))
+        self.assertTrue(cache.get(0) is tmpls[0])
+
+        cache.resize(0)
+        self.assertEqual(0, len(cache))
+
+    def test_template_cache_disabled(self):
+        cache = template.TemplateCache(0)
+        cache.put(1, parser.Template({}))
+        self.assertEqual(0, len(cache))
+        self.assertEqual(None, cache.get(1))
+
 
 class StackTest(HeatTestCase):
     def setUp(self):
@@ -380,6 +547,55 @@ class StackTest(HeatTestCase):
 
         self.m.ReplayAll()
 
+    def test_dependencies_from_index(self):
+        tmpl = {'Resources': {
+                'AResource': {'Type': 'GenericResourceType'},
+                'BResource': {'Type': 'GenericResourceType',
+                              'DependsOn': 'AResource'}}}
+        walked = []
+        references = template.references
+
+        def count_references(snippet):
+            walked.append(snippet)
+            return references(snippet)
+
+        self.m.stubs.Set(template, 'references', count_references)
+
+        # Each resource snippet is walked only once per Template
+        t = parser.Template(tmpl)
+        for i in range(2):
+            stack = parser.Stack(None, 'test_stack', t)
+            self.assertEqual(['AResource', 'BResource'],
+                             [r.name for r in stack])
+        self.assertEqual(2, len(walked))
+
+    def test_load_template_cached(self):
+        self.m.stubs.Set(template, 'cache', template.TemplateCache(10))
+        tmpl_id = parser.Template({'Resources': {}}).store(self.ctx)
+        other_id = parser.Template({'Resources': {}}).store(self.ctx)
+
+        loaded = parser.Template.load(self.ctx, tmpl_id)
+        self.assertEqual(tmpl_id, loaded.id)
+        self.assertTrue(parser.Template.load(self.ctx, tmpl_id) is loaded)
+        self.assertFalse(parser.Template.load(self.ctx, other_id) is loaded)
+
+    def test_load_template_changed(self):
+        self.m.stubs.Set(template, 'cache', template.TemplateCache(10))
+        tmpl_id = parser.Template({'Resources': {}}).store(self.ctx)
+        loaded = parser.Template.load(self.ctx, tmpl_id)
+
+        # A template with different contents is never taken from the cache
+        raw = db_api.raw_template_get(self.ctx, tmpl_id)
+        raw.template = {'Description': 'Changed', 'Resources': {}}
+        self.m.StubOutWithMock(db_api, 'raw_template_get')
+        db_api.raw_template_get(self.ctx, tmpl_id).AndReturn(raw)
+        self.m.ReplayAll()
+
+        reloaded = parser.Template.load(self.ctx, tmpl_id)
+        self.assertFalse(reloaded is loaded)
+        self.assertEqual('Changed', reloaded[template.DESCRIPTION])
+        self.m.VerifyAll()
+
     def test_state_defaults(self):
         stack = parser.Stack(None, 'test_stack', parser.Template({}))
         self.assertEqual(stack.state, None)
@@ -447,6 +663,125 @@ class StackTest(HeatTestCase):
         newstack = parser.Stack.load(self.ctx, stack_id=self.stack.id)
         self.assertEqual(newstack.parameters['AWS::StackId'], identifier.arn())
 
+    @stack_delete_after
+    def test_load_resources_bulk(self):
+        tmpl = {'Resources': {
+                'AResource': {'Type': 'GenericResourceType'},
+                'BResource': {'Type': 'GenericResourceType'}}}
+        self.stack = parser.Stack(self.ctx, 'bulk_load_test',
+                                  parser.Template(tmpl))
+        self.stack.store()
+        scheduler.TaskRunner(self.stack['AResource'].create)()
+
+        self.m.StubOutWithMock(db_api, 'resource_get_by_name_and_stack')
+        self.m.ReplayAll()
+
+        stack = parser.Stack.load(self.ctx, stack_id=self.stack.id)
+        self.assertEqual(self.stack['AResource'].id, stack['AResource'].id)
+        self.assertEqual(stack['AResource'].CREATE_COMPLETE,
+                         stack['AResource'].state)
+        self.assertEqual(None, stack['BResource'].id)
+        self.m.VerifyAll()
+
+    @stack_delete_after
+    def test_create_buffered_writes(self):
+        tmpl = {'Resources': {
+                'AResource': {'Type': 'GenericResourceType'},
+                'BResource': {'Type': 'GenericResourceType',
+                              'DependsOn': 'AResource'}}}
+        self.stack = parser.Stack(self.ctx, 'buffered_test',
+                                  parser.Template(tmpl))
+        self.stack.store()
+
+        self.m.StubOutWithMock(db_api, 'resource_get')
+        self.m.StubOutWithMock(db_api, 'event_create')
+        self.m.ReplayAll()
+
+        self.stack.create()
+        self.m.VerifyAll()
+        self.assertEqual(None, self.stack.write_buffer)
+
+        self.m.UnsetStubs()
+        rows = db_api.resource_get_all_by_stack(self.ctx, self.stack.id)
+        for name in ('AResource', 'BResource'):
+            self.assertEqual(resource.Resource.CREATE_COMPLETE,
+                             rows[name].state)
+        events = db_api.event_get_all_by_stack(self.ctx, self.stack.id)
+        self.assertEqual([('AResource', 'IN_PROGRESS'),
+                          ('AResource', 'CREATE_COMPLETE'),
+                          ('BResource', 'IN_PROGRESS'),
+                          ('BResource', 'CREATE_COMPLETE')],
+                         [(e.logical_resource_id, e.name)
+                          for e in sorted(events, key=lambda e: e.id)])
+        self.assertEqual(parser.Stack.CREATE_COMPLETE,
+                         db_api.stack_get(self.ctx, self.stack.id).status)
+
+    @stack_delete_after
+    def test_create_buffered_resource_id_written(self):
+        tmpl = {'Resources': {'AResource': {'Type': 'GenericResourceType'}}}
+        self.stack = parser.Stack(self.ctx, 'buffered_id_test',
+                                  parser.Template(tmpl))
+        self.stack.store()
+
+        stored_ids = []
+
+        def handle_create(rsrc):
+            rsrc.resource_id_set('phys-id')
+            rs = db_api.resource_get(self.ctx, rsrc.id)
+            stored_ids.append(rs.nova_instance)
+
+        self.m.stubs.Set(generic_rsrc.GenericResource, 'handle_create',
+                         handle_create)
+        self.m.ReplayAll()
+
+        self.stack.create()
+        self.assertEqual(parser.Stack.CREATE_COMPLETE, self.stack.state)
+        self.assertEqual(['phys-id'], stored_ids)
+
+    def test_resource_get_all_by_stack(self):
+        tmpl = {'Resources': {
+                'AResource': {'Type': 'GenericResourceType'},
+                'BResource': {'Type': 'GenericResourceType'}}}
+        stack = parser.Stack(self.ctx, 'bulk_get_test', parser.Template(tmpl))
+        stack_id = stack.store()
+        self.assertEqual({}, db_api.resource_get_all_by_stack(self.ctx,
+                                                              stack_id))
+
+        stack.create()
+        rows = db_api.resource_get_all_by_stack(self.ctx, stack_id)
+        self.assertEqual(['AResource', 'BResource'], sorted(rows))
+        self.assertEqual(stack['BResource'].id, rows['BResource'].id)
+        stack.delete()
+
+    @stack_delete_after
+    def test_summary(self):
+        tmpl = {'Description': 'Summary test',
+                'Parameters': {'Foo': {'Type': 'String', 'Default': 'bar'}},
+                'Resources': {'AResource': {'Type': 'GenericResourceType'}}}
+        self.stack = parser.Stack(self.ctx, 'summary_test',
+                                  parser.Template(tmpl),
+                                  state=parser.Stack.CREATE_COMPLETE)
+        self.stack.store()
+
+        self.m.StubOutWithMock(resource.Resource, '__init__')
+        self.m.ReplayAll()
+
+        summary = parser.StackSummary(self.ctx,
+                                      db_api.stack_get(self.ctx,
+                                                       self.stack.id))
+        self.assertEqual(self.stack.identifier(), summary.identifier())
+        self.assertEqual('bar', summary.parameters['Foo'])
+        self.assertEqual(self.stack.parameters['AWS::StackId'],
+                         summary.parameters['AWS::StackId'])
+
+        info = api.format_stack(summary)
+        self.assertEqual('summary_test', info['stack_name'])
+        self.assertEqual('Summary test', info['description'])
+        self.assertEqual(parser.Stack.CREATE_COMPLETE, info['stack_status'])
+        self.assertEqual(self.stack.parameters.map(str), info['parameters'])
+        self.assertEqual([], info['outputs'])
+        self.m.VerifyAll()
+
     @stack_delete_after
     def test_created_time(self):
         self.stack = parser.Stack(self.ctx, 'creation_time_test',
@@ -481,6 +816,67 @@ class StackTest(HeatTestCase):
         self.assertEqual(db_s, None)
         self.assertEqual(self.stack.state, self.stack.DELETE_COMPLETE)
 
+    def test_delete_forgets_task_stats(self):
+        self.m.stubs.Set(scheduler, 'instrumentation',
+                         scheduler.Instrumentation())
+        tmpl = {'Resources': {'AResource': {'Type': 'GenericResourceType'}}}
+        self.stack = parser.Stack(self.ctx, 'delete_stats_test',
+                                  template.Template(tmpl))
+        stack_id = self.stack.store()
+        self.stack.create()
+        self.assertEqual(self.stack.state, parser.Stack.CREATE_COMPLETE)
+        report = scheduler.instrumentation.report()
+        self.assertTrue(stack_id in report['stack'])
+
+        self.stack.delete()
+        self.assertEqual(self.stack.state, self.stack.DELETE_COMPLETE)
+        report = scheduler.instrumentation.report()
+        self.assertFalse(stack_id in report['stack'])
+        self.assertTrue('GenericResourceType' in report['resource_type'])
+
+    def test_delete_task_stats(self):
+        self.m.stubs.Set(scheduler, 'instrumentation',
+                         scheduler.Instrumentation())
+        tmpl = {'Resources': {'AResource': {'Type': 'GenericResourceType'},
+                              'BResource': {'Type': 'GenericResourceType'}}}
+        self.stack = parser.Stack(self.ctx, 'delete_stats_test',
+                                  template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        totals = scheduler.instrumentation.report()['resource_type']
+        self.assertEqual(2, totals['GenericResourceType']['finished'])
+
+        self.stack.delete()
+        self.assertEqual(self.stack.state, self.stack.DELETE_COMPLETE)
+        totals = scheduler.instrumentation.report()['resource_type']
+        self.assertEqual(4, totals['GenericResourceType']['finished'])
+
+    @stack_delete_after
+    def test_update_task_stats(self):
+        self.m.stubs.Set(scheduler, 'instrumentation',
+                         scheduler.Instrumentation())
+        tmpl = {'Resources': {'AResource': {'Type': 'GenericResourceType'}}}
+        self.stack = parser.Stack(self.ctx, 'update_stats_test',
+                                  template.Template(tmpl))
+        stack_id = self.stack.store()
+        self.stack.create()
+
+        tmpl2 = {'Resources': {
+                 'AResource': {'Type': 'GenericResourceType'},
+                 'BResource': {'Type': 'GenericResourceType'}}}
+        updated_stack = parser.Stack(self.ctx, 'updated_stack',
+                                     template.Template(tmpl2))
+        self.stack.update(updated_stack)
+        self.assertEqual(self.stack.state, parser.Stack.UPDATE_COMPLETE)
+
+        # One create, then a removal check of AResource and an update of
+        # each resource, all counted against this stack
+        report = scheduler.instrumentation.report()
+        self.assertEqual(4, report['resource_type']['GenericResourceType'][
+            'finished'])
+        self.assertEqual(4, report['stack'][stack_id]['finished'])
+        self.assertFalse(None in report['stack'])
+
     @stack_delete_after
     def test_delete_rollback(self):
         self.stack = parser.Stack(self.ctx, 'delete_rollback_test',
@@ -496,6 +892,43 @@ class StackTest(HeatTestCase):
         self.assertEqual(db_s, None)
         self.assertEqual(self.stack.state, self.stack.ROLLBACK_COMPLETE)
 
+    @stack_delete_after
+    def test_delete_concurrent(self):
+        generic_rsrc.GenericResource.properties_schema = {
+            'Foo': {'Type': 'String'}}
+        tmpl = {'Resources': {
+                'AResource': {'Type': 'GenericResourceType'},
+                'BResource': {'Type': 'GenericResourceType',
+                              'Properties': {'Foo': {'Ref': 'AResource'}}},
+                'CResource': {'Type': 'GenericResourceType'}}}
+        self.stack = parser.Stack(self.ctx, 'delete_concurrent_test',
+                                  parser.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual(self.stack.state, self.stack.CREATE_COMPLETE)
+
+        deleting = []
+        checks = dict((r, 0) for r in self.stack.keys())
+
+        def check_delete_complete(rsrc, delete_data):
+            deleting.append(sorted(r.name for r in self.stack
+                                   if r.state == r.DELETE_IN_PROGRESS))
+            checks[rsrc.name] += 1
+            return checks[rsrc.name] > 1
+
+        self.m.StubOutWithMock(scheduler.TaskRunner, '_sleep')
+        scheduler.TaskRunner._sleep(mox.IsA(int)).MultipleTimes()
+        self.m.ReplayAll()
+        self.m.stubs.Set(generic_rsrc.GenericResource,
+                         'check_delete_complete', check_delete_complete)
+
+        self.stack.delete()
+
+        self.assertEqual(self.stack.state, self.stack.DELETE_COMPLETE)
+        # BResource and CResource are deleted together, then AResource
+        self.assertTrue(['BResource', 'CResource'] in deleting)
+        self.assertEqual(['AResource'], deleting[-1])
+
     @stack_delete_after
     def test_delete_badaction(self):
         self.stack = parser.Stack(self.ctx, 'delete_badaction_test',
@@ -562,6 +995,209 @@ class StackTest(HeatTestCase):
         self.assertEqual(self.stack.state, parser.Stack.UPDATE_COMPLETE)
         self.assertTrue('BResource' in self.stack)
 
+    @stack_delete_after
+    def test_update_add_alarm(self):
+        resource._register_class('AWS::CloudWatch::Alarm',
+                                 cloud_watch.CloudWatchAlarm)
+        tmpl = {'Resources': {'AResource': {'Type': 'GenericResourceType'}}}
+
+        self.stack = parser.Stack(self.ctx, 'update_test_stack',
+                                  template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual(self.stack.state, parser.Stack.CREATE_COMPLETE)
+
+        # The alarm is not a strict dependency of the instance that refers
+        # to it, so the instance may be added to the stack before the alarm
+        tmpl2 = {'Resources': {
+                 'AResource': {'Type': 'GenericResourceType'},
+                 'WebServer': {'Type': 'GenericResourceType',
+                               'Metadata': {'alarm': {'Ref': 'Alarm'}}},
+                 'Alarm': {'Type': 'AWS::CloudWatch::Alarm',
+                           'Properties': {
+                               'MetricName': 'CPUUtilization',
+                               'Statistic': 'Average',
+                               'Period': '60',
+                               'EvaluationPeriods': '1',
+                               'Threshold': '50',
+                               'ComparisonOperator': 'GreaterThanThreshold',
+                               'Dimensions': [{
+                                   'Name': 'InstanceId',
+                                   'Value': {'Ref': 'WebServer'}}]}}}}
+        updated_stack = parser.Stack(self.ctx, 'updated_stack',
+                                     template.Template(tmpl2))
+        self.stack.update(updated_stack)
+        self.assertEqual(self.stack.state, parser.Stack.UPDATE_COMPLETE)
+        self.assertEqual(self.stack['Alarm'].state,
+                         self.stack['Alarm'].CREATE_COMPLETE)
+
+        # The alarm still depends on the instance
+        self.assertEqual(set(['WebServer', 'Alarm']),
+                         set(r.name for r in self.stack.dependencies[
+                             self.stack['WebServer']]))
+
+    @stack_delete_after
+    def test_update_invalid_reference(self):
+        tmpl = {'Resources': {'AResource': {'Type': 'GenericResourceType'}}}
+
+        self.stack = parser.Stack(self.ctx, 'update_test_stack',
+                                  template.Template(tmpl),
+                                  disable_rollback=True)
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual(self.stack.state, parser.Stack.CREATE_COMPLETE)
+
+        tmpl2 = {'Resources': {
+                 'AResource': {'Type': 'GenericResourceType'},
+                 'BResource': {'Type': 'GenericResourceType'}}}
+        updated_stack = parser.Stack(self.ctx, 'updated_stack',
+                                     template.Template(tmpl2))
+
+        self.m.StubOutWithMock(parser.Stack, '_relink')
+        parser.Stack._relink(None, mox.IgnoreArg()).AndRaise(
+            exception.InvalidTemplateReference(resource='CResource',
+                                               key='Foo'))
+        self.m.ReplayAll()
+
+        self.stack.update(updated_stack)
+        self.assertEqual(self.stack.state, parser.Stack.UPDATE_FAILED)
+        self.m.VerifyAll()
+
+    @stack_delete_after
+    def test_update_add_concurrent(self):
+        generic_rsrc.GenericResource.properties_schema = {
+            'Foo': {'Type': 'String'}}
+        tmpl = {'Resources': {'AResource': {'Type': 'GenericResourceType'}}}
+
+        self.stack = parser.Stack(self.ctx, 'update_test_stack',
+                                  template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual(self.stack.state, parser.Stack.CREATE_COMPLETE)
+
+        tmpl2 = {'Resources': {
+                 'AResource': {'Type': 'GenericResourceType'},
+                 'BResource': {'Type': 'GenericResourceType'},
+                 'CResource': {'Type': 'GenericResourceType'},
+                 'DResource': {'Type': 'GenericResourceType',
+                               'Properties': {'Foo': {'Ref': 'BResource'}}}}}
+        updated_stack = parser.Stack(self.ctx, 'updated_stack',
+                                     template.Template(tmpl2))
+
+        creating = []
+        checks = dict((r, 0) for r in updated_stack.keys())
+
+        def check_create_complete(rsrc, create_data):
+            creating.append(sorted(r.name
+                                   for r in self.stack.resources.values()
+                                   if r.state == r.CREATE_IN_PROGRESS))
+            checks[rsrc.name] += 1
+            return checks[rsrc.name] > 1
+
+        self.m.StubOutWithMock(scheduler.TaskRunner, '_sleep')
+        scheduler.TaskRunner._sleep(mox.IsA(int)).MultipleTimes()
+        self.m.ReplayAll()
+        self.m.stubs.Set(generic_rsrc.GenericResource,
+                         'check_create_complete', check_create_complete)
+
+        self.stack.update(updated_stack)
+        self.assertEqual(self.stack.state, parser.Stack.UPDATE_COMPLETE)
+        for r in ('BResource', 'CResource', 'DResource'):
+            self.assertTrue(r in self.stack)
+        # BResource and CResource are created together, then DResource
+        self.assertTrue(['BResource', 'CResource'] in creating)
+        self.assertEqual(['DResource'], creating[-1])
+        self.assertEqual(['AResource', 'BResource', 'CResource', 'DResource'],
+                         sorted(r.name for r in self.stack))
+
+    def test_dependencies_find_in_map(self):
+        tmpl = {'Mappings': {'Map': {'Key': {'Value': {'Ref': 'AResource'}}}},
+                'Resources': {
+                    'AResource': {'Type': 'GenericResourceType'},
+                    'BResource': {'Type': 'GenericResourceType',
+                                  'Metadata': {'Fn::FindInMap': [
+                                      'Map', 'Key', 'Value']}}}}
+        self.stack = parser.Stack(self.ctx, 'find_in_map_test',
+                                  template.Template(tmpl))
+        self.assertEqual(['AResource', 'BResource'],
+                         [r.name for r in self.stack])
+        self.assertEqual(set(['AResource', 'BResource']),
+                         set(r.name for r in self.stack.dependencies[
+                             self.stack['AResource']]))
+
+    @stack_delete_after
+    def test_update_dependencies(self):
+        generic_rsrc.GenericResource.properties_schema = {
+            'Foo': {'Type': 'String'}}
+        tmpl = {'Resources': {
+                'AResource': {'Type': 'GenericResourceType'},
+                'BResource': {'Type': 'GenericResourceType',
+                              'Properties': {'Foo': {'Ref': 'AResource'}}}}}
+
+        self.stack = parser.Stack(self.ctx, 'update_test_stack',
+                                  template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual(self.stack.state, parser.Stack.CREATE_COMPLETE)
+
+        tmpl2 = {'Resources': {
+                 'BResource': {'Type': 'GenericResourceType'},
+                 'CResource': {'Type': 'GenericResourceType',
+                               'Properties': {'Foo': {'Ref': 'BResource'}}}}}
+        updated_stack = parser.Stack(self.ctx, 'updated_stack',
+                                     template.Template(tmpl2))
+
+        # The graph is maintained incrementally, not rebuilt
+        self.m.StubOutWithMock(parser.Stack, '_get_dependencies')
+        self.m.ReplayAll()
+
+        self.stack.update(updated_stack)
+        self.assertEqual(self.stack.state, parser.Stack.UPDATE_COMPLETE)
+        self.assertEqual(['BResource', 'CResource'],
+                         [r.name for r in self.stack])
+        self.assertEqual(['CResource'],
+                         [r.name for r in
+                          self.stack.dependencies[self.stack['CResource']]])
+        self.m.VerifyAll()
+
+    @stack_delete_after
+    def test_update_inplace_dependencies(self):
+        generic_rsrc.GenericResource.properties_schema = {
+            'Foo': {'Type': 'String'}}
+        tmpl = {'Resources': {
+                'AResource': {'Type': 'GenericResourceType'},
+                'BResource': {'Type': 'GenericResourceType',
+                              'Properties': {'Foo': {'Ref': 'AResource'}}}}}
+
+        self.stack = parser.Stack(self.ctx, 'update_test_stack',
+                                  template.Template(tmpl))
+        self.stack.store()
+        self.stack.create()
+        self.assertEqual(self.stack.state, parser.Stack.CREATE_COMPLETE)
+
+        tmpl2 = {'Resources': {
+                 'AResource': {'Type': 'GenericResourceType'},
+                 'BResource': {'Type': 'GenericResourceType',
+                               'Properties': {'Foo': {'Fn::Join': [
+                                   '-', [{'Ref': 'AResource'}, 'x']]}}}}}
+        updated_stack = parser.Stack(self.ctx, 'updated_stack',
+                                     template.Template(tmpl2))
+
+        b_res = self.stack['BResource']
+        b_res.update_allowed_keys = ('Properties',)
+        b_res.update_allowed_properties = ('Foo',)
+        self.stack.update(updated_stack)
+        self.assertEqual(self.stack.state, parser.Stack.UPDATE_COMPLETE)
+
+        # BResource was updated in place and still requires AResource
+        self.assertTrue(self.stack['BResource'] is b_res)
+        self.assertEqual(b_res.state, b_res.UPDATE_COMPLETE)
+        self.assertEqual(['AResource', 'BResource'],
+                         [r.name for r in self.stack])
+        self.assertEqual(set(['AResource', 'BResource']),
+                         set(r.name for r in self.stack.dependencies[
+                             self.stack['AResource']]))
+
     @stack_delete_after
     def test_update_remove(self):
         tmpl = {'Resources': {
@@ -937,10 +1573,6 @@ class StackTest(HeatTestCase):
         self.stack = parser.Stack(self.ctx, 'update_test_stack',
                                   template.Template(tmpl))
 
-        self.m.StubOutWithMock(scheduler.TaskRunner, '_sleep')
-        scheduler.TaskRunner._sleep(mox.IsA(int)).AndReturn(None)
-        self.m.ReplayAll()
-
         self.stack.store()
         self.stack.create()
         self.m.VerifyAll()
@@ -995,10 +1627,6 @@ class StackTest(HeatTestCase):
                                   template.Template(tmpl),
                                   disable_rollback=False)
 
-        self.m.StubOutWithMock(scheduler.TaskRunner, '_sleep')
-        scheduler.TaskRunner._sleep(mox.IsA(int)).AndReturn(None)
-        self.m.ReplayAll()
-
         self.stack.store()
         self.stack.create()
         self.m.VerifyAll()
@@ -1063,10 +1691,6 @@ class StackTest(HeatTestCase):
                                   template.Template(tmpl),
                                   disable_rollback=False)
 
-        self.m.StubOutWithMock(scheduler.TaskRunner, '_sleep')
-        scheduler.TaskRunner._sleep(mox.IsA(int)).AndReturn(None)
-        self.m.ReplayAll()
-
         self.stack.store()
         self.stack.create()
         self.m.VerifyAll()
@@ -14,6 +14,7 @@
 
 
 import testtools
+import weakref
 
 from heat.engine import properties
 from heat.common import exception
@@ -302,6 +303,61 @@ class PropertiesTest(testtools.TestCase):
         self.assertEqual(self.props.get('foo', 'wibble'), 'wibble')
 
 
+class PropertiesCacheTest(testtools.TestCase):
+    def setUp(self):
+        super(PropertiesCacheTest, self).setUp()
+        self.schema = {'const': {'Type': 'String'},
+                       'ref': {'Type': 'String'}}
+        self.data = {'const': 'foo', 'ref': {'Ref': 'bar'}}
+        self.resolved = []
+
+        def resolve(d):
+            self.resolved.append(d)
+            return d if isinstance(d, basestring) else d['Ref']
+
+        self.props = properties.Properties(self.schema, self.data, resolve)
+
+    def test_schema_compiled_once(self):
+        class Owner(object):
+            pass
+
+        first = properties.Properties(self.schema, {}, owner=Owner)
+        other = properties.Properties(self.schema, {}, owner=Owner)
+        self.assertTrue(other.props is first.props)
+        self.assertTrue(other.props['const'] is first.props['const'])
+
+    def test_schema_replaced(self):
+        class Owner(object):
+            pass
+
+        first = properties.Properties(self.schema, {}, owner=Owner)
+        schema = {'const': {'Type': 'Integer'}}
+        other = properties.Properties(schema, {}, owner=Owner)
+        self.assertEqual(['const'], other.props.keys())
+        self.assertEqual('Integer', other.props['const'].type())
+        self.assertFalse(other.props is first.props)
+
+    def test_schema_not_retained(self):
+        prop_ref = weakref.ref(self.props.props['const'])
+        del self.props
+        self.assertEqual(None, prop_ref())
+
+    def test_constant_memoized(self):
+        self.assertEqual('foo', self.props['const'])
+        self.assertEqual('foo', self.props['const'])
+        self.assertEqual(['foo'], self.resolved)
+
+    def test_function_resolved(self):
+        self.assertEqual('bar', self.props['ref'])
+        self.assertEqual('bar', self.props['ref'])
+        self.assertEqual([{'Ref': 'bar'}, {'Ref': 'bar'}], self.resolved)
+
+    def test_constant_replaced(self):
+        self.assertEqual('foo', self.props['const'])
+        self.data['const'] = 'baz'
+        self.assertEqual('baz', self.props['const'])
+
+
 class PropertiesValidationTest(testtools.TestCase):
     def test_required(self):
         schema = {'foo': {'Type': 'String', 'Required': True}}
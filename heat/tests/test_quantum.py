@@ -292,9 +292,9 @@ class QuantumNetTest(HeatTestCase):
         self.assertRaises(resource.UpdateReplace,
                           rsrc.handle_update, {}, {}, {})
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         rsrc.state_set(rsrc.CREATE_COMPLETE, 'to delete again')
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
 
@@ -389,9 +389,9 @@ class QuantumSubnetTest(HeatTestCase):
         self.assertRaises(resource.UpdateReplace,
                           rsrc.handle_update, {}, {}, {})
 
-        self.assertEqual(rsrc.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.delete)(), None)
         rsrc.state_set(rsrc.CREATE_COMPLETE, 'to delete again')
-        self.assertEqual(rsrc.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.delete)(), None)
         self.m.VerifyAll()
 
 
@@ -520,9 +520,9 @@ class QuantumRouterTest(HeatTestCase):
         self.assertRaises(resource.UpdateReplace,
                           rsrc.handle_update, {}, {}, {})
 
-        self.assertEqual(rsrc.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.delete)(), None)
         rsrc.state_set(rsrc.CREATE_COMPLETE, 'to delete again')
-        self.assertEqual(rsrc.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.delete)(), None)
         self.m.VerifyAll()
 
     def test_router_interface(self):
@@ -548,9 +548,9 @@ class QuantumRouterTest(HeatTestCase):
                 'subnet_id': '91e47a57-7508-46fe-afc9-fc454e8580e1'
             })
 
-        self.assertEqual(rsrc.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.delete)(), None)
         rsrc.state_set(rsrc.CREATE_COMPLETE, 'to delete again')
-        self.assertEqual(rsrc.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.delete)(), None)
         self.m.VerifyAll()
 
     def test_gateway_router(self):
@@ -574,9 +574,9 @@ class QuantumRouterTest(HeatTestCase):
                 'network_id': 'fc68ea2c-b60b-4b4f-bd82-94ec81110766'
             })
 
-        self.assertEqual(rsrc.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.delete)(), None)
         rsrc.state_set(rsrc.CREATE_COMPLETE, 'to delete again')
-        self.assertEqual(rsrc.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.delete)(), None)
         self.m.VerifyAll()
 
 
@@ -644,9 +644,9 @@ class QuantumFloatingIPTest(HeatTestCase):
                          fip.FnGetAtt('id'))
         self.assertRaises(resource.UpdateReplace,
                           fip.handle_update, {}, {}, {})
-        self.assertEqual(fip.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(fip.delete)(), None)
         fip.state_set(fip.CREATE_COMPLETE, 'to delete again')
-        self.assertEqual(fip.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(fip.delete)(), None)
 
         self.m.VerifyAll()
 
@@ -806,16 +806,16 @@ class QuantumFloatingIPTest(HeatTestCase):
         self.assertRaises(resource.UpdateReplace,
                           fipa.handle_update, {}, {}, {})
 
-        self.assertEqual(fipa.delete(), None)
-        self.assertEqual(p.delete(), None)
-        self.assertEqual(fip.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(fipa.delete)(), None)
+        self.assertEqual(scheduler.TaskRunner(p.delete)(), None)
+        self.assertEqual(scheduler.TaskRunner(fip.delete)(), None)
 
         fipa.state_set(fipa.CREATE_COMPLETE, 'to delete again')
         fip.state_set(fip.CREATE_COMPLETE, 'to delete again')
         p.state_set(p.CREATE_COMPLETE, 'to delete again')
 
-        self.assertEqual(fipa.delete(), None)
-        self.assertEqual(p.delete(), None)
-        self.assertEqual(fip.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(fipa.delete)(), None)
+        self.assertEqual(scheduler.TaskRunner(p.delete)(), None)
+        self.assertEqual(scheduler.TaskRunner(fip.delete)(), None)
 
         self.m.VerifyAll()
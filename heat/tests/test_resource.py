@@ -15,6 +15,7 @@
 
 from heat.common import context
 from heat.common import exception
+from heat.db import api as db_api
 from heat.engine import parser
 from heat.engine import resource
 from heat.engine import scheduler
@@ -116,6 +117,45 @@ class ResourceTest(HeatTestCase):
         res = generic_rsrc.GenericResource('test_resource', tmpl, self.stack)
         self.assertEqual(res.metadata, {})
 
+    def test_db_columns_cached(self):
+        tmpl = {'Type': 'Foo', 'Metadata': {'foo': 'bar'}}
+        res = generic_rsrc.GenericResource('test_res_cache', tmpl, self.stack)
+        res._store()
+
+        self.m.StubOutWithMock(db_api, 'resource_get')
+        self.m.ReplayAll()
+
+        self.assertEqual(res.metadata, {'foo': 'bar'})
+        self.assertNotEqual(res.created_time, None)
+        self.assertEqual(res.updated_time, None)
+        self.m.VerifyAll()
+
+    def test_db_columns_refresh(self):
+        tmpl = {'Type': 'Foo', 'Metadata': {'foo': 'bar'}}
+        res = generic_rsrc.GenericResource('test_res_refr', tmpl, self.stack)
+        res._store()
+        self.assertEqual(res.metadata, {'foo': 'bar'})
+
+        rs = db_api.resource_get(res.context, res.id)
+        rs.update_and_save({'rsrc_metadata': {'foo': 'baz'}})
+        self.assertEqual(res.metadata, {'foo': 'bar'})
+        self.assertEqual(res.updated_time, None)
+
+        res.refresh()
+        self.assertEqual(res.metadata, {'foo': 'baz'})
+        self.assertNotEqual(res.updated_time, None)
+
+    def test_metadata_set_cached(self):
+        tmpl = {'Type': 'Foo'}
+        res = generic_rsrc.GenericResource('test_res_mset', tmpl, self.stack)
+        res._store()
+
+        metadata = res.metadata
+        metadata['foo'] = 'bar'
+        res.metadata = metadata
+        res.refresh()
+        self.assertEqual(res.metadata, {'foo': 'bar'})
+
     def test_equals_different_stacks(self):
         tmpl1 = {'Type': 'Foo'}
         tmpl2 = {'Type': 'Foo'}
@@ -227,6 +267,118 @@ class ResourceTest(HeatTestCase):
         scheduler.TaskRunner(res.create)()
         self.assertEqual(res.CREATE_COMPLETE, res.state)
 
+    def test_create_synchronous(self):
+        generic_rsrc.GenericResource.properties_schema = {}
+
+        tmpl = {'Type': 'GenericResourceType'}
+        res = generic_rsrc.GenericResource('test_resource', tmpl, self.stack)
+
+        create = scheduler.TaskRunner(res.create)
+        create.start()
+        self.assertTrue(create.done())
+        self.assertEqual(res.CREATE_COMPLETE, res.state)
+
+    def test_create_polling(self):
+        generic_rsrc.GenericResource.properties_schema = {}
+
+        tmpl = {'Type': 'GenericResourceType'}
+        res = generic_rsrc.GenericResource('test_resource', tmpl, self.stack)
+
+        self.m.StubOutWithMock(generic_rsrc.GenericResource,
+                               'check_create_complete')
+        generic_rsrc.GenericResource.check_create_complete(None).AndReturn(
+            True)
+        self.m.ReplayAll()
+
+        create = scheduler.TaskRunner(res.create)
+        create.start()
+        self.assertFalse(create.done())
+        self.assertEqual(res.CREATE_IN_PROGRESS, res.state)
+        self.assertTrue(create.step())
+        self.assertEqual(res.CREATE_COMPLETE, res.state)
+        self.m.VerifyAll()
+
+    def test_delete_synchronous(self):
+        generic_rsrc.GenericResource.properties_schema = {}
+
+        tmpl = {'Type': 'GenericResourceType'}
+        res = generic_rsrc.GenericResource('test_resource', tmpl, self.stack)
+        scheduler.TaskRunner(res.create)()
+
+        delete = scheduler.TaskRunner(res.delete)
+        delete.start()
+        self.assertTrue(delete.done())
+        self.assertEqual(res.DELETE_COMPLETE, res.state)
+
+    def test_estimated_create_time(self):
+        generic_rsrc.GenericResource.properties_schema = {}
+        self.m.stubs.Set(resource, '_create_durations', {})
+
+        tmpl = {'Type': 'GenericResourceType'}
+        res = generic_rsrc.GenericResource('test_resource', tmpl, self.stack)
+        self.assertEqual(1.0, res.estimated_create_time())
+
+        self.m.StubOutWithMock(scheduler, 'wallclock')
+        scheduler.wallclock().AndReturn(100.0)
+        scheduler.wallclock().AndReturn(110.0)
+        scheduler.wallclock().AndReturn(200.0)
+        scheduler.wallclock().AndReturn(220.0)
+        self.m.ReplayAll()
+
+        scheduler.TaskRunner(res.create)()
+        self.assertEqual(10.0, res.estimated_create_time())
+
+        other = generic_rsrc.GenericResource('other', tmpl, self.stack)
+        scheduler.TaskRunner(other.create)()
+        self.assertEqual(13.0, res.estimated_create_time())
+        self.m.VerifyAll()
+
+    def test_delete_polling(self):
+        generic_rsrc.GenericResource.properties_schema = {}
+
+        tmpl = {'Type': 'GenericResourceType'}
+        res = generic_rsrc.GenericResource('test_resource', tmpl, self.stack)
+        scheduler.TaskRunner(res.create)()
+
+        self.m.StubOutWithMock(generic_rsrc.GenericResource,
+                               'check_delete_complete')
+        generic_rsrc.GenericResource.check_delete_complete(None).AndReturn(
+            False)
+        generic_rsrc.GenericResource.check_delete_complete(None).AndReturn(
+            True)
+        self.m.ReplayAll()
+
+        delete = scheduler.TaskRunner(res.delete)
+        delete.start()
+        self.assertFalse(delete.done())
+        self.assertEqual(res.DELETE_IN_PROGRESS, res.state)
+        self.assertTrue(delete.step())
+        self.assertEqual(res.DELETE_COMPLETE, res.state)
+        self.m.VerifyAll()
+
+    def test_create_admission(self):
+        generic_rsrc.GenericResource.properties_schema = {}
+        self.m.stubs.Set(generic_rsrc.GenericResource, 'backend_service',
+                         'nova')
+        self.m.stubs.Set(scheduler, 'limiter',
+                         scheduler.TaskLimiter(max_tasks=1))
+
+        tmpl = {'Type': 'GenericResourceType'}
+        res = generic_rsrc.GenericResource('test_resource', tmpl, self.stack)
+        other = scheduler.limiter.admission(None, 'nova')
+        self.assertTrue(other.acquire())
+
+        create = scheduler.TaskRunner(res.create)
+        create.start()
+        self.assertEqual(None, res.state)
+        self.assertFalse(create.step())
+        self.assertEqual(None, res.state)
+
+        other.release()
+        self.assertTrue(create.step())
+        self.assertEqual(res.CREATE_COMPLETE, res.state)
+        self.assertTrue(other.acquire())
+
     def test_create_fail_missing_req_prop(self):
         # patch in a dummy property schema for GenericResource
         dummy_schema = {'Foo': {'Type': 'String', 'Required': True}}
@@ -161,3 +161,6 @@ class EngineRpcAPITestCase(testtools.TestCase):
     def test_set_watch_state(self):
         self._test_engine_api('set_watch_state', 'call',
                               watch_name='watch1', state="xyz")
+
+    def test_get_task_stats(self):
+        self._test_engine_api('get_task_stats', 'call')
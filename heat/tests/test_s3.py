@@ -121,7 +121,7 @@ class s3Test(HeatTestCase):
         self.assertRaises(resource.UpdateReplace,
                           rsrc.handle_update, {}, {}, {})
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_public_read(self):
@@ -138,7 +138,7 @@ class s3Test(HeatTestCase):
         properties['AccessControl'] = 'PublicRead'
         stack = parse_stack(t)
         rsrc = self.create_resource(t, stack, 'S3Bucket')
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_public_read_write(self):
@@ -155,7 +155,7 @@ class s3Test(HeatTestCase):
         properties['AccessControl'] = 'PublicReadWrite'
         stack = parse_stack(t)
         rsrc = self.create_resource(t, stack, 'S3Bucket')
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_authenticated_read(self):
@@ -172,7 +172,7 @@ class s3Test(HeatTestCase):
         properties['AccessControl'] = 'AuthenticatedRead'
         stack = parse_stack(t)
         rsrc = self.create_resource(t, stack, 'S3Bucket')
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_website(self):
@@ -190,7 +190,7 @@ class s3Test(HeatTestCase):
         t = template_format.parse(swift_template)
         stack = parse_stack(t)
         rsrc = self.create_resource(t, stack, 'S3BucketWebsite')
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_delete_exception(self):
@@ -207,7 +207,7 @@ class s3Test(HeatTestCase):
         t = template_format.parse(swift_template)
         stack = parse_stack(t)
         rsrc = self.create_resource(t, stack, 'S3Bucket')
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
 
         self.m.VerifyAll()
 
@@ -230,7 +230,7 @@ class s3Test(HeatTestCase):
         stack = parse_stack(t)
         rsrc = self.create_resource(t, stack, 'S3Bucket')
         # if delete_container is called, mox verify will succeed
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.assertEqual(rsrc.DELETE_COMPLETE, rsrc.state)
 
         try:
@@ -56,6 +56,22 @@ class PollingTaskGroupTest(mox.MoxTestBase):
         tg = scheduler.PollingTaskGroup(tasks)
         scheduler.TaskRunner(tg)()
 
+    def test_poll_interval(self):
+        def task():
+            yield
+            yield 5
+            yield 10
+
+        self.mox.StubOutWithMock(scheduler.TaskRunner, '_sleep')
+        scheduler.TaskRunner._sleep(5).AndReturn(None)
+        scheduler.TaskRunner._sleep(10).AndReturn(None)
+        scheduler.TaskRunner._sleep(1).AndReturn(None)
+
+        self.mox.ReplayAll()
+
+        tg = scheduler.PollingTaskGroup([task, DummyTask(2)])
+        scheduler.TaskRunner(tg)()
+
     def test_kwargs(self):
         input_kwargs = {'i': [0, 1, 2],
                         'i2': [0, 1, 4]}
@@ -163,7 +179,7 @@ class PollingTaskGroupTest(mox.MoxTestBase):
 class DependencyTaskGroupTest(mox.MoxTestBase):
 
     @contextlib.contextmanager
-    def _dep_test(self, *edges):
+    def _dep_test(self, *edges, **kwargs):
         dummy = DummyTask(getattr(self, 'steps', 3))
 
         class TaskMaker(object):
@@ -178,7 +194,7 @@ class DependencyTaskGroupTest(mox.MoxTestBase):
 
         deps = dependencies.Dependencies(edges)
 
-        tg = scheduler.DependencyTaskGroup(deps, TaskMaker)
+        tg = scheduler.DependencyTaskGroup(deps, TaskMaker, **kwargs)
 
         self.mox.StubOutWithMock(dummy, 'do_step')
 
@@ -192,7 +208,7 @@ class DependencyTaskGroupTest(mox.MoxTestBase):
         self.steps = 0
         self.mox.StubOutWithMock(scheduler.TaskRunner, '_sleep')
         with self._dep_test(('second', 'first')) as dummy:
-            scheduler.TaskRunner._sleep(None).AndReturn(None)
+            pass
 
     def test_single_node(self):
         with self._dep_test(('only', None)) as dummy:
@@ -324,6 +340,113 @@ class DependencyTaskGroupTest(mox.MoxTestBase):
         self.assertRaises(dependencies.CircularDependencyException,
                           scheduler.DependencyTaskGroup, d)
 
+    def test_immediate_completion(self):
+        started = []
+
+        def make_task(name):
+            return lambda: started.append(name)
+
+        deps = dependencies.Dependencies([('third', 'second'),
+                                          ('second', 'first')])
+        tg = scheduler.DependencyTaskGroup(deps, make_task)
+
+        runner = scheduler.TaskRunner(tg)
+        runner.start()
+
+        self.assertTrue(runner.done())
+        self.assertEqual(started, ['first', 'second', 'third'])
+
+    def test_uneven_steps(self):
+        steps = {'long': 4, 'first': 1, 'second': 1}
+        tasks = dict((n, DummyTask(c)) for n, c in steps.items())
+        for t in tasks.values():
+            self.mox.StubOutWithMock(t, 'do_step')
+
+        deps = dependencies.Dependencies([('long', None),
+                                          ('second', 'first')])
+        tg = scheduler.DependencyTaskGroup(deps, lambda n: tasks[n])
+
+        tasks['long'].do_step(1).InAnyOrder('1')
+        tasks['first'].do_step(1).InAnyOrder('1')
+        tasks['long'].do_step(2).AndReturn(None)
+        tasks['second'].do_step(1).InAnyOrder('2')
+        tasks['long'].do_step(3).InAnyOrder('2')
+        tasks['long'].do_step(4).AndReturn(None)
+
+        self.mox.ReplayAll()
+        scheduler.TaskRunner(tg)(wait_time=None)
+        self.mox.VerifyAll()
+
+    def test_critical_path_first(self):
+        self.steps = 1
+        with self._dep_test(('c3', 'c2'), ('c2', 'c1'),
+                            ('b2', 'b1'), ('a1', None)) as dummy:
+            dummy.do_step(1, 'c1').AndReturn(None)
+            dummy.do_step(1, 'b1').AndReturn(None)
+            dummy.do_step(1, 'a1').AndReturn(None)
+            dummy.do_step(1, 'c2').AndReturn(None)
+            dummy.do_step(1, 'b2').AndReturn(None)
+            dummy.do_step(1, 'c3').AndReturn(None)
+
+    def test_critical_path_weighted(self):
+        self.steps = 1
+        weights = {'slow': 10}
+        with self._dep_test(('c3', 'c2'), ('c2', 'c1'), ('slow', None),
+                            weight=lambda k: weights.get(k, 1)) as dummy:
+            dummy.do_step(1, 'slow').AndReturn(None)
+            dummy.do_step(1, 'c1').AndReturn(None)
+            dummy.do_step(1, 'c2').AndReturn(None)
+            dummy.do_step(1, 'c3').AndReturn(None)
+
+    def test_poll_intervals(self):
+        now = [1000.0]
+        steps = []
+
+        def make_task(name):
+            interval = {'fast': 1, 'slow': 3}[name]
+
+            def task():
+                yield
+                for i in range(3):
+                    steps.append((now[0], name))
+                    yield interval
+            return task
+
+        def sleep(runner, wait_time):
+            now[0] += wait_time
+
+        self.stubs.Set(scheduler, 'wallclock', lambda: now[0])
+        self.stubs.Set(scheduler.TaskRunner, '_sleep', sleep)
+
+        deps = dependencies.Dependencies([('fast', None), ('slow', None)])
+        tg = scheduler.DependencyTaskGroup(deps, make_task)
+        scheduler.TaskRunner(tg)()
+
+        self.assertEqual([(1000.0, 'fast'), (1001.0, 'fast'),
+                          (1002.0, 'fast')],
+                         [s for s in steps if s[1] == 'fast'])
+        self.assertEqual([(1000.0, 'slow'), (1003.0, 'slow'),
+                          (1006.0, 'slow')],
+                         [s for s in steps if s[1] == 'slow'])
+        self.assertEqual(1009.0, now[0])
+
+    def test_poll_intervals_mixed(self):
+        self.stubs.Set(scheduler, 'wallclock', lambda: 1000.0)
+
+        def make_task(name):
+            def task():
+                yield {'hinted': 60, 'unhinted': None}[name]
+            return task
+
+        deps = dependencies.Dependencies([('hinted', None),
+                                          ('unhinted', None)])
+        runner = scheduler.TaskRunner(scheduler.DependencyTaskGroup(
+            deps, make_task))
+        runner.start()
+        self.assertEqual(None, runner.poll_interval())
+        self.assertFalse(runner.step())
+        self.assertEqual(60, runner.poll_interval())
+
 
 class TaskTest(mox.MoxTestBase):
 
@@ -417,6 +540,38 @@ class TaskTest(mox.MoxTestBase):
         runner = scheduler.TaskRunner(DummyTask())
         runner(wait_time=None)
 
+    def test_poll_interval(self):
+        def task():
+            yield
+            yield 5
+            yield
+            yield 0.5
+
+        self.mox.StubOutWithMock(scheduler.TaskRunner, '_sleep')
+        scheduler.TaskRunner._sleep(5).AndReturn(None)
+        scheduler.TaskRunner._sleep(42).AndReturn(None)
+        scheduler.TaskRunner._sleep(0.5).AndReturn(None)
+
+        self.mox.ReplayAll()
+
+        scheduler.TaskRunner(task)(wait_time=42)
+
+    def test_poll_interval_no_sleep(self):
+        def task():
+            yield 5
+
+        self.mox.StubOutWithMock(scheduler.TaskRunner, '_sleep')
+        self.mox.ReplayAll()
+
+        runner = scheduler.TaskRunner(task)
+        runner(wait_time=None)
+        self.assertTrue(runner.done())
+
+    def test_exponential_backoff(self):
+        intervals = scheduler.exponential_backoff(0.5, maximum=3)
+        self.assertEqual([0.5, 1, 2, 3, 3],
+                         [next(intervals) for i in range(5)])
+
     def test_args(self):
         args = ['foo', 'bar']
         kwargs = {'baz': 'quux', 'blarg': 'wibble'}
@@ -595,6 +750,334 @@ class TaskTest(mox.MoxTestBase):
         self.mox.VerifyAll()
 
 
+class TaskLimiterTest(mox.MoxTestBase):
+
+    def setUp(self):
+        super(TaskLimiterTest, self).setUp()
+        self.now = [1000.0]
+        self.stubs.Set(scheduler, 'wallclock', lambda: self.now[0])
+
+    def test_token_bucket(self):
+        bucket = scheduler.TokenBucket(2, 3)
+
+        for i in range(3):
+            self.assertTrue(bucket.consume())
+        self.assertFalse(bucket.consume())
+        self.assertEqual(0.5, bucket.wait_time())
+
+        self.now[0] += 0.5
+        self.assertEqual(0, bucket.wait_time())
+        self.assertTrue(bucket.consume())
+        self.assertFalse(bucket.consume())
+
+        self.now[0] += 100
+        for i in range(3):
+            self.assertTrue(bucket.consume())
+        self.assertFalse(bucket.consume())
+
+    def test_unlimited(self):
+        limiter = scheduler.TaskLimiter()
+        admissions = [limiter.admission('t', 'nova') for i in range(10)]
+        for a in admissions:
+            self.assertTrue(a.acquire())
+        self.assertEqual(None, admissions[0].wait_time())
+
+    def test_no_backend(self):
+        limiter = scheduler.TaskLimiter(max_tasks=1)
+        self.assertTrue(limiter.admission('t', 'nova').acquire())
+        self.assertTrue(limiter.admission('t').acquire())
+        self.assertFalse(limiter.admission('t', 'nova').acquire())
+
+    def test_max_tasks(self):
+        limiter = scheduler.TaskLimiter(max_tasks=2)
+        first = limiter.admission('t1', 'nova')
+        second = limiter.admission('t2', 'cinder')
+        third = limiter.admission('t3', 'nova')
+
+        self.assertTrue(first.acquire())
+        self.assertTrue(second.acquire())
+        self.assertTrue(second.acquire())
+        self.assertFalse(third.acquire())
+
+        first.release()
+        first.release()
+        self.assertTrue(third.acquire())
+
+    def test_max_tenant_tasks(self):
+        limiter = scheduler.TaskLimiter(max_tenant_tasks=1)
+        first = limiter.admission('t1', 'nova')
+        self.assertTrue(first.acquire())
+        self.assertFalse(limiter.admission('t1', 'nova').acquire())
+        self.assertTrue(limiter.admission('t2', 'nova').acquire())
+
+        first.release()
+        self.assertTrue(limiter.admission('t1', 'nova').acquire())
+
+    def test_backend_rate(self):
+        limiter = scheduler.TaskLimiter(backend_rates={'nova': (1, 1)})
+        self.assertTrue(limiter.admission('t', 'nova').acquire())
+
+        waiting = limiter.admission('t', 'nova')
+        self.assertFalse(waiting.acquire())
+        self.assertEqual(1, waiting.wait_time())
+        self.assertTrue(limiter.admission('t', 'cinder').acquire())
+
+        self.now[0] += 1
+        self.assertTrue(waiting.acquire())
+
+
+    def test_oldest_waiter_first(self):
+        limiter = scheduler.TaskLimiter(max_tenant_tasks=1)
+        running = limiter.admission('t', 'nova')
+        self.assertTrue(running.acquire())
+
+        oldest = limiter.admission('t', 'nova')
+        newest = limiter.admission('t', 'nova')
+        self.assertFalse(oldest.acquire())
+        self.assertFalse(newest.acquire())
+
+        running.release()
+        self.assertFalse(newest.acquire())
+        self.assertTrue(oldest.acquire())
+
+        oldest.release()
+        self.assertTrue(newest.acquire())
+
+    def test_oldest_waiter_first_rate(self):
+        limiter = scheduler.TaskLimiter(backend_rates={'nova': (1, 1)})
+        self.assertTrue(limiter.admission('t', 'nova').acquire())
+
+        oldest = limiter.admission('t', 'nova')
+        newest = limiter.admission('t', 'nova')
+        self.assertFalse(oldest.acquire())
+
+        self.now[0] += 1
+        self.assertFalse(newest.acquire())
+        self.assertTrue(oldest.acquire())
+
+    def test_waiter_gives_up(self):
+        limiter = scheduler.TaskLimiter(max_tenant_tasks=1)
+        running = limiter.admission('t', 'nova')
+        self.assertTrue(running.acquire())
+
+        oldest = limiter.admission('t', 'nova')
+        newest = limiter.admission('t', 'nova')
+        self.assertFalse(oldest.acquire())
+        self.assertFalse(newest.acquire())
+        oldest.release()
+
+        running.release()
+        self.assertTrue(newest.acquire())
+
+
+class ReactorTest(mox.MoxTestBase):
+
+    def setUp(self):
+        super(ReactorTest, self).setUp()
+        self.reactor = scheduler.Reactor()
+        self.stubs.Set(scheduler, 'reactor', self.reactor)
+        self.thread = eventlet.spawn(self.reactor)
+        self.addCleanup(self.thread.kill)
+
+    def test_run(self):
+        self.mox.StubOutWithMock(scheduler.TaskRunner, '_sleep')
+        self.mox.ReplayAll()
+
+        tasks = [DummyTask() for i in range(3)]
+        threads = [eventlet.spawn(scheduler.TaskRunner(t), wait_time=0)
+                   for t in tasks]
+        for t in threads:
+            t.wait()
+
+        self.assertEqual(9, self.reactor.stats()['steps'])
+        self.assertEqual(0, self.reactor.stats()['depth'])
+
+    def test_exception(self):
+        class TestException(Exception):
+            pass
+
+        def task():
+            yield
+            raise TestException()
+
+        runner = scheduler.TaskRunner(task)
+        thread = eventlet.spawn(runner, wait_time=0)
+        self.assertRaises(TestException, thread.wait)
+        self.assertEqual(0, self.reactor.stats()['depth'])
+
+    def test_nested(self):
+        def task():
+            yield
+            scheduler.TaskRunner(DummyTask())(wait_time=0)
+
+        thread = eventlet.spawn(scheduler.TaskRunner(task), wait_time=0)
+        thread.wait()
+
+        # The subtask was handed back to the reactor, not run in place
+        self.assertEqual(4, self.reactor.stats()['steps'])
+        self.assertEqual(0, self.reactor.stats()['depth'])
+
+    def test_nested_does_not_delay_sibling(self):
+        released = eventlet.event.Event()
+        finished = []
+
+        def subtask():
+            while not released.ready():
+                yield 0.01
+
+        def task():
+            yield
+            scheduler.TaskRunner(subtask)()
+            finished.append('task')
+
+        def sibling():
+            for i in range(3):
+                yield 0.01
+            finished.append('sibling')
+            released.send()
+
+        with eventlet.Timeout(5):
+            thread = eventlet.spawn(scheduler.TaskRunner(task))
+            eventlet.sleep(0)
+            scheduler.TaskRunner(sibling)()
+            thread.wait()
+
+        self.assertEqual(['sibling', 'task'], finished)
+
+    def test_blocking_step_does_not_delay_sibling(self):
+        released = eventlet.event.Event()
+
+        def task():
+            yield
+            released.wait()
+
+        def sibling():
+            for i in range(3):
+                yield 0.01
+            released.send()
+
+        with eventlet.Timeout(5):
+            thread = eventlet.spawn(scheduler.TaskRunner(task), wait_time=0)
+            eventlet.sleep(0)
+            scheduler.TaskRunner(sibling)()
+            thread.wait()
+
+        self.assertEqual(0, self.reactor.stats()['depth'])
+
+    def test_killed(self):
+        task = DummyTask(100)
+        runner = scheduler.TaskRunner(task)
+        thread = eventlet.spawn(runner, wait_time=10)
+        eventlet.sleep(0)
+        self.assertFalse(runner.done())
+
+        self.assertEqual(1, self.reactor.stats()['depth'])
+
+        thread.kill()
+        self.assertTrue(runner.done())
+        self.assertEqual(0, self.reactor.stats()['depth'])
+
+
+class InstrumentationTest(mox.MoxTestBase):
+
+    class Owner(object):
+        def __init__(self, name):
+            self.name = name
+
+        def instrumentation_keys(self):
+            return {'resource_type': 'Dummy', 'stack': self.name}
+
+        def task(self, steps=2):
+            for i in range(steps):
+                yield
+
+        def failing_task(self):
+            yield
+            raise ValueError()
+
+    def setUp(self):
+        super(InstrumentationTest, self).setUp()
+        self.instrumentation = scheduler.Instrumentation()
+        self.stubs.Set(scheduler, 'instrumentation', self.instrumentation)
+        self.now = [100.0]
+        self.stubs.Set(scheduler, 'wallclock', lambda: self.now[0])
+
+    def test_disabled(self):
+        self.stubs.Set(scheduler, 'instrumentation', None)
+        self.stubs.Set(scheduler, 'wallclock', None)
+        runner = scheduler.TaskRunner(self.Owner('a').task)
+        runner(wait_time=None)
+        self.assertTrue(runner.done())
+
+    def test_no_keys(self):
+        scheduler.TaskRunner(DummyTask())(wait_time=None)
+        self.assertEqual({}, self.instrumentation.report())
+
+    def test_totals(self):
+        def sleep(wait_time):
+            self.now[0] += wait_time
+
+        self.stubs.Set(scheduler.TaskRunner, '_sleep',
+                       lambda self, wait_time: sleep(wait_time))
+        scheduler.TaskRunner(self.Owner('a').task)(wait_time=2)
+        scheduler.TaskRunner(self.Owner('b').task, steps=1)(wait_time=2)
+
+        report = self.instrumentation.report()
+        self.assertEqual(['a', 'b'], sorted(report['stack']))
+        totals = report['resource_type']['Dummy']
+        self.assertEqual(2, totals['started'])
+        self.assertEqual(2, totals['finished'])
+        self.assertEqual(0, totals['failed'])
+        self.assertEqual(5, totals['steps'])
+        self.assertEqual(2, totals['sleep_time'])
+        self.assertEqual(2, totals['elapsed'])
+        self.assertEqual(3, report['stack']['a']['steps'])
+
+    def test_task_keys(self):
+        def task():
+            yield
+        task.instrumentation_keys = lambda: {'stack': 'a'}
+
+        scheduler.TaskRunner(task)(wait_time=None)
+        self.assertEqual(1, self.instrumentation.report()['stack']['a'][
+            'finished'])
+
+    def test_forget(self):
+        scheduler.TaskRunner(self.Owner('a').task)(wait_time=None)
+        scheduler.TaskRunner(self.Owner('b').task)(wait_time=None)
+
+        self.instrumentation.forget('stack', 'a')
+        self.instrumentation.forget('stack', 'c')
+        report = self.instrumentation.report()
+        self.assertEqual(['b'], sorted(report['stack']))
+        self.assertEqual(2, report['resource_type']['Dummy']['finished'])
+
+    def test_failed(self):
+        runner = scheduler.TaskRunner(self.Owner('a').failing_task)
+        self.assertRaises(ValueError, runner, wait_time=None)
+        totals = self.instrumentation.report()['stack']['a']
+        self.assertEqual(1, totals['finished'])
+        self.assertEqual(1, totals['failed'])
+
+    def test_timeout(self):
+        runner = scheduler.TaskRunner(self.Owner('a').task, steps=10)
+        runner.start(timeout=1)
+        self.now[0] += 2
+        self.assertRaises(scheduler.Timeout, runner.step)
+        totals = self.instrumentation.report()['stack']['a']
+        self.assertEqual(1, totals['timeouts'])
+        self.assertEqual(1, totals['failed'])
+
+    def test_cancelled(self):
+        runner = scheduler.TaskRunner(self.Owner('a').task)
+        runner.start()
+        runner.cancel()
+        totals = self.instrumentation.report()['stack']['a']
+        self.assertEqual(1, totals['finished'])
+        self.assertEqual(1, totals['cancellations'])
+        self.assertEqual(1, totals['steps'])
+
+
 class WrapperTaskTest(mox.MoxTestBase):
 
     def test_wrap(self):
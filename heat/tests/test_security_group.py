@@ -19,6 +19,7 @@ from heat.common import context
 from heat.common import template_format
 from heat.engine import parser
 from heat.engine import resource
+from heat.engine import scheduler
 from heat.tests.common import HeatTestCase
 from heat.tests.utils import setup_dummy_db
 from heat.tests.v1_1 import fakes
@@ -270,7 +271,7 @@ Resources:
 
         self.assertResourceState(sg, utils.PhysName('test_stack', 'the_sg'))
 
-        self.assertEqual(None, sg.delete())
+        self.assertEqual(None, scheduler.TaskRunner(sg.delete)())
 
         sg.state_set(sg.CREATE_COMPLETE, 'to delete again')
         sg.resource_id = 2
@@ -532,7 +533,7 @@ Resources:
 
         self.assertResourceState(sg, 'aaaa')
 
-        self.assertEqual(None, sg.delete())
+        self.assertEqual(None, scheduler.TaskRunner(sg.delete)())
 
         sg.state_set(sg.CREATE_COMPLETE, 'to delete again')
         sg.resource_id = 'aaaa'
@@ -157,7 +157,7 @@ class swiftTest(HeatTestCase):
         self.assertRaises(resource.UpdateReplace,
                           rsrc.handle_update, {}, {}, {})
 
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_public_read(self):
@@ -174,7 +174,7 @@ class swiftTest(HeatTestCase):
         properties['X-Container-Read'] = '.r:*'
         stack = parse_stack(t)
         rsrc = self.create_resource(t, stack, 'SwiftContainer')
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_public_read_write(self):
@@ -192,7 +192,7 @@ class swiftTest(HeatTestCase):
         properties['X-Container-Write'] = '.r:*'
         stack = parse_stack(t)
         rsrc = self.create_resource(t, stack, 'SwiftContainer')
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_website(self):
@@ -210,7 +210,7 @@ class swiftTest(HeatTestCase):
         t = template_format.parse(swift_template)
         stack = parse_stack(t)
         rsrc = self.create_resource(t, stack, 'SwiftContainerWebsite')
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.m.VerifyAll()
 
     def test_delete_exception(self):
@@ -227,7 +227,7 @@ class swiftTest(HeatTestCase):
         t = template_format.parse(swift_template)
         stack = parse_stack(t)
         rsrc = self.create_resource(t, stack, 'SwiftContainer')
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
 
         self.m.VerifyAll()
 
@@ -250,7 +250,7 @@ class swiftTest(HeatTestCase):
         stack = parse_stack(t)
         rsrc = self.create_resource(t, stack, 'SwiftContainer')
         # if delete_container is called, mox verify will succeed
-        rsrc.delete()
+        scheduler.TaskRunner(rsrc.delete)()
         self.assertEqual(rsrc.DELETE_COMPLETE, rsrc.state)
 
         try:
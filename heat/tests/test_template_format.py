@@ -15,8 +15,11 @@
 from testtools import skipIf
 import os
 
+from oslo.config import cfg
+
 from heat.engine import clients
 from heat.common import template_format
+from heat.common import utils
 from heat.tests.common import HeatTestCase
 from heat.tests.utils import setup_dummy_db
 from heat.tests.utils import parse_stack
@@ -91,6 +94,80 @@ Outputs: {}
         self.assertEqual(tpl1, tpl2)
 
 
+class YamlParseTest(HeatTestCase):
+
+    def setUp(self):
+        super(YamlParseTest, self).setUp()
+        self.addCleanup(cfg.CONF.clear_override, 'max_template_size')
+        self.addCleanup(cfg.CONF.clear_override, 'template_parse_cache_size')
+        self.m.stubs.Set(template_format, '_parse_cache',
+                         utils.LRUCache(0))
+
+    def test_parse_cached(self):
+        self.m.StubOutWithMock(template_format.yaml, 'load')
+        template_format.yaml.load(
+            'Resources: {Foo: {Type: Bar}}\n',
+            Loader=template_format.yaml_loader).AndReturn(
+                {u'Resources': {u'Foo': {u'Type': u'Bar'}}})
+        self.m.ReplayAll()
+
+        tpl1 = template_format.parse('Resources: {Foo: {Type: Bar}}\n')
+        tpl2 = template_format.parse('Resources: {Foo: {Type: Bar}}\n')
+        self.assertEqual(tpl1, tpl2)
+        self.assertEqual({u'Type': u'Bar'}, tpl2[u'Resources'][u'Foo'])
+
+        # Each caller gets its own copy
+        self.assertFalse(tpl1 is tpl2)
+        self.assertFalse(tpl1[u'Resources'] is tpl2[u'Resources'])
+        self.m.VerifyAll()
+
+    def test_parse_cache_disabled(self):
+        cfg.CONF.set_override('template_parse_cache_size', 0)
+        self.m.StubOutWithMock(template_format.yaml, 'load')
+        for i in range(2):
+            template_format.yaml.load(
+                'Resources: {}\n',
+                Loader=template_format.yaml_loader).AndReturn({})
+        self.m.ReplayAll()
+
+        template_format.parse('Resources: {}\n')
+        template_format.parse('Resources: {}\n')
+        self.m.VerifyAll()
+
+    def test_parse_cache_resized(self):
+        for i in range(3):
+            template_format.parse('Resources: {}\nDescription: "%d"\n' % i)
+        self.assertEqual(3, len(template_format._parse_cache))
+
+        cfg.CONF.set_override('template_parse_cache_size', 1)
+        template_format.parse('Resources: {}\nDescription: "2"\n')
+        self.assertEqual(1, len(template_format._parse_cache))
+
+        cfg.CONF.set_override('template_parse_cache_size', 0)
+        template_format.parse('Resources: {}\nDescription: "3"\n')
+        self.assertEqual(0, len(template_format._parse_cache))
+
+    def test_parse_unicode(self):
+        tpl = template_format.parse(u'Description: caf\xe9\n')
+        self.assertEqual(u'caf\xe9', tpl[u'Description'])
+        self.assertTrue(isinstance(tpl[u'Outputs'], dict))
+
+    def test_max_template_size(self):
+        cfg.CONF.set_override('max_template_size', 100)
+        self.assertRaises(ValueError, template_format.parse,
+                          'Description: "%s"\n' % ('x' * 100))
+        self.assertRaises(ValueError, template_format.parse,
+                          '{"Description": "%s"}' % ('x' * 100))
+        template_format.parse('{"Description": "small"}')
+
+    def test_max_template_size_unicode(self):
+        # The limit is in bytes of the UTF-8 encoding, not characters
+        cfg.CONF.set_override('max_template_size', 100)
+        self.assertRaises(ValueError, template_format.parse,
+                          u'Description: "%s"\n' % (u'\xe9' * 45))
+        template_format.parse(u'Description: "%s"\n' % (u'\xe9' * 40))
+
+
 class JsonYamlResolvedCompareTest(HeatTestCase):
 
     def setUp(self):
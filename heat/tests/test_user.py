@@ -130,20 +130,20 @@ class UserTest(UserPolicyTestCase):
                           rsrc.handle_update, {}, {}, {})
 
         rsrc.resource_id = None
-        self.assertEqual(None, rsrc.delete())
+        self.assertEqual(None, scheduler.TaskRunner(rsrc.delete)())
         self.assertEqual('DELETE_COMPLETE', rsrc.state)
 
         rsrc.resource_id = self.fc.access
         rsrc.state_set('CREATE_COMPLETE')
         self.assertEqual('CREATE_COMPLETE', rsrc.state)
 
-        self.assertEqual(None, rsrc.delete())
+        self.assertEqual(None, scheduler.TaskRunner(rsrc.delete)())
         self.assertEqual('DELETE_COMPLETE', rsrc.state)
 
         rsrc.state_set('CREATE_COMPLETE')
         self.assertEqual('CREATE_COMPLETE', rsrc.state)
 
-        self.assertEqual(None, rsrc.delete())
+        self.assertEqual(None, scheduler.TaskRunner(rsrc.delete)())
         self.assertEqual('DELETE_COMPLETE', rsrc.state)
         self.m.VerifyAll()
 
@@ -301,7 +301,7 @@ class AccessKeyTest(UserPolicyTestCase):
 
         self.assertRaises(exception.InvalidTemplateAttribute,
                           rsrc.FnGetAtt, 'Foo')
-        self.assertEqual(None, rsrc.delete())
+        self.assertEqual(None, scheduler.TaskRunner(rsrc.delete)())
         self.m.VerifyAll()
 
         # Check for double delete
@@ -314,7 +314,7 @@ class AccessKeyTest(UserPolicyTestCase):
         self.m.ReplayAll()
         rsrc.state = rsrc.CREATE_COMPLETE
         rsrc.resource_id = test_key
-        self.assertEqual(None, rsrc.delete())
+        self.assertEqual(None, scheduler.TaskRunner(rsrc.delete)())
         self.m.VerifyAll()
 
     def test_access_key_no_user(self):
@@ -334,7 +334,7 @@ class AccessKeyTest(UserPolicyTestCase):
         self.assertEqual(user.AccessKey.CREATE_FAILED,
                          rsrc.state)
 
-        self.assertEqual(None, rsrc.delete())
+        self.assertEqual(None, scheduler.TaskRunner(rsrc.delete)())
         self.assertEqual(user.AccessKey.DELETE_COMPLETE, rsrc.state)
 
         self.m.VerifyAll()
@@ -14,9 +14,12 @@
 
 from testtools import skipIf
 
+from oslo.config import cfg
+
 from heat.tests.v1_1 import fakes
 from heat.common import exception
 from heat.common import template_format
+from heat.engine import resource
 from heat.engine import resources
 from heat.engine.resources import instance as instances
 from heat.engine import service
@@ -507,6 +510,52 @@ class validateTest(HeatTestCase):
         res = dict(engine.validate_template(None, t))
         self.assertNotEqual(res['Description'], 'Successfully validated')
 
+    def test_validate_cached(self):
+        t = template_format.parse(test_template_ref % 'WikiDatabase')
+        engine = service.EngineService('a', 't')
+
+        self.m.StubOutWithMock(engine, '_validate_template')
+        engine._validate_template(t).AndReturn({'Description': 'test.',
+                                                'Parameters': {}})
+        self.m.ReplayAll()
+
+        res = engine.validate_template(None, t)
+        self.assertEqual('test.', res['Description'])
+        res['Description'] = 'modified'
+        res = engine.validate_template(None, t)
+        self.assertEqual('test.', res['Description'])
+        self.m.VerifyAll()
+
+    def test_validate_cache_disabled(self):
+        cfg.CONF.set_override('validation_cache_size', 0)
+        self.addCleanup(cfg.CONF.clear_override, 'validation_cache_size')
+        t = template_format.parse(test_template_ref % 'WikiDatabase')
+        engine = service.EngineService('a', 't')
+
+        self.m.StubOutWithMock(engine, '_validate_template')
+        engine._validate_template(t).AndReturn({'Description': 'test.'})
+        engine._validate_template(t).AndReturn({'Description': 'test.'})
+        self.m.ReplayAll()
+
+        engine.validate_template(None, t)
+        engine.validate_template(None, t)
+        self.m.VerifyAll()
+
+    def test_validate_cache_invalidated(self):
+        t = template_format.parse(test_template_ref % 'WikiDatabase')
+        engine = service.EngineService('a', 't')
+
+        self.m.StubOutWithMock(engine, '_validate_template')
+        engine._validate_template(t).AndReturn({'Description': 'test.'})
+        engine._validate_template(t).AndReturn({'Description': 'test.'})
+        self.m.ReplayAll()
+
+        engine.validate_template(None, t)
+        # Registering a resource type invalidates previous results
+        resource._register_class('AWS::EC2::Instance', instances.Instance)
+        engine.validate_template(None, t)
+        self.m.VerifyAll()
+
     def test_validate_parameters(self):
         t = template_format.parse(test_template_ref % 'WikiDatabase')
 
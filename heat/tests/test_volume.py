@@ -138,13 +138,14 @@ class VolumeTest(HeatTestCase):
                           rsrc.handle_update, {}, {}, {})
 
         fv.status = 'in-use'
-        self.assertRaises(exception.ResourceFailure, rsrc.destroy)
+        self.assertRaises(exception.ResourceFailure,
+                          scheduler.TaskRunner(rsrc.destroy))
         fv.status = 'available'
-        self.assertEqual(rsrc.destroy(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.destroy)(), None)
 
         # Test when volume already deleted
         rsrc.state = rsrc.CREATE_COMPLETE
-        self.assertEqual(rsrc.destroy(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.destroy)(), None)
 
         self.m.VerifyAll()
 
@@ -258,7 +259,48 @@ class VolumeTest(HeatTestCase):
         self.assertRaises(resource.UpdateReplace,
                           rsrc.handle_update, {}, {}, {})
 
-        self.assertEqual(rsrc.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.delete)(), None)
+
+        self.m.VerifyAll()
+
+    def test_volume_attachment_retain(self):
+        fv = FakeVolume('creating', 'available')
+        fva = FakeVolume('attaching', 'in-use')
+        stack_name = 'test_volume_attach_retain_stack'
+
+        # volume create
+        clients.OpenStackClients.cinder().MultipleTimes().AndReturn(
+            self.cinder_fc)
+        vol_name = utils.PhysName(stack_name, 'DataVolume')
+        self.cinder_fc.volumes.create(
+            size=u'1', availability_zone='nova',
+            display_description=vol_name,
+            display_name=vol_name).AndReturn(fv)
+
+        # create script
+        clients.OpenStackClients.nova().MultipleTimes().AndReturn(self.fc)
+        scheduler.TaskRunner._sleep(mox.IsA(int)).AndReturn(None)
+        self.fc.volumes.create_server_volume(
+            device=u'/dev/vdc',
+            server_id=u'WikiDatabase',
+            volume_id=u'vol-123').AndReturn(fva)
+
+        self.cinder_fc.volumes.get('vol-123').AndReturn(fva)
+
+        # no delete script: the volume stays attached
+
+        self.m.ReplayAll()
+
+        t = template_format.parse(volume_template)
+        t['Resources']['DataVolume']['Properties']['AvailabilityZone'] = 'nova'
+        t['Resources']['MountPoint']['DeletionPolicy'] = 'Retain'
+        stack = parse_stack(t, stack_name=stack_name)
+
+        scheduler.TaskRunner(stack['DataVolume'].create)()
+        rsrc = self.create_attachment(t, stack, 'MountPoint')
+
+        self.assertEqual(scheduler.TaskRunner(rsrc.delete)(), None)
+        self.assertEqual(rsrc.state, rsrc.DELETE_COMPLETE)
 
         self.m.VerifyAll()
 
@@ -297,7 +339,6 @@ class VolumeTest(HeatTestCase):
             'WikiDatabase', 'vol-123').AndRaise(
                 clients.novaclient.exceptions.NotFound('Not found'))
 
-        scheduler.TaskRunner._sleep(mox.IsA(int)).AndReturn(None)
         self.fc.volumes.delete_server_volume(
             'WikiDatabase', 'vol-123').AndRaise(
                 clients.novaclient.exceptions.NotFound('Not found'))
@@ -320,7 +361,7 @@ class VolumeTest(HeatTestCase):
         self.assertRaises(resource.UpdateReplace,
                           rsrc.handle_update, {}, {}, {})
 
-        self.assertEqual(rsrc.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.delete)(), None)
 
         self.m.VerifyAll()
 
@@ -360,7 +401,34 @@ class VolumeTest(HeatTestCase):
         scheduler.TaskRunner(stack['DataVolume'].create)()
         rsrc = self.create_attachment(t, stack, 'MountPoint')
 
-        self.assertEqual(rsrc.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.delete)(), None)
+
+        self.m.VerifyAll()
+
+    def test_volume_retain(self):
+        stack_name = 'test_volume_retain_stack'
+        fv = FakeVolume('creating', 'available')
+
+        # create script
+        clients.OpenStackClients.cinder().MultipleTimes().AndReturn(
+            self.cinder_fc)
+        vol_name = utils.PhysName(stack_name, 'DataVolume')
+        self.cinder_fc.volumes.create(
+            size=u'1', availability_zone='nova',
+            display_description=vol_name,
+            display_name=vol_name).AndReturn(fv)
+
+        # no delete script: the volume is left in place
+        self.m.ReplayAll()
+
+        t = template_format.parse(volume_template)
+        t['Resources']['DataVolume']['DeletionPolicy'] = 'Retain'
+        stack = parse_stack(t, stack_name=stack_name)
+
+        rsrc = self.create_volume(t, stack, 'DataVolume')
+
+        self.assertEqual(scheduler.TaskRunner(rsrc.destroy)(), None)
+        self.assertEqual(rsrc.state, rsrc.DELETE_COMPLETE)
 
         self.m.VerifyAll()
 
@@ -392,7 +460,7 @@ class VolumeTest(HeatTestCase):
 
         rsrc = self.create_volume(t, stack, 'DataVolume')
 
-        self.assertEqual(rsrc.destroy(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.destroy)(), None)
 
         self.m.VerifyAll()
 
@@ -423,7 +491,8 @@ class VolumeTest(HeatTestCase):
 
         rsrc = self.create_volume(t, stack, 'DataVolume')
 
-        self.assertRaises(exception.ResourceFailure, rsrc.destroy)
+        self.assertRaises(exception.ResourceFailure,
+                          scheduler.TaskRunner(rsrc.destroy))
 
         self.m.VerifyAll()
 
@@ -457,7 +526,7 @@ class VolumeTest(HeatTestCase):
         create = scheduler.TaskRunner(rsrc.create)
         self.assertRaises(exception.ResourceFailure, create)
 
-        self.assertEqual(rsrc.destroy(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.destroy)(), None)
 
         self.m.VerifyAll()
 
@@ -673,7 +742,7 @@ class VolumeTest(HeatTestCase):
         self.assertRaises(resource.UpdateReplace, rsrc.handle_update,
                           {}, {}, {})
 
-        self.assertEqual(rsrc.delete(), None)
+        self.assertEqual(scheduler.TaskRunner(rsrc.delete)(), None)
 
         self.m.VerifyAll()
 
@@ -14,7 +14,6 @@
 
 from testtools import skipIf
 
-import mox
 
 from heat.common import context
 from heat.common import exception
@@ -62,15 +61,9 @@ class VPCTestBase(HeatTestCase):
         self.m.StubOutWithMock(
             quantumclient.Client, 'delete_security_group_rule')
 
-    def stub_sleep(self):
-        self.m.StubOutWithMock(scheduler.TaskRunner, '_sleep')
-        scheduler.TaskRunner._sleep(mox.IsA(int)).MultipleTimes()
-        mox.Replay(scheduler.TaskRunner._sleep)
-
     def create_stack(self, template):
         t = template_format.parse(template)
         stack = self.parse_stack(t)
-        self.stub_sleep()
         self.assertEqual(None, stack.create())
         return stack
 
@@ -233,9 +226,6 @@ Resources:
     Properties: {CidrBlock: '10.0.0.0/16'}
 '''
 
-    def stub_sleep(self):
-        pass
-
     def test_vpc(self):
         self.mock_create_network()
         self.mock_delete_network()
@@ -249,7 +239,7 @@ Resources:
         self.assertRaises(resource.UpdateReplace,
                           rsrc.handle_update, {}, {}, {})
 
-        self.assertEqual(None, rsrc.delete())
+        self.assertEqual(None, scheduler.TaskRunner(rsrc.delete)())
         self.m.VerifyAll()
 
 
@@ -300,10 +290,10 @@ Resources:
 
         self.assertEqual('moon', rsrc.FnGetAtt('AvailabilityZone'))
 
-        self.assertEqual(None, rsrc.delete())
+        self.assertEqual(None, scheduler.TaskRunner(rsrc.delete)())
         rsrc.state_set(rsrc.CREATE_COMPLETE, 'to delete again')
-        self.assertEqual(None, rsrc.delete())
-        self.assertEqual(None, stack['the_vpc'].delete())
+        self.assertEqual(None, scheduler.TaskRunner(rsrc.delete)())
+        self.assertEqual(None, scheduler.TaskRunner(stack['the_vpc'].delete)())
         self.m.VerifyAll()
 
 
@@ -683,8 +673,8 @@ Resources:
             resource.UpdateReplace,
             association.handle_update, {}, {}, {})
 
-        association.delete()
-        route_table.delete()
+        scheduler.TaskRunner(association.delete)()
+        scheduler.TaskRunner(route_table.delete)()
 
         vpc = stack['the_vpc']
         self.assertEqual(['rrrr'], vpc.metadata['all_router_ids'])
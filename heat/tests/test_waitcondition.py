@@ -109,8 +109,6 @@ class WaitConditionTest(HeatTestCase):
         self.stack_id = stack.store()
 
         if stub:
-            scheduler.TaskRunner._sleep(mox.IsA(int)).AndReturn(None)
-
             self.m.StubOutWithMock(wc.WaitConditionHandle, 'keystone')
             wc.WaitConditionHandle.keystone().MultipleTimes().AndReturn(
                 self.fc)
@@ -227,6 +225,10 @@ class WaitConditionTest(HeatTestCase):
 
         self.m.StubOutWithMock(scheduler, 'wallclock')
 
+        # Resource creation is timed for the create time estimates
+        scheduler.wallclock().AndReturn(st)
+        scheduler.wallclock().AndReturn(st)
+        scheduler.wallclock().AndReturn(st)
         scheduler.wallclock().AndReturn(st)
         scheduler.wallclock().AndReturn(st + 0.001)
         scheduler.wallclock().AndReturn(st + 0.1)
@@ -414,9 +416,6 @@ class WaitConditionHandleTest(HeatTestCase):
         self.m.ReplayAll()
         stack.store()
 
-        self.m.StubOutWithMock(scheduler.TaskRunner, '_sleep')
-        scheduler.TaskRunner._sleep(mox.IsA(int)).AndReturn(None)
-
         # Stub waitcondition status so all goes CREATE_COMPLETE
         self.m.StubOutWithMock(wc.WaitConditionHandle, 'get_status')
         wc.WaitConditionHandle.get_status().AndReturn(['SUCCESS'])
@@ -0,0 +1,102 @@
+# vim: tabstop=4 shiftwidth=4 softtabstop=4
+
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+from heat.db import api as db_api
+from heat.engine import scheduler
+from heat.engine import write_buffer
+
+from heat.tests.common import HeatTestCase
+
+
+class WriteBufferTest(HeatTestCase):
+    def setUp(self):
+        super(WriteBufferTest, self).setUp()
+        self.m.StubOutWithMock(db_api, 'batch_write')
+        self.writes = write_buffer.WriteBuffer(None)
+
+    def test_flush_empty(self):
+        self.m.ReplayAll()
+
+        self.writes.flush()
+        self.m.VerifyAll()
+
+    def test_flush_coalesced(self):
+        db_api.batch_write(None,
+                           [('s', {'status': 'b'})],
+                           [(2, {'state': 'y', 'nova_instance': 'i'}),
+                            (1, {'state': 'z'})],
+                           [{'name': 'e1'}, {'name': 'e2'}])
+        self.m.ReplayAll()
+
+        self.writes.resource_update(2, {'state': 'x'})
+        self.writes.event_create({'name': 'e1'})
+        self.writes.resource_update(1, {'state': 'z'})
+        self.writes.resource_update(2, {'state': 'y', 'nova_instance': 'i'})
+        self.writes.stack_update('s', {'status': 'a'})
+        self.writes.stack_update('s', {'status': 'b'})
+        self.writes.event_create({'name': 'e2'})
+        self.assertEqual(5, len(self.writes))
+
+        self.writes.flush()
+        self.assertEqual(0, len(self.writes))
+        self.writes.flush()
+        self.m.VerifyAll()
+
+    def test_flush_error(self):
+        db_api.batch_write(None, [], [(1, {'state': 'x'})],
+                           []).AndRaise(Exception('boom'))
+        self.m.ReplayAll()
+
+        self.writes.resource_update(1, {'state': 'x'})
+        self.writes.flush()
+        self.assertEqual(0, len(self.writes))
+        self.m.VerifyAll()
+
+    def test_flushing_task(self):
+        db_api.batch_write(None, [], [(1, {'step': 0})], [])
+        db_api.batch_write(None, [], [(1, {'step': 1})], [])
+        db_api.batch_write(None, [], [(1, {'step': 2})], [])
+        self.m.ReplayAll()
+
+        def task():
+            for i in range(3):
+                self.writes.resource_update(1, {'step': i})
+                yield
+
+        scheduler.TaskRunner(self.writes.flushing(task))(wait_time=None)
+        self.m.VerifyAll()
+
+    def test_flushing_task_exception(self):
+        st = scheduler.wallclock()
+        self.m.StubOutWithMock(scheduler, 'wallclock')
+        scheduler.wallclock().AndReturn(st)
+        scheduler.wallclock().AndReturn(st + 0.5)
+        scheduler.wallclock().AndReturn(st + 1.5)
+        db_api.batch_write(None, [], [(1, {'step': 0})], [])
+        db_api.batch_write(None, [], [(1, {'step': 'timeout'})], [])
+        self.m.ReplayAll()
+
+        def task():
+            self.writes.resource_update(1, {'step': 0})
+            try:
+                yield
+            except scheduler.Timeout:
+                self.writes.resource_update(1, {'step': 'timeout'})
+                raise
+
+        runner = scheduler.TaskRunner(self.writes.flushing(task))
+        runner.start(timeout=1)
+        self.assertRaises(scheduler.Timeout, runner.step)
+        self.m.VerifyAll()